@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Throughput and peak memory of `db_manager.py import-assets`.
+
+Generates NDJSON files of increasing size, imports each into a fresh
+database in a child process and reports rows/s and the child's peak RSS,
+which should stay flat as the input grows.
+
+    python benchmarks/asset_import.py --database-url sqlite:///bench_import.db --sizes 10000,100000,500000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from common import BACKEND_DIR, Timer
+
+def write_ndjson(path, rows):
+    with open(path, "w") as f:
+        for i in range(rows):
+            f.write(json.dumps({
+                "name": f"Owl {i}", "description": "imported by the bulk benchmark", "price": i % 100 + 1,
+                "category": f"cat{i % 10}", "token_id": f"import-{i}", "owner_address": "0xbench",
+            }) + "\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk asset import benchmark")
+    parser.add_argument("--database-url", default="sqlite:///bench_import.db")
+    parser.add_argument("--sizes", default="10000,100000,300000")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    from database import Base, engine
+    import models  # noqa: F401
+
+    workdir = tempfile.mkdtemp()
+    print(f"{'rows':>10} {'seconds':>9} {'rows/s':>10} {'peak RSS MB':>12}")
+    for rows in (int(size) for size in args.sizes.split(",")):
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        path = os.path.join(workdir, f"assets-{rows}.ndjson")
+        write_ndjson(path, rows)
+        with Timer() as timer:
+            subprocess.run(
+                [sys.executable, "db_manager.py", "import-assets", path, "--batch-size", str(args.batch_size)],
+                cwd=BACKEND_DIR, env=dict(os.environ), check=True, stdout=subprocess.DEVNULL,
+            )
+        # ru_maxrss of the largest child waited for so far (KB on Linux); sizes run in increasing order
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        print(f"{rows:>10} {timer.elapsed:>9.2f} {rows / timer.elapsed:>10.0f} {peak:>12.1f}")
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
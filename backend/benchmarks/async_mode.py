@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Load benchmark comparing the sync (threadpool) and async engine modes.
+
+Starts one uvicorn server per mode against the same database, drives it with
+concurrent HTTP clients and reports p50/p99 latency and requests/s.
+
+    python benchmarks/async_mode.py --database-url sqlite:///bench.db --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from common import BACKEND_DIR, Timer, summarize
+
+ENDPOINTS = ["/api/assets/", "/api/assets/1", "/api/search/?query=owl", "/api/transactions/"]
+
+def seed(database_url, assets):
+    os.environ["DATABASE_URL"] = database_url
+    from database import Base, SessionLocal, engine
+    import models
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if db.query(models.Asset).count() >= assets:
+            return
+        db.bulk_insert_mappings(models.Asset, [
+            {"name": f"Owl {i}", "description": "benchmark owl", "price": i % 100 + 1,
+             "category": f"cat{i % 10}", "token_id": f"bench-{i}", "owner_address": "0xbench"}
+            for i in range(assets)
+        ])
+        db.commit()
+
+def start_server(database_url, async_mode, port):
+    env = dict(os.environ, DATABASE_URL=database_url, DB_ASYNC="true" if async_mode else "false")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not start")
+
+async def drive(base_url, concurrency, requests):
+    latencies = []
+    counter = iter(range(requests))
+
+    async def worker(client):
+        for i in counter:
+            start = time.perf_counter()
+            response = await client.get(ENDPOINTS[i % len(ENDPOINTS)])
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        with Timer() as timer:
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return latencies, timer.elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async engine load benchmark")
+    parser.add_argument("--database-url", default="sqlite:///bench_async.db")
+    parser.add_argument("--assets", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    seed(args.database_url, args.assets)
+    for async_mode in (False, True):
+        proc = start_server(args.database_url, async_mode, args.port)
+        try:
+            latencies, elapsed = asyncio.run(
+                drive(f"http://127.0.0.1:{args.port}", args.concurrency, args.requests)
+            )
+            summarize("async engine" if async_mode else "sync engine", latencies, elapsed)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Shared helpers for the standalone benchmark scripts in this directory"""
+import os
+import sys
+import time
+
+# Benchmarks import the backend modules the same way uvicorn does (from backend/)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+def summarize(label, latencies, elapsed):
+    """Print p50/p99 latency (ms) and throughput for a run"""
+    print(
+        f"{label:<24} requests={len(latencies):<7} "
+        f"p50={percentile(latencies, 50) * 1000:8.2f}ms "
+        f"p99={percentile(latencies, 99) * 1000:8.2f}ms "
+        f"rps={len(latencies) / elapsed if elapsed else 0:10.1f}"
+    )
+
+class Timer:
+    """Context manager measuring wall-clock seconds"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        return False
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+End-to-end purchase confirmation latency of the event listener.
+
+Runs the listener against a stand-in node and measures the time from an
+NFTPurchased log being mined to the matching transaction row reading
+'completed' in the database.
+
+    python benchmarks/confirmation_latency.py --mode subscribe
+    python benchmarks/confirmation_latency.py --mode poll       # node without eth_subscribe
+    python benchmarks/confirmation_latency.py --mode fixed      # the old fixed 5 s polling
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+from common import BACKEND_DIR, percentile
+from standin_node import StandInNode, word
+
+CONTRACT_ADDRESS = "0x1b8640FA1A03959F7aCD78f988462D477C3c3639"
+NFT_ABI_PATH = os.path.join(BACKEND_DIR, "..", "frontend", "src", "contracts", "MememonizeNFT.json")
+SELLER = "0x" + "11" * 20
+
+def main():
+    parser = argparse.ArgumentParser(description="Purchase confirmation latency benchmark")
+    parser.add_argument("--mode", choices=("subscribe", "poll", "fixed"), default="subscribe")
+    parser.add_argument("--purchases", type=int, default=50)
+    parser.add_argument("--gap", type=float, default=0.5, help="Idle seconds between purchases")
+    args = parser.parse_args()
+
+    node = StandInNode(subscriptions=args.mode == "subscribe").start()
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'latency.db')}",
+        "WS_PROVIDER_URL": node.url,
+        "CONTRACT_ADDRESS": CONTRACT_ADDRESS,
+        "CONTRACT_ABI_PATH": NFT_ABI_PATH,
+        "LISTENER_START_BLOCK": "1",
+    })
+    if args.mode == "fixed":
+        os.environ.update({"LISTENER_MIN_POLL_INTERVAL": "5", "LISTENER_MAX_POLL_INTERVAL": "5"})
+
+    import logging
+    logging.disable(logging.INFO)
+    from database import Base, SessionLocal, engine
+    import models
+    import event_listener
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        for i in range(args.purchases):
+            db.add(models.Asset(id=i + 1, name=f"Owl {i}", price=1, token_id=str(i), owner_address=SELLER))
+            db.add(models.Transaction(asset_id=i + 1, price=1, transaction_hash=word(i + 1), status="pending"))
+        db.commit()
+
+    threading.Thread(
+        target=lambda: asyncio.run(event_listener.listen_for_events()), daemon=True
+    ).start()
+    time.sleep(2)
+
+    topic = event_listener.contract.events.NFTPurchased().topic
+    latencies = []
+    for i in range(args.purchases):
+        buyer = "0x" + format(i + 1, "040x")
+        mined_at = time.perf_counter()
+        node.mine([{
+            "address": CONTRACT_ADDRESS,
+            "topics": [topic if topic.startswith("0x") else "0x" + topic, word(i), word(SELLER), word(buyer)],
+            "data": word(10 ** 18),
+            "transactionHash": word(i + 1),
+        }])
+        while True:
+            with SessionLocal() as db:
+                if db.get(models.Transaction, i + 1).status == "completed":
+                    break
+            time.sleep(0.002)
+        latencies.append(time.perf_counter() - mined_at)
+        time.sleep(args.gap)
+
+    print(f"mode={args.mode:<10} purchases={len(latencies)} "
+          f"p50={percentile(latencies, 50) * 1000:9.1f}ms p99={percentile(latencies, 99) * 1000:9.1f}ms "
+          f"max={max(latencies) * 1000:9.1f}ms")
+
+if __name__ == "__main__":
+    main()
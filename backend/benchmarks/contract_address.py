@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Throughput of GET /api/contract-address.
+
+Builds a contract directory whose MememonizeNFT.json is the full ~566 KB
+escrow build artifact (bytecode, AST, source maps), then drives two uvicorn
+servers with the same concurrent load: `baseline_app` below, which parses
+the artifact on every request as the endpoint used to, and the API, which
+serves it from the artifact registry. Also reports ETag revalidation (304)
+and the ABI endpoint.
+
+    python benchmarks/contract_address.py --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from common import BACKEND_DIR, Timer, summarize
+
+ARTIFACT = Path(BACKEND_DIR).parent / "smart-contracts" / "build" / "contracts" / "MememonizeEscrow.json"
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+baseline_app = FastAPI()
+
+@baseline_app.get("/api/contract-address/")
+def baseline_contract_address():
+    """The endpoint before the registry: json.load of the whole artifact per request"""
+    with open(Path(os.environ["CONTRACT_BUILD_DIR"]) / "MememonizeNFT.json") as file:
+        networks = json.load(file).get("networks", {})
+    if not networks:
+        raise HTTPException(status_code=404, detail="No networks found in contract file")
+    network_id = list(networks.keys())[0]
+    return {"address": networks[network_id]["address"], "network_id": network_id}
+
+@baseline_app.get("/api/health")
+def health():
+    return {"status": "healthy"}
+
+def build_dir():
+    directory = tempfile.mkdtemp()
+    # Served under the NFT's name, as /api/contract-address/ reads MememonizeNFT.json
+    shutil.copy(ARTIFACT, os.path.join(directory, "MememonizeNFT.json"))
+    shutil.copy(ARTIFACT, os.path.join(directory, "MememonizeEscrow.json"))
+    return directory
+
+def start_server(app, port, env, app_dir=BACKEND_DIR):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--app-dir", app_dir, "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not start")
+
+async def drive(base_url, path, requests, concurrency, headers=None, expect=200):
+    latencies = []
+    counter = iter(range(requests))
+
+    async def worker(client):
+        for _ in counter:
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != expect:
+                raise RuntimeError(f"{path}: status {response.status_code}, expected {expect}")
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        with Timer() as timer:
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return latencies, timer.elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/contract-address throughput benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+
+    print(f"artifact: {ARTIFACT.name} ({ARTIFACT.stat().st_size // 1024} KB)")
+    env = dict(os.environ, CONTRACT_BUILD_DIR=build_dir(), DATABASE_URL="sqlite://", CACHE_URL="none")
+    base_url = f"http://127.0.0.1:{args.port}"
+    for label, app, app_dir in (("per-request json.load", "contract_address:baseline_app", BENCHMARKS_DIR),
+                                ("artifact registry", "main:app", BACKEND_DIR)):
+        proc = start_server(app, args.port, env, app_dir)
+        try:
+            latencies, elapsed = asyncio.run(drive(base_url, "/api/contract-address/", args.requests, args.concurrency))
+            summarize(label, latencies, elapsed)
+            if app == "main:app":
+                etag = httpx.get(base_url + "/api/contract-address/").headers["etag"]
+                latencies, elapsed = asyncio.run(drive(base_url, "/api/contract-address/", args.requests,
+                                                       args.concurrency, {"If-None-Match": etag}, expect=304))
+                summarize("registry, 304", latencies, elapsed)
+                latencies, elapsed = asyncio.run(drive(base_url, "/api/contract-address/MememonizeEscrow",
+                                                       args.requests, args.concurrency))
+                summarize("registry, with ABI", latencies, elapsed)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+if __name__ == "__main__":
+    main()
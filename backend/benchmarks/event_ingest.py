@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Replay a synthetic burst of NFTPurchased events (a collection sell-out)
+through the per-event path and through batched ingestion.
+
+With --backfill, the same events are also mined one per block on a
+stand-in node and the listener catches up on them: ranges of
+--backfill-chunk-size blocks fetched by --backfill-workers concurrent
+get_logs workers, then applied in order. Every purchase must end up
+completed.
+
+    python benchmarks/event_ingest.py --database-url sqlite:///bench_events.db --events 10000
+    python benchmarks/event_ingest.py --events 200 --skip-per-event --backfill --backfill-chunk-size 10
+"""
+import argparse
+import logging
+import os
+import sys
+
+from common import BACKEND_DIR, Timer
+
+def seed(events):
+    from sqlalchemy import delete, insert
+    from database import Base, SessionLocal, engine
+    import models
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.execute(delete(models.ProcessedEvent))
+        db.execute(delete(models.ListenerCheckpoint))
+        db.execute(delete(models.Transaction))
+        db.execute(delete(models.Asset))
+        db.execute(insert(models.Asset), [
+            {"id": i + 1, "name": f"Drop #{i}", "price": 1, "token_id": str(i), "owner_address": "0xcreator"}
+            for i in range(events)
+        ])
+        db.execute(insert(models.Transaction), [
+            {"asset_id": i + 1, "price": 1, "transaction_hash": f"0x{i:064x}", "status": "pending"}
+            for i in range(events)
+        ])
+        db.commit()
+
+def synthetic_events(count):
+    """Decoded log entries shaped like web3's AttributeDicts"""
+    return [
+        {"event": "NFTPurchased", "transactionHash": bytes.fromhex(f"{i:064x}"), "logIndex": 0, "blockNumber": i,
+         "args": {"tokenId": i, "buyer": f"0xbuyer{i % 500:035x}", "seller": "0xcreator", "price": 10 ** 18}}
+        for i in range(count)
+    ]
+
+CONTRACT_ADDRESS = "0x1b8640FA1A03959F7aCD78f988462D477C3c3639"
+NFT_ABI_PATH = os.path.join(BACKEND_DIR, "..", "frontend", "src", "contracts", "MememonizeNFT.json")
+SELLER = "0x" + "11" * 20
+
+def backfill(args):
+    """Catch up on args.events purchases mined one per block; returns True when all completed"""
+    from standin_node import StandInNode, word
+
+    node = StandInNode(get_logs_delay=args.get_logs_delay).start()
+    os.environ.update({
+        "WS_PROVIDER_URL": node.url, "CONTRACT_ADDRESS": CONTRACT_ADDRESS, "CONTRACT_ABI_PATH": NFT_ABI_PATH,
+        "LISTENER_START_BLOCK": "1", "BACKFILL_CHUNK_SIZE": str(args.backfill_chunk_size),
+        "BACKFILL_WORKERS": str(args.backfill_workers), "EVENT_BATCH_SIZE": str(args.batch_size),
+        "CACHE_URL": "none", "LIVE_UPDATES_URL": "none",
+    })
+    from sqlalchemy import func, select
+    from database import SessionLocal
+    import event_listener
+    import models
+
+    topic = event_listener.contract.events.NFTPurchased().topic
+    topic = topic if topic.startswith("0x") else "0x" + topic
+    node.mine_many([[{
+        "address": CONTRACT_ADDRESS,
+        "topics": [topic, word(i), word(SELLER), word(i % 500 + 1)],
+        "data": word(10 ** 18),
+        "transactionHash": word(i),
+    }] for i in range(args.events)])
+
+    seed(args.events)
+    with Timer() as timer:
+        try:
+            event_listener.catch_up()
+            error = None
+        except Exception as e:
+            error = e
+    with SessionLocal() as db:
+        completed = db.scalar(select(func.count()).where(models.Transaction.status == "completed"))
+    ok = error is None and completed == args.events
+    print(f"{'backfill':<10} events={args.events} blocks/range={args.backfill_chunk_size} "
+          f"workers={args.backfill_workers} elapsed={timer.elapsed:8.2f}s completed={completed} "
+          + ("OK" if ok else f"FAILED: {error!r}"))
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-event vs batched event ingestion")
+    parser.add_argument("--database-url", default="sqlite:///bench_events.db")
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--skip-per-event", action="store_true", help="Only time the batched path")
+    parser.add_argument("--backfill", action="store_true", help="Also catch up on the events from a stand-in node")
+    parser.add_argument("--backfill-chunk-size", type=int, default=10, help="BACKFILL_CHUNK_SIZE")
+    parser.add_argument("--backfill-workers", type=int, default=4, help="BACKFILL_WORKERS")
+    parser.add_argument("--get-logs-delay", type=float, default=0.02, help="Stand-in node get_logs latency (s)")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    logging.basicConfig(level=logging.ERROR)
+    from event_handlers import process_nft_purchased_batch
+
+    events = synthetic_events(args.events)
+    runs = [("batched", args.batch_size)]
+    if not args.skip_per_event:
+        runs.insert(0, ("per-event", 1))
+
+    for label, batch_size in runs:
+        seed(args.events)
+        with Timer() as timer:
+            for start in range(0, len(events), batch_size):
+                process_nft_purchased_batch(events[start:start + batch_size])
+        print(f"{label:<10} events={len(events)} elapsed={timer.elapsed:8.2f}s "
+              f"rate={len(events) / timer.elapsed:10.0f} events/s")
+
+    if args.backfill and not backfill(args):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
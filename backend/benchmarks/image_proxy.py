@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Asset image proxy (GET /api/assets/{id}/image) against a local HTTP server
+standing in for the origin hosts of image_url.
+
+The origin serves --images distinct photos of --size pixels (noisy JPEGs,
+so they compress like real ones), answering after --origin-delay seconds.
+Against one uvicorn server the script checks:
+
+  * single flight: --concurrency simultaneous cold requests for one variant
+    cause one origin download and one resize (origin hit counter and the
+    image_variants_rendered_total metric);
+  * bytes: size of the original against each served width, WebP and JPEG;
+  * caching: ETag, Vary and Cache-Control headers, 304 on If-None-Match,
+    and cold against warm latency;
+  * the disk cache stays within IMAGE_CACHE_MAX_BYTES (--cache-mb) after
+    every image has been requested at every width.
+
+    python benchmarks/image_proxy.py --images 12 --concurrency 50
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from PIL import Image
+
+from common import BACKEND_DIR, Timer, summarize
+
+WIDTHS = (64, 128, 256, 512, 1024)
+
+def photo(seed, size):
+    """A JPEG of random blocks over a gradient: compresses like a photo, unlike a flat colour"""
+    rng = random.Random(seed)
+    width, height = size
+    image = Image.linear_gradient("L").resize(size).convert("RGB")
+    noise = Image.effect_noise(size, 40).convert("RGB")
+    image = Image.blend(image, noise, 0.5)
+    for _ in range(200):
+        x, y = rng.randrange(width), rng.randrange(height)
+        image.paste(tuple(rng.randrange(256) for _ in range(3)), (x, y, x + width // 20, y + height // 20))
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=90)
+    return output.getvalue()
+
+class Origin:
+    """HTTP server serving /img/<n>.jpg after `delay` seconds, counting requests per path"""
+
+    def __init__(self, images, delay):
+        self.images = images
+        self.delay = delay
+        self.hits = {}
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                origin.hits[self.path] = origin.hits.get(self.path, 0) + 1
+                time.sleep(origin.delay)
+                match = re.fullmatch(r"/img/(\d+)\.jpg", self.path)
+                if not match or int(match.group(1)) >= len(origin.images):
+                    self.send_error(404)
+                    return
+                body = origin.images[int(match.group(1))]
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+def start_server(env, port):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not start")
+
+def metric(client, name, **labels):
+    text = client.get("/metrics").text
+    selector = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{name}{{{re.escape(selector)}}} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(directory, name))
+               for directory, _, names in os.walk(path) for name in names)
+
+async def burst(base_url, path, concurrency, headers):
+    async def one(client):
+        start = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        return time.perf_counter() - start, response
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        with Timer() as timer:
+            results = await asyncio.gather(*(one(client) for _ in range(concurrency)))
+    return [latency for latency, _ in results], [response for _, response in results], timer.elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Asset image proxy check")
+    parser.add_argument("--images", type=int, default=12)
+    parser.add_argument("--size", default="2400x1600", help="Original size, WIDTHxHEIGHT")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--origin-delay", type=float, default=0.2, help="Origin response time (s)")
+    parser.add_argument("--cache-mb", type=float, default=4, help="IMAGE_CACHE_MAX_BYTES in MiB")
+    parser.add_argument("--port", type=int, default=8771)
+    args = parser.parse_args()
+
+    size = tuple(int(value) for value in args.size.split("x"))
+    origin = Origin([photo(n, size) for n in range(args.images)], args.origin_delay).start()
+    directory = tempfile.mkdtemp()
+    cache_dir = os.path.join(directory, "images")
+    max_bytes = int(args.cache_mb * 1024 ** 2)
+    env = dict(
+        os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'images.db')}", CACHE_URL="memory://",
+        IMAGE_CACHE_DIR=cache_dir, IMAGE_CACHE_MAX_BYTES=str(max_bytes), IMAGE_ALLOW_PRIVATE_HOSTS="true",
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    proc = start_server(env, args.port)
+    ok = True
+    webp = {"Accept": "image/avif,image/webp,*/*"}
+    try:
+        client = httpx.Client(base_url=base_url, timeout=60)
+        asset_ids = [client.post("/api/assets/", json={
+            "name": f"Image owl {n}", "price": 1, "category": "bench", "image_url": f"{origin.url}/img/{n}.jpg",
+        }).json()["id"] for n in range(args.images)]
+
+        # Single flight: every request below arrives before the first resize is done
+        path = f"/api/assets/{asset_ids[0]}/image?w=256&v=1"
+        latencies, responses, elapsed = asyncio.run(burst(base_url, path, args.concurrency, webp))
+        summarize("cold, one variant", latencies, elapsed)
+        downloads = origin.hits.get("/img/0.jpg", 0)
+        rendered = metric(client, "image_variants_rendered_total", format="webp")
+        failed = sum(response.status_code != 200 for response in responses)
+        distinct = len({response.content for response in responses})
+        print(f"  {args.concurrency} concurrent requests: origin downloads={downloads} resizes={rendered:.0f} "
+              f"failed={failed} distinct bodies={distinct}")
+        ok &= downloads == 1 and rendered == 1 and not failed and distinct == 1
+
+        latencies, responses, elapsed = asyncio.run(burst(base_url, path, args.concurrency * 4, webp))
+        summarize("warm, one variant", latencies, elapsed)
+        ok &= all(response.status_code == 200 for response in responses)
+
+        first = responses[0]
+        print(f"  headers: content-type={first.headers['content-type']} etag={first.headers['etag']} "
+              f"vary={first.headers.get('vary')} cache-control={first.headers['cache-control']}")
+        ok &= first.headers["content-type"] == "image/webp" and "immutable" in first.headers["cache-control"]
+        revalidated = client.get(path, headers={**webp, "If-None-Match": first.headers["etag"]})
+        unversioned = client.get(f"/api/assets/{asset_ids[0]}/image?w=256", headers=webp)
+        print(f"  If-None-Match: {revalidated.status_code}; without v: cache-control={unversioned.headers['cache-control']}")
+        ok &= revalidated.status_code == 304 and "immutable" not in unversioned.headers["cache-control"]
+
+        # Bytes per width and format, against the original
+        print(f"original {size[0]}x{size[1]}: {len(origin.images[0]) / 1024:8.1f} KiB")
+        for width in WIDTHS:
+            sizes = {}
+            for accept, label in ((webp, "webp"), ({"Accept": "image/jpeg"}, "jpeg")):
+                response = client.get(f"/api/assets/{asset_ids[0]}/image?w={width}", headers=accept)
+                ok &= response.status_code == 200 and response.headers["content-type"] == f"image/{label}"
+                served = Image.open(io.BytesIO(response.content))
+                ok &= served.width == width
+                sizes[label] = len(response.content)
+            print(f"  w={width:<5} webp={sizes['webp'] / 1024:7.1f} KiB  jpeg={sizes['jpeg'] / 1024:7.1f} KiB")
+        snapped = client.get(f"/api/assets/{asset_ids[0]}/image?w=300", headers=webp)
+        ok &= Image.open(io.BytesIO(snapped.content)).width == 512
+
+        # Every image at every width: the cache must stay within its bound
+        for asset_id in asset_ids:
+            for width in WIDTHS:
+                response = client.get(f"/api/assets/{asset_id}/image?w={width}", headers=webp)
+                ok &= response.status_code == 200
+        used = directory_size(cache_dir)
+        print(f"cache after {args.images} images x {len(WIDTHS)} widths: {used / 1024 ** 2:.2f} MiB "
+              f"of {args.cache_mb} MiB, origin downloads={sum(origin.hits.values())}")
+        ok &= used <= max_bytes
+
+        missing = client.get("/api/assets/999999/image?w=256")
+        ok &= missing.status_code == 404
+    finally:
+        proc.terminate()
+        proc.wait()
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Event listener replicas sharing block ranges through leases.
+
+Mines --blocks blocks of NFTPurchased logs on a stand-in node whose
+eth_getLogs answers after --get-logs-delay seconds, as a remote node does,
+then runs `event_listener.py` with LISTENER_COORDINATION=lease as 1, 2, ...
+replica processes on one database until the checkpoint reaches the head.
+Reports events/s per replica count. With --kill, one more run SIGKILLs the
+replica holding the lowest lease midway, and reports the longest checkpoint
+stall, which the lease timeout bounds.
+
+Every run is checked for exactly-once application: one processed_events row
+and one completed trade in the market counters per log, every transaction
+completed, no leases left behind, and each token owned by its last buyer
+(ranges applied in block order).
+
+    python benchmarks/listener_replicas.py --replicas 1,2,4 --kill
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from eth_utils import keccak
+
+from common import BACKEND_DIR
+from standin_node import StandInNode, word
+
+CONTRACT_ADDRESS = "0x1b8640FA1A03959F7aCD78f988462D477C3c3639"
+NFT_ABI_PATH = os.path.join(BACKEND_DIR, "..", "frontend", "src", "contracts", "MememonizeNFT.json")
+TOPIC = "0x" + keccak(text="NFTPurchased(uint256,address,address,uint256)").hex()
+SELLER = "0x" + "11" * 20
+TOKENS = 200
+
+def buyer(n):
+    return "0x" + format(n + 1, "040x")
+
+def mine_chain(node, blocks, per_block):
+    """Purchase n buys token n % TOKENS in transaction word(n + 1)"""
+    chain = []
+    for block in range(blocks):
+        chain.append([{
+            "address": CONTRACT_ADDRESS,
+            "topics": [TOPIC, word(n % TOKENS), word(SELLER), word(buyer(n))],
+            "data": word(10 ** 18),
+            "transactionHash": word(n + 1),
+        } for n in range(block * per_block, (block + 1) * per_block)])
+    return node.mine_many(chain)
+
+def seed(database_url, purchases):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    # database.py builds its own engine on import; the replicas get the real URL
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    from database import Base
+    import models
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all(models.Asset(id=token + 1, name=f"Owl {token}", price=1, category="bench",
+                                token_id=str(token), owner_address=SELLER) for token in range(TOKENS))
+        db.add_all(models.Transaction(asset_id=n % TOKENS + 1, price=1, transaction_hash=word(n + 1),
+                                      status="pending") for n in range(purchases))
+        db.commit()
+    return engine
+
+def checkpoint(engine):
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(
+            "SELECT last_block FROM listener_checkpoints WHERE name = 'indexer'"
+        ).scalar()
+
+def lowest_lease_owner(engine):
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(
+            "SELECT owner FROM listener_leases ORDER BY from_block LIMIT 1"
+        ).scalar()
+
+def verify(engine, purchases):
+    """Problems found in the indexed data, empty when every log was applied exactly once"""
+    problems = []
+    with engine.connect() as connection:
+        def scalar(sql):
+            return connection.exec_driver_sql(sql).scalar()
+
+        processed = scalar("SELECT COUNT(*) FROM processed_events")
+        if processed != purchases:
+            problems.append(f"{processed} processed events for {purchases} logs")
+        completed = scalar("SELECT COALESCE(SUM(completed_trades), 0) FROM category_stats")
+        if completed != purchases:
+            problems.append(f"{completed} completed trades counted for {purchases} purchases")
+        pending = scalar("SELECT COUNT(*) FROM transactions WHERE status != 'completed'")
+        if pending:
+            problems.append(f"{pending} transactions not completed")
+        leases = scalar("SELECT COUNT(*) FROM listener_leases")
+        if leases:
+            problems.append(f"{leases} leases left behind")
+        owners = dict(connection.exec_driver_sql("SELECT token_id, owner_address FROM assets").all())
+    last_buyer = {str(n % TOKENS): buyer(n) for n in range(purchases)}
+    wrong = [token for token, owner in last_buyer.items() if (owners.get(token) or "").lower() != owner]
+    if wrong:
+        problems.append(f"{len(wrong)} tokens not owned by their last buyer")
+    return problems
+
+def run(args, replicas, kill=False):
+    node = StandInNode(subscriptions=False, get_logs_delay=args.get_logs_delay).start()
+    directory = tempfile.mkdtemp()
+    database_url = f"sqlite:///{os.path.join(directory, 'replicas.db')}"
+    purchases = args.blocks * args.per_block
+    engine = seed(database_url, purchases)
+
+    processes = {}
+    for index in range(replicas):
+        replica_id = f"replica-{index + 1}"
+        env = dict(
+            os.environ, DATABASE_URL=database_url, CACHE_URL="none", LIVE_UPDATES_URL="none",
+            WS_PROVIDER_URL=node.url, CONTRACT_ADDRESS=CONTRACT_ADDRESS, CONTRACT_ABI_PATH=NFT_ABI_PATH,
+            LISTENER_COORDINATION="lease", LISTENER_REPLICA_ID=replica_id, LISTENER_START_BLOCK="1",
+            LISTENER_LEASE_SECONDS=str(args.lease_seconds), BACKFILL_CHUNK_SIZE=str(args.chunk),
+            LISTENER_MIN_POLL_INTERVAL="0.1", LISTENER_MAX_POLL_INTERVAL="0.2", LISTENER_METRICS_PORT="0",
+        )
+        log = open(os.path.join(directory, f"{replica_id}.log"), "w")
+        processes[replica_id] = (subprocess.Popen(
+            [sys.executable, "event_listener.py"], cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+        ), log)
+    try:
+        deadline = time.time() + 60
+        while node.connections < replicas:
+            if time.time() > deadline:
+                raise RuntimeError("replicas did not connect to the node")
+            time.sleep(0.05)
+
+        # Mined once every replica is up, so the timing excludes interpreter start-up
+        start = time.perf_counter()
+        head = mine_chain(node, args.blocks, args.per_block)
+        killed, last, last_moved, stall = None, None, start, 0.0
+        while True:
+            now = time.perf_counter()
+            block = checkpoint(engine)
+            if block != last:
+                stall = max(stall, now - last_moved)
+                last, last_moved = block, now
+            if block == head:
+                break
+            if now - start > args.timeout:
+                raise RuntimeError(f"checkpoint at block {block} of {head} after {args.timeout}s")
+            if kill and killed is None and block and block >= head // 3:
+                killed = lowest_lease_owner(engine)
+                if killed:
+                    processes[killed][0].send_signal(signal.SIGKILL)
+            time.sleep(0.02)
+        elapsed = time.perf_counter() - start
+    finally:
+        for proc, log in processes.values():
+            proc.terminate()
+            proc.wait()
+            log.close()
+
+    takeovers = 0
+    for replica_id in processes:
+        with open(os.path.join(directory, f"{replica_id}.log")) as log:
+            takeovers += sum("Took over" in line for line in log)
+    problems = verify(engine, purchases)
+    label = f"{replicas} replica{'s' if replicas > 1 else ''}" + (f", {killed} killed" if killed else "")
+    print(f"{label:<28} events={purchases} elapsed={elapsed:6.2f}s events/s={purchases / elapsed:7.0f} "
+          f"longest stall={stall:5.2f}s takeovers={takeovers} "
+          + ("OK" if not problems else "FAILED: " + "; ".join(problems)))
+    return not problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Event listener replica scaling benchmark")
+    parser.add_argument("--replicas", default="1,2,4", help="Comma-separated replica counts")
+    parser.add_argument("--blocks", type=int, default=400)
+    parser.add_argument("--per-block", type=int, default=10, help="NFTPurchased logs per block")
+    parser.add_argument("--chunk", type=int, default=10, help="Blocks per lease (BACKFILL_CHUNK_SIZE)")
+    parser.add_argument("--get-logs-delay", type=float, default=0.5, help="eth_getLogs response time (s)")
+    parser.add_argument("--lease-seconds", type=float, default=3)
+    parser.add_argument("--kill", action="store_true", help="Also run the largest count with one replica killed")
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    counts = [int(count) for count in args.replicas.split(",")]
+    ok = all([run(args, count) for count in counts])
+    if args.kill:
+        ok = run(args, max(counts), kill=True) and ok
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Fan-out of live updates to many idle Server-Sent Events connections.
+
+Opens --connections SSE streams subscribed to one asset, then updates that
+asset through the API --updates times and measures, for every connection,
+the delay between the PUT and the event arriving. Reports delivery latency,
+and the server's resident memory per connection.
+
+With --broker redis the API relays updates from a stand-in Redis server
+(benchmarks/standin_redis.py), as a multi-worker deployment would, and the
+slow-consumer path is checked too: a connection that stops reading while a
+burst is published to the channel gets a `resync` event instead of the
+server growing an unbounded backlog.
+
+    python benchmarks/live_fanout.py --connections 10000 --updates 5
+    python benchmarks/live_fanout.py --connections 10000 --broker redis
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from common import BACKEND_DIR, Timer, percentile
+from standin_redis import StandInRedis
+
+ASSET = {"name": "Fan-out owl", "description": "live", "price": 1, "category": "bench",
+         "token_id": "fanout-1", "owner_address": "0xowner"}
+
+def start_server(env, port):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+         "--backlog", "4096"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not start")
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+class Connection:
+    def __init__(self, port, path, receive_buffer=None):
+        self.port = port
+        self.path = path
+        self.receive_buffer = receive_buffer
+        self.received = []
+
+    async def open(self):
+        sock = socket.socket()
+        if self.receive_buffer:
+            # Must be set before connecting to bound the advertised window
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", self.port))
+        self.reader, self.writer = await asyncio.open_connection(sock=sock, limit=2 ** 20)
+        self.writer.write(f"GET {self.path} HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n".encode())
+        await self.writer.drain()
+        # Response headers, then the ": subscribed" comment
+        await self.reader.readuntil(b"\r\n\r\n")
+        await self.reader.readuntil(b"subscribed")
+
+    async def read(self):
+        # Chunked transfer encoding: events arrive as lines inside chunks
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            if line.startswith(b"data: "):
+                self.received.append((time.perf_counter(), json.loads(line[6:])))
+
+    def close(self):
+        self.writer.close()
+
+async def open_all(port, path, count, concurrency=200, receive_buffer=None):
+    connections = [Connection(port, path, receive_buffer) for _ in range(count)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def open_one(connection):
+        async with semaphore:
+            await connection.open()
+
+    await asyncio.gather(*(open_one(connection) for connection in connections))
+    return connections
+
+async def run(args, port, server_pid, live_url):
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+        asset_id = (await client.post("/api/assets/", json=ASSET)).json()["id"]
+        base_rss = rss_mb(server_pid)
+        with Timer() as timer:
+            connections = await open_all(port, f"/api/live/events?asset={asset_id}", args.connections)
+        readers = [asyncio.create_task(connection.read()) for connection in connections]
+        idle_rss = rss_mb(server_pid)
+        print(f"opened {len(connections)} connections in {timer.elapsed:.1f}s; "
+              f"server RSS {base_rss:.0f} -> {idle_rss:.0f} MB "
+              f"({(idle_rss - base_rss) * 1024 / len(connections):.1f} KB/connection)")
+
+        delays, totals = [], []
+        for update in range(args.updates):
+            expected = update + 1
+            start = time.perf_counter()
+            (await client.put(f"/api/assets/{asset_id}", json={**ASSET, "price": expected})).raise_for_status()
+            deadline = start + 60
+            while time.perf_counter() < deadline and any(len(c.received) < expected for c in connections):
+                await asyncio.sleep(0.01)
+            arrivals = [c.received[update][0] - start for c in connections if len(c.received) >= expected]
+            delays += arrivals
+            totals.append(max(arrivals))
+            missing = len(connections) - len(arrivals)
+            print(f"update {expected}: delivered to {len(arrivals)}/{len(connections)} "
+                  f"p50={percentile(arrivals, 50) * 1000:.1f}ms p99={percentile(arrivals, 99) * 1000:.1f}ms "
+                  f"all={max(arrivals) * 1000:.1f}ms" + (f" MISSING={missing}" if missing else ""))
+        print(f"fan-out of {args.updates} updates to {len(connections)} connections: "
+              f"p50={percentile(delays, 50) * 1000:.1f}ms p99={percentile(delays, 99) * 1000:.1f}ms "
+              f"last delivery p50={percentile(totals, 50) * 1000:.1f}ms")
+
+        for task in readers:
+            task.cancel()
+        for connection in connections:
+            connection.close()
+
+        if live_url.startswith("memory://"):
+            print("slow consumer: skipped, run with --broker redis")
+            return
+        # Slow consumer: subscribed but not reading, behind a small receive window
+        slow = (await open_all(port, f"/api/live/events?asset={asset_id}", 1, receive_buffer=4096))[0]
+        # Nothing drains the socket: the kernel buffers fill, then the server's queue
+        slow.writer.transport.pause_reading()
+        # Published straight into the channel, as the event listener does: far
+        # faster than API writes, and enough to fill the server's send buffer
+        os.environ["LIVE_UPDATES_URL"] = live_url
+        import live_updates
+
+        before = rss_mb(server_pid)
+        with Timer() as timer:
+            for start in range(0, args.burst, 500):
+                await asyncio.to_thread(live_updates.broker.publish_sync, [
+                    live_updates.asset_update(SimpleNamespace(id=asset_id, owner_address="0xowner",
+                                                              is_available=True, price=price))
+                    for price in range(start, min(start + 500, args.burst))
+                ])
+        await asyncio.sleep(1)
+        after = rss_mb(server_pid)
+        slow.writer.transport.resume_reading()
+        reader = asyncio.create_task(slow.read())
+        await asyncio.sleep(2)
+        reader.cancel()
+        types = [payload["type"] for _, payload in slow.received]
+        print(f"slow consumer after a burst of {args.burst} updates in {timer.elapsed:.1f}s: received {len(types)} "
+              f"events ({types.count('resync')} resync), server RSS {before:.0f} -> {after:.0f} MB")
+        slow.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Live update fan-out benchmark")
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--updates", type=int, default=5)
+    parser.add_argument("--burst", type=int, default=50000, help="Updates published at the slow consumer")
+    parser.add_argument("--broker", choices=["memory", "redis"], default="memory")
+    parser.add_argument("--port", type=int, default=8769)
+    args = parser.parse_args()
+
+    # Client and server each hold one descriptor per connection
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    if hard < args.connections + 100:
+        sys.exit(f"open file limit {hard} is too low for {args.connections} connections")
+
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'live.db')}"
+    live_url = StandInRedis().start().url if args.broker == "redis" else "memory://"
+    env = dict(os.environ, DATABASE_URL=database_url, CACHE_URL="none", LIVE_UPDATES_URL=live_url)
+    proc = start_server(env, args.port)
+    try:
+        asyncio.run(run(args, args.port, proc.pid, live_url))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Per-page latency of OFFSET vs keyset (cursor) pagination on the asset listing.
+
+Seeds --rows assets (1M by default) and times fetching a page at increasing
+depths. OFFSET latency grows with the depth; cursor latency stays flat.
+
+    python benchmarks/pagination.py --database-url sqlite:///bench_pages.db --rows 1000000
+"""
+import argparse
+import os
+
+from common import Timer, percentile
+
+def seed(rows, batch=50000):
+    from sqlalchemy import func, insert, select
+    from database import Base, SessionLocal, engine
+    import models
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        existing = db.scalar(select(func.count()).select_from(models.Asset))
+        for start in range(existing, rows, batch):
+            db.execute(insert(models.Asset), [
+                {"name": f"Owl {i}", "price": i % 100 + 1, "category": f"cat{i % 10}",
+                 "token_id": f"page-{i}", "owner_address": "0xbench", "is_available": True}
+                for i in range(start, min(start + batch, rows))
+            ])
+            db.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="OFFSET vs keyset pagination benchmark")
+    parser.add_argument("--database-url", default="sqlite:///bench_pages.db")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    from sqlalchemy import select
+    from database import SessionLocal
+    from pagination import encode_cursor, paginate
+    import models
+
+    seed(args.rows)
+    key = (models.Asset.id,)
+    listing = select(models.Asset).filter(models.Asset.is_available == True)
+
+    print(f"{'depth':>10} {'offset p50 ms':>14} {'cursor p50 ms':>14}")
+    with SessionLocal() as db:
+        depth = args.limit
+        while depth < args.rows:
+            # The cursor a client would hold after paging down to `depth`
+            boundary = db.scalar(paginate(select(models.Asset.id).filter(models.Asset.is_available == True),
+                                          key, skip=depth - 1, limit=1))
+            cursor = encode_cursor([boundary])
+            timings = {"offset": [], "cursor": []}
+            for _ in range(args.repeat):
+                with Timer() as t:
+                    db.scalars(paginate(listing, key, skip=depth, limit=args.limit)).all()
+                timings["offset"].append(t.elapsed)
+                with Timer() as t:
+                    db.scalars(paginate(listing, key, cursor=cursor, limit=args.limit)).all()
+                timings["cursor"].append(t.elapsed)
+                db.expunge_all()
+            print(f"{depth:>10} {percentile(timings['offset'], 50) * 1000:>14.2f} "
+                  f"{percentile(timings['cursor'], 50) * 1000:>14.2f}")
+            depth *= 10
+
+if __name__ == "__main__":
+    main()
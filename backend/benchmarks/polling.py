@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Bytes on the wire and server CPU per polling client.
+
+Simulates the React pages polling the asset and transaction lists: every
+client fetches both lists once per round. Each strategy is measured against a
+fresh uvicorn server:
+
+    plain        full body every poll, no compression
+    gzip / br    full body every poll, compressed
+    conditional  If-None-Match revalidation, gzip; unchanged lists cost a 304
+
+Bytes are counted as received on the socket (headers included); CPU is the
+server process's user+system time from /proc.
+
+    python benchmarks/polling.py --database-url sqlite:///bench_polling.db --clients 50 --rounds 20
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from common import BACKEND_DIR
+
+POLLED = ["/api/assets/?limit=100", "/api/transactions/?limit=100"]
+
+def seed(database_url, rows):
+    os.environ["DATABASE_URL"] = database_url
+    from database import Base, SessionLocal, engine
+    import models
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if db.query(models.Asset).count() >= rows:
+            return
+        owner = models.User(wallet_address="0xowner", username="owner")
+        db.add(owner)
+        db.flush()
+        db.bulk_insert_mappings(models.Asset, [
+            {"name": f"Owl {i}", "description": "a sleepy owl minted for the polling benchmark", "price": i % 100 + 1,
+             "category": f"cat{i % 10}", "token_id": f"poll-{i}", "owner_address": "0xowner",
+             "image_url": f"https://example.com/owls/{i}.png"}
+            for i in range(rows)
+        ])
+        db.bulk_insert_mappings(models.Transaction, [
+            {"asset_id": i + 1, "buyer_id": owner.id, "seller_id": owner.id, "price": i % 100 + 1,
+             "transaction_hash": f"0x{i:064x}", "status": "completed"}
+            for i in range(rows)
+        ])
+        db.commit()
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def start_server(database_url, port):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not start")
+
+def header_bytes(response):
+    return sum(len(k) + len(v) + 4 for k, v in response.headers.raw) + 17
+
+async def poll(base_url, clients, rounds, accept_encoding, conditional):
+    received = 0
+    statuses = {}
+
+    async def client_loop():
+        nonlocal received
+        etags = {}
+        headers = {"Accept-Encoding": accept_encoding}
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            for _ in range(rounds):
+                for path in POLLED:
+                    request_headers = dict(headers)
+                    if conditional and path in etags:
+                        request_headers["If-None-Match"] = etags[path]
+                    response = await client.get(path, headers=request_headers)
+                    received += response.num_bytes_downloaded + header_bytes(response)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                    if "etag" in response.headers:
+                        etags[path] = response.headers["etag"]
+
+    await asyncio.gather(*(client_loop() for _ in range(clients)))
+    return received, statuses
+
+def main():
+    parser = argparse.ArgumentParser(description="Polling cost with and without conditional GET and compression")
+    parser.add_argument("--database-url", default="sqlite:///bench_polling.db")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    seed(args.database_url, args.rows)
+    # Validators are withheld while the newest row is younger than a second
+    time.sleep(1.5)
+
+    strategies = [("plain", "identity", False), ("gzip", "gzip", False)]
+    try:
+        import brotli  # noqa: F401
+        strategies.append(("br", "br", False))
+    except ImportError:
+        print("brotli not installed, skipping br")
+    strategies.append(("conditional + gzip", "gzip", True))
+
+    polls = args.clients * args.rounds * len(POLLED)
+    print(f"{'strategy':<20} {'bytes/poll':>12} {'cpu ms/poll':>12} {'cpu ms/client':>14}  statuses")
+    for label, accept_encoding, conditional in strategies:
+        proc = start_server(args.database_url, args.port)
+        try:
+            cpu_before = cpu_seconds(proc.pid)
+            received, statuses = asyncio.run(poll(
+                f"http://127.0.0.1:{args.port}", args.clients, args.rounds, accept_encoding, conditional
+            ))
+            cpu = cpu_seconds(proc.pid) - cpu_before
+            print(f"{label:<20} {received / polls:>12.0f} {cpu * 1000 / polls:>12.2f} "
+                  f"{cpu * 1000 / args.clients:>14.1f}  {statuses}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Concurrency check for the purchase path (POST /api/transactions/).
+
+Seeds assets owned by wallets that have no user row yet, then fires
+parallel purchases from fresh buyer wallets. Every --same-wallet purchases
+share one fresh buyer, so first-time user creation races on the
+wallet_address unique index. Verifies that
+
+    * every purchase returns 201,
+    * each wallet ends up with exactly one user row,
+    * each trade references the buyer and seller rows of its wallets,
+    * each purchase commits exactly once.
+
+Exits non-zero on any violation. Point --database-url at MySQL to exercise
+real row-lock contention. SQLite allows a single writer: in the threadpool
+mode its deferred transactions (read the asset, then write) fail fast with
+"database is locked" under this load, which is SQLite's lock upgrade rule
+rather than a wallet race; --async serializes them on one connection.
+
+    python benchmarks/purchase_concurrency.py --purchases 200 --same-wallet 4 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+from common import Timer, summarize
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel first purchases from fresh wallets")
+    parser.add_argument("--database-url")
+    parser.add_argument("--purchases", type=int, default=200)
+    parser.add_argument("--same-wallet", type=int, default=4, help="Purchases sharing each fresh buyer wallet")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--async", dest="async_mode", action="store_true", help="Run against the async engine")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'purchases.db')}"
+    os.environ["DB_ASYNC"] = "true" if args.async_mode else "false"
+    from sqlalchemy import event, func, select
+    import database
+    import main as api
+    import models
+
+    run = f"{time.time_ns():x}"
+    with database.SessionLocal() as db:
+        assets = [
+            models.Asset(name=f"Owl {i}", price=1, token_id=f"race-{run}-{i}", owner_address=f"0xseller-{run}-{i % 10}")
+            for i in range(args.purchases)
+        ]
+        db.add_all(assets)
+        db.commit()
+        asset_ids = [asset.id for asset in assets]
+    purchases = [
+        {"asset_id": asset_id, "price": 1, "buyer_address": f"0xbuyer-{run}-{i // args.same_wallet}"}
+        for i, asset_id in enumerate(asset_ids)
+    ]
+
+    commits = []
+    engine = database.async_engine.sync_engine if database.async_engine is not None else database.engine
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+
+    async def fire():
+        latencies, statuses = [], {}
+        semaphore = asyncio.Semaphore(args.concurrency)
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+            async def purchase(body):
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/api/transactions/", json=body)
+                    latencies.append(time.perf_counter() - start)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                    if response.status_code != 201:
+                        print(f"purchase of asset {body['asset_id']} failed: {response.status_code} {response.text[:200]}")
+            with Timer() as timer:
+                await asyncio.gather(*(purchase(body) for body in purchases))
+        return latencies, statuses, timer.elapsed
+
+    latencies, statuses, elapsed = asyncio.run(fire())
+    summarize("parallel purchases", latencies, elapsed)
+
+    failures = []
+    if statuses.get(201, 0) != len(purchases):
+        failures.append(f"statuses {statuses}")
+    if len(commits) != len(purchases):
+        failures.append(f"{len(commits)} commits for {len(purchases)} purchases")
+
+    wallets = {body["buyer_address"] for body in purchases} | {
+        f"0xseller-{run}-{i}" for i in range(min(10, args.purchases))
+    }
+    with database.SessionLocal() as db:
+        per_wallet = dict(db.execute(
+            select(models.User.wallet_address, func.count()).where(models.User.wallet_address.in_(wallets))
+            .group_by(models.User.wallet_address)
+        ).all())
+        duplicated = {wallet: count for wallet, count in per_wallet.items() if count != 1}
+        missing = wallets - per_wallet.keys()
+        if duplicated or missing:
+            failures.append(f"user rows: duplicated={duplicated} missing={sorted(missing)[:5]}")
+
+        users = dict(db.execute(select(models.User.wallet_address, models.User.id).where(
+            models.User.wallet_address.in_(wallets)
+        )).all())
+        trades = db.execute(select(models.Transaction.asset_id, models.Transaction.buyer_id, models.Transaction.seller_id)
+                            .where(models.Transaction.asset_id.in_(asset_ids))).all()
+        expected = {
+            body["asset_id"]: (users.get(body["buyer_address"]), users.get(f"0xseller-{run}-{i % 10}"))
+            for i, body in enumerate(purchases)
+        }
+        wrong = [asset_id for asset_id, buyer_id, seller_id in trades if expected[asset_id] != (buyer_id, seller_id)]
+        if len(trades) != len(purchases) or wrong:
+            failures.append(f"{len(trades)} trades, {len(wrong)} with wrong buyer/seller")
+
+    print(f"wallets={len(wallets)} commits={len(commits)} statuses={statuses}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return not failures
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
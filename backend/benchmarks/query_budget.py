@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Query-count regression check for the API routers.
+
+Seeds a throwaway SQLite database, calls every router endpoint with a
+realistic page size and counts the SQL statements each request executes.
+Exits non-zero if any endpoint goes over its budget, so an N+1 regression
+(for example a relationship lazy-loaded per row) fails loudly.
+
+    python benchmarks/query_budget.py [--async]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from common import BACKEND_DIR
+
+ROWS = 100
+
+# (method, path, json body, expected status, maximum statements)
+# Read endpoints run one validator aggregate (conditional.py) before loading rows
+BUDGETS = [
+    ("GET", "/api/assets/?limit=100", None, 200, 2),
+    ("GET", "/api/assets/1", None, 200, 2),
+    ("POST", "/api/assets/", {"name": "Budget", "price": 1, "token_id": "budget-1", "owner_address": "0xowner"}, 201, 2),
+    ("PUT", "/api/assets/2", {"name": "Renamed", "price": 2, "token_id": "asset-1", "owner_address": "0xowner"}, 200, 3),
+    ("GET", "/api/search/?query=owl", None, 200, 2),
+    ("GET", "/api/search/categories", None, 200, 1),
+    ("GET", "/api/transactions/?limit=100", None, 200, 2),
+    ("GET", "/api/transactions/1", None, 200, 2),
+    ("GET", "/api/transactions/user/1", None, 200, 2),
+    # Includes the market statistics counter upserts
+    ("POST", "/api/transactions/", {"asset_id": 3, "price": 1, "buyer_address": "0xbuyer-0"}, 201, 7),
+    ("GET", "/api/stats/", None, 200, 4),
+    ("GET", "/api/stats/daily?days=30", None, 200, 1),
+    ("GET", "/api/users/?limit=100", None, 200, 2),
+    ("GET", "/api/users/1", None, 200, 2),
+    ("GET", "/api/users/wallet/0xbuyer-1", None, 200, 2),
+    ("POST", "/api/users/", {"wallet_address": "0xbuyer-1"}, 201, 1),
+    ("PUT", "/api/users/2", {"wallet_address": "0xbuyer-0", "username": "renamed"}, 200, 3),
+    # Deleting an asset nulls the asset_id of its transactions first
+    ("DELETE", "/api/assets/4", None, 204, 4),
+]
+
+def seed(db, models):
+    owner = models.User(wallet_address="0xowner", username="owner")
+    buyers = [models.User(wallet_address=f"0xbuyer-{i}", username=f"buyer{i}") for i in range(ROWS)]
+    assets = [
+        models.Asset(name=f"Owl {i}", description="sleepy owl", price=i + 1, category=f"cat{i % 5}",
+                     token_id=f"asset-{i}", owner_address="0xowner")
+        for i in range(ROWS)
+    ]
+    db.add_all([owner, *buyers, *assets])
+    db.flush()
+    db.add_all([
+        models.Transaction(asset_id=assets[i].id, buyer_id=buyers[i].id, seller_id=owner.id, price=i + 1,
+                           transaction_hash=f"0x{i:064x}")
+        for i in range(ROWS)
+    ])
+    # Give buyer 0 (user 2) a second page worth of trades; user 1 is the seller of every trade
+    db.add_all([
+        models.Transaction(asset_id=assets[i].id, buyer_id=buyers[0].id, seller_id=owner.id, price=1)
+        for i in range(ROWS)
+    ])
+    db.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-endpoint SQL query budget check")
+    parser.add_argument("--async", dest="async_mode", action="store_true", help="Run against the async engine")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'budget.db')}"
+    os.environ["DB_ASYNC"] = "true" if args.async_mode else "false"
+    os.chdir(BACKEND_DIR)
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    import database
+    import main as api
+    import models
+
+    with database.SessionLocal() as db:
+        seed(db, models)
+
+    statements = []
+    engine = database.async_engine.sync_engine if database.async_engine is not None else database.engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    failures = 0
+    with TestClient(api.app) as client:
+        for method, path, body, expected_status, budget in BUDGETS:
+            statements.clear()
+            response = client.request(method, path, json=body)
+            used = len(statements)
+            ok = response.status_code == expected_status and used <= budget
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {method:<6} {path:<32} status={response.status_code} "
+                  f"queries={used} budget={budget}")
+            if not ok and used > budget:
+                for statement in statements:
+                    print(f"       {' '.join(statement.split())[:120]}")
+    return failures == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Read-heavy load benchmark of the asset read-through cache.
+
+Starts one uvicorn server per cache backend (disabled, in-process, and Redis
+via the stand-in server when the redis package is installed), drives it with
+a mix of asset, listing and category reads plus a small share of asset
+updates that invalidate the cache, and reports read latency and the hit ratio.
+
+    python benchmarks/read_cache.py --database-url sqlite:///bench_cache.db --concurrency 50 --write-ratio 0.01
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+
+from common import BACKEND_DIR, Timer, summarize
+
+def seed(database_url, assets):
+    os.environ["DATABASE_URL"] = database_url
+    from database import Base, SessionLocal, engine
+    import models
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if db.query(models.Asset).count() >= assets:
+            return
+        db.bulk_insert_mappings(models.Asset, [
+            {"name": f"Owl {i}", "description": "benchmark owl", "price": i % 100 + 1,
+             "category": f"cat{i % 10}", "token_id": f"cache-{i}", "owner_address": "0xbench"}
+            for i in range(assets)
+        ])
+        db.commit()
+
+def start_server(database_url, cache_url, port):
+    env = dict(os.environ, DATABASE_URL=database_url, CACHE_URL=cache_url)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not start")
+
+async def drive(base_url, concurrency, requests, hot_assets, write_ratio, seed_value=7):
+    latencies = []
+    counter = iter(range(requests))
+    rng = random.Random(seed_value)
+
+    def next_read():
+        roll = rng.random()
+        if roll < 0.6:
+            return f"/api/assets/{rng.randint(1, hot_assets)}"
+        if roll < 0.9:
+            return "/api/assets/?limit=20"
+        return "/api/search/categories"
+
+    async def worker(client):
+        for _ in counter:
+            if rng.random() < write_ratio:
+                asset_id = rng.randint(1, hot_assets)
+                response = await client.put(f"/api/assets/{asset_id}", json={
+                    "name": f"Owl {asset_id}", "description": "benchmark owl", "price": rng.randint(1, 100),
+                    "category": f"cat{asset_id % 10}", "token_id": f"cache-{asset_id - 1}", "owner_address": "0xbench",
+                })
+                response.raise_for_status()
+                continue
+            path = next_read()
+            start = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        with Timer() as timer:
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        stats = (await client.get("/api/health/cache")).json()
+    return latencies, timer.elapsed, stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Cached vs uncached asset read benchmark")
+    parser.add_argument("--database-url", default="sqlite:///bench_cache.db")
+    parser.add_argument("--assets", type=int, default=10000)
+    parser.add_argument("--hot-assets", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--write-ratio", type=float, default=0.01)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    seed(args.database_url, args.assets)
+    backends = [("uncached", "none"), ("memory cache", "memory://")]
+    try:
+        import redis  # noqa: F401
+        from standin_redis import StandInRedis
+
+        backends.append(("redis cache (stand-in)", StandInRedis().start().url))
+    except ImportError:
+        print("redis package not installed, skipping the Redis backend")
+
+    for label, cache_url in backends:
+        proc = start_server(args.database_url, cache_url, args.port)
+        try:
+            latencies, elapsed, stats = asyncio.run(drive(
+                f"http://127.0.0.1:{args.port}", args.concurrency, args.requests, args.hot_assets, args.write_ratio
+            ))
+            summarize(label, latencies, elapsed)
+            print(f"{'':<24} hits={stats['hits']} misses={stats['misses']} "
+                  f"hit_ratio={stats['hit_ratio']} invalidations={stats['invalidations']}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Read-replica routing against SQLite files standing in for a primary and two
+replicas.
+
+A replicator thread copies the primary into each replica with the SQLite
+backup API every --lag seconds, like asynchronous replication. Against one
+uvicorn server configured with DATABASE_REPLICA_URLS, the script checks:
+
+  * balancing: concurrent GET traffic is spread over the replicas, and the
+    primary serves none of it (connection checkouts per engine);
+  * read-your-writes: right after POST /api/transactions/, the buyer's
+    wallet reads its user record and trade history from the primary
+    (X-Wallet-Address header), while anonymous reads of the same rows are
+    served by a lagging replica and miss them;
+  * health checks: a replica whose file is damaged stops receiving reads
+    within REPLICA_HEALTH_INTERVAL, reads keep succeeding, and it is used
+    again once repaired.
+
+    python benchmarks/read_replicas.py --requests 2000 --lag 2
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from common import BACKEND_DIR, Timer, summarize
+
+ASSET = {"name": "Replica owl", "description": "routing", "price": 1, "category": "bench",
+         "owner_address": "0x" + "22" * 20}
+
+class Replicator:
+    """Copies the primary into every replica that is not paused, every `lag` seconds"""
+
+    def __init__(self, primary, replicas, lag):
+        self.primary = primary
+        self.replicas = replicas
+        self.lag = lag
+        self.paused = set()
+        self._stop = threading.Event()
+
+    def copy(self, replica):
+        with sqlite3.connect(self.primary) as source, sqlite3.connect(replica) as target:
+            source.backup(target)
+
+    def run(self):
+        while not self._stop.wait(self.lag):
+            for replica in self.replicas:
+                if replica not in self.paused:
+                    self.copy(replica)
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+def start_server(env, port):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not start")
+
+def checkouts(client):
+    return {name: status.get("checkouts", 0) for name, status in client.get("/api/health/pool").json().items()}
+
+def healthy(client):
+    return {name: status["healthy"] for name, status in client.get("/api/health/pool").json().items()
+            if "healthy" in status}
+
+async def drive(base_url, requests, concurrency, asset_ids):
+    latencies, failures = [], 0
+    counter = iter(range(requests))
+
+    async def worker(client):
+        nonlocal failures
+        for i in counter:
+            path = ("/api/assets/", f"/api/assets/{asset_ids[i % len(asset_ids)]}", "/api/search/?query=owl")[i % 3]
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            failures += response.status_code != 200
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        with Timer() as timer:
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return latencies, timer.elapsed, failures
+
+def balancing(args, client, base_url, asset_ids, label):
+    before = checkouts(client)
+    latencies, elapsed, failures = asyncio.run(drive(base_url, args.requests, args.concurrency, asset_ids))
+    after = checkouts(client)
+    summarize(label, latencies, elapsed)
+    served = {name: after[name] - before.get(name, 0) for name in after}
+    print(f"  checkouts per engine (health checks included): {served}  failed requests: {failures}")
+    return served, failures
+
+def damage(path):
+    """Overwrite the file header in place, as a disk fault would"""
+    with open(path, "r+b") as file:
+        file.write(b"\0" * 100)
+
+def repair(path, primary):
+    """Restore the replica's contents in place, so connections already open on it recover"""
+    snapshot = path + ".restore"
+    with sqlite3.connect(primary) as source, sqlite3.connect(snapshot) as target:
+        source.backup(target)
+    with open(snapshot, "rb") as restored, open(path, "r+b") as file:
+        file.write(restored.read())
+        file.truncate()
+    os.remove(snapshot)
+
+def main():
+    parser = argparse.ArgumentParser(description="Read-replica routing check")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--lag", type=float, default=2.0, help="Seconds between replication passes")
+    parser.add_argument("--trades", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8770)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    primary = os.path.join(directory, "primary.db")
+    replicas = [os.path.join(directory, f"replica-{i}.db") for i in (1, 2)]
+    health_interval = 0.5
+    env = dict(
+        os.environ, DATABASE_URL=f"sqlite:///{primary}", CACHE_URL="none",
+        DATABASE_REPLICA_URLS=",".join(f"sqlite:///{replica}" for replica in replicas),
+        REPLICA_HEALTH_INTERVAL=str(health_interval), READ_YOUR_WRITES_SECONDS=str(int(args.lag * 2) + 1),
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    proc = start_server(env, args.port)
+    replicator = Replicator(primary, replicas, args.lag)
+    ok = True
+    try:
+        client = httpx.Client(base_url=base_url, timeout=30)
+        asset_ids = [client.post("/api/assets/", json={**ASSET, "token_id": f"replica-{i}"}).json()["id"]
+                     for i in range(args.trades * 2)]
+        for replica in replicas:
+            replicator.copy(replica)
+        replicator.start()
+        time.sleep(health_interval * 3)
+
+        served, failures = balancing(args, client, base_url, asset_ids, "replicas 1+2")
+        ok &= not failures and served["sync"] == 0 and all(served[f"replica-{i}"] > 0 for i in (1, 2))
+
+        # Read-your-writes: each trade is read back at once, before replication catches up
+        own_stale = anonymous_stale = 0
+        for i in range(args.trades):
+            wallet = "0x" + format(0xb000 + i, "040x")
+            created = client.post("/api/transactions/", json={
+                "asset_id": asset_ids[i], "price": 1, "buyer_address": wallet, "transaction_hash": f"0x{i:064x}",
+            }).json()
+            buyer_id = created["buyer"]["id"]
+            own = client.get(f"/api/transactions/user/{buyer_id}", headers={"X-Wallet-Address": wallet})
+            own_user = client.get(f"/api/users/wallet/{wallet}")
+            own_stale += own.status_code != 200 or not own.json() or own_user.status_code != 200
+            anonymous = client.get(f"/api/users/{buyer_id}")
+            anonymous_stale += anonymous.status_code == 404
+        print(f"read-your-writes over {args.trades} trades: stale reads by the buyer {own_stale}, "
+              f"by anonymous readers {anonymous_stale} (replicas {args.lag}s behind)")
+        ok &= own_stale == 0
+
+        # Health checks: damage replica-1, then repair it
+        replicator.paused.add(replicas[0])
+        damage(replicas[0])
+        time.sleep(health_interval * 3)
+        print(f"replica-1 damaged: healthy={healthy(client)}")
+        served, failures = balancing(args, client, base_url, asset_ids, "replica 1 down")
+        # Its only checkouts are the health checks
+        ok &= not failures and served["replica-1"] < served["replica-2"] / 10
+        repair(replicas[0], primary)
+        replicator.paused.discard(replicas[0])
+        time.sleep(health_interval * 3)
+        print(f"replica-1 repaired: healthy={healthy(client)}")
+        served, failures = balancing(args, client, base_url, asset_ids, "replicas 1+2 again")
+        ok &= not failures and served["replica-1"] > 0
+    finally:
+        replicator.stop()
+        proc.terminate()
+        proc.wait()
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Migration check: databases from before the migrations must reach the
+current schema through `db_manager.py migrate`.
+
+Two throwaway SQLite databases are migrated to head:
+
+  * baseline: built by create_all from the models as they were before
+    migrations existed (BASELINE below, kept as a copy on purpose), with a
+    user, an asset and a transaction in it;
+  * empty: no tables at all, seeded with the same rows once migrated.
+
+Each is compared with the schema create_all builds from the current models
+(tables, columns and named indexes), then served by uvicorn while the read
+endpoints are called; every one must answer 200. Exits non-zero on any
+difference or failed request, e.g. a column added to a model without a
+migration that adds it to existing tables.
+
+    python benchmarks/schema_upgrade.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import sqlalchemy as sa
+
+from common import BACKEND_DIR
+
+# The tables create_all built before migrations existed; never update this
+BASELINE = sa.MetaData()
+sa.Table(
+    "assets", BASELINE,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("name", sa.String(100), nullable=False),
+    sa.Column("description", sa.Text),
+    sa.Column("price", sa.Float, nullable=False),
+    sa.Column("image_url", sa.String(255)),
+    sa.Column("category", sa.String(50)),
+    sa.Column("token_id", sa.String(100), unique=True),
+    sa.Column("owner_address", sa.String(100)),
+    sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+    sa.Column("updated_at", sa.DateTime, server_default=sa.func.now()),
+    sa.Column("is_available", sa.Boolean),
+)
+sa.Table(
+    "users", BASELINE,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("wallet_address", sa.String(100), unique=True, index=True),
+    sa.Column("username", sa.String(50)),
+    sa.Column("email", sa.String(100)),
+    sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+)
+sa.Table(
+    "transactions", BASELINE,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("asset_id", sa.Integer, sa.ForeignKey("assets.id")),
+    sa.Column("buyer_id", sa.Integer, sa.ForeignKey("users.id")),
+    sa.Column("seller_id", sa.Integer, sa.ForeignKey("users.id")),
+    sa.Column("price", sa.Float, nullable=False),
+    sa.Column("transaction_hash", sa.String(100)),
+    sa.Column("status", sa.String(20)),
+    sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+    sa.Column("updated_at", sa.DateTime, server_default=sa.func.now()),
+)
+
+ENDPOINTS = [
+    "/api/assets/",
+    "/api/assets/1",
+    "/api/assets/owner/0xowner",
+    "/api/search/?query=owl",
+    "/api/search/?query=x",
+    "/api/search/categories",
+    "/api/users/",
+    "/api/users/1",
+    "/api/transactions/",
+    "/api/transactions/1",
+    "/api/transactions/user/1",
+    "/api/stats/",
+]
+
+def seed(url):
+    """A user, an asset and a trade, written through the baseline columns"""
+    engine = sa.create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(BASELINE.tables["users"].insert(), [
+            {"wallet_address": "0xowner", "username": "owner"}, {"wallet_address": "0xbuyer", "username": "buyer"},
+        ])
+        conn.execute(BASELINE.tables["assets"].insert(), {
+            "name": "Sleepy Owl", "description": "A sleepy owl", "price": 1, "category": "owls",
+            "token_id": "1", "owner_address": "0xowner", "is_available": True,
+        })
+        conn.execute(BASELINE.tables["transactions"].insert(), {
+            "asset_id": 1, "buyer_id": 2, "seller_id": 1, "price": 1, "transaction_hash": "0x01", "status": "pending",
+        })
+    engine.dispose()
+
+def schema(url):
+    """{table: (column names, index names)} of the database at `url`"""
+    engine = sa.create_engine(url)
+    inspector = sa.inspect(engine)
+    tables = {
+        table: (
+            {column["name"] for column in inspector.get_columns(table)},
+            {index["name"] for index in inspector.get_indexes(table) if index["name"]},
+        )
+        for table in inspector.get_table_names() if table != "alembic_version"
+    }
+    engine.dispose()
+    return tables
+
+def compare(expected, actual):
+    problems = []
+    for table, (columns, indexes) in sorted(expected.items()):
+        if table not in actual:
+            problems.append(f"table {table} missing")
+            continue
+        problems += [f"column {table}.{name} missing" for name in sorted(columns - actual[table][0])]
+        problems += [f"index {name} on {table} missing" for name in sorted(indexes - actual[table][1])]
+    return problems
+
+def start_server(env, port):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not start")
+
+def check(label, url, expected, port, seed_after=False):
+    from db_manager import migrate
+
+    if not migrate({"url": url}):
+        print(f"FAIL {label}: migration failed")
+        return False
+    if seed_after:
+        seed(url)
+    problems = compare(expected, schema(url))
+    env = dict(os.environ, DATABASE_URL=url, CACHE_URL="none", LIVE_UPDATES_URL="none")
+    server = start_server(env, port)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            for path in ENDPOINTS:
+                status = client.get(path).status_code
+                print(f"{'ok  ' if status == 200 else 'FAIL'} {label:<8} GET {path:<28} status={status}")
+                if status != 200:
+                    problems.append(f"GET {path} answered {status}")
+    finally:
+        server.terminate()
+        server.wait()
+    for problem in problems:
+        print(f"FAIL {label}: {problem}")
+    return not problems
+
+def main():
+    workdir = tempfile.mkdtemp()
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'reference.db')}"
+
+    from database import Base, engine
+    import models  # noqa: F401  (registers the tables)
+
+    # What the current models build from scratch
+    Base.metadata.create_all(engine)
+    expected = schema(os.environ["DATABASE_URL"])
+
+    baseline_url = f"sqlite:///{os.path.join(workdir, 'baseline.db')}"
+    baseline_engine = sa.create_engine(baseline_url)
+    BASELINE.create_all(baseline_engine)
+    baseline_engine.dispose()
+    seed(baseline_url)
+    ok = check("baseline", baseline_url, expected, 8773)
+    ok &= check("empty", f"sqlite:///{os.path.join(workdir, 'empty.db')}", expected, 8774, seed_after=True)
+    print("OK" if ok else "FAILED")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
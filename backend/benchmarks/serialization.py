@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Serialization cost per row for every schema in schemas.py.
+
+For each schema, compares the default path (Pydantic validation of every
+row, then JSON encoding, as FastAPI does for response_model) with the fast
+path (fast_json: plain dicts encoded by orjson, or the stdlib encoder when
+orjson is missing).
+
+Response schemas backed by a model (Asset, User, Transaction) are also timed
+end to end, from executing the page query to JSON bytes: ORM objects
+through Pydantic vs column projections.
+
+    python benchmarks/serialization.py --rows 100 --repeat 200
+"""
+import argparse
+import os
+import time
+from typing import List
+
+from common import percentile
+
+def seed(db, models, rows):
+    owner = models.User(wallet_address="0xowner", username="owner", email="owner@example.com")
+    buyers = [models.User(wallet_address=f"0xbuyer-{i}", username=f"buyer{i}") for i in range(rows)]
+    assets = [
+        models.Asset(name=f"Owl {i}", description="a sleepy owl", price=i + 1.5, category=f"cat{i % 5}",
+                     token_id=f"ser-{i}", owner_address="0xowner", image_url=f"https://example.com/{i}.png")
+        for i in range(rows)
+    ]
+    db.add_all([owner, *buyers, *assets])
+    db.flush()
+    db.add_all([
+        models.Transaction(asset_id=assets[i].id, buyer_id=buyers[i].id, seller_id=owner.id, price=i + 1,
+                           transaction_hash=f"0x{i:064x}", status="completed")
+        for i in range(rows)
+    ])
+    db.commit()
+
+def time_per_row(fn, rows, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) / rows * 1e6)
+    return percentile(samples, 50)
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-schema serialization microbenchmarks")
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = "sqlite://"
+    from pydantic import BaseModel, TypeAdapter
+    from sqlalchemy import select
+    from sqlalchemy.orm import joinedload
+    from database import Base, SessionLocal, engine
+    from fast_json import dumps, orjson
+    from routers.assets import ASSET_PROJECTION
+    from routers.transactions import TRANSACTION_PROJECTION
+    from routers.users import USER_PROJECTION
+    import models
+    import schemas
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    seed(db, models, args.rows)
+
+    response_schemas = {
+        schemas.Asset: (select(models.Asset).limit(args.rows), ASSET_PROJECTION),
+        schemas.User: (select(models.User).limit(args.rows), USER_PROJECTION),
+        schemas.Transaction: (
+            select(models.Transaction).options(
+                joinedload(models.Transaction.asset), joinedload(models.Transaction.buyer),
+                joinedload(models.Transaction.seller),
+            ).limit(args.rows),
+            TRANSACTION_PROJECTION,
+        ),
+    }
+    # Dict rows for schemas without a model of their own
+    samples = {schema: projection.apply(statement) for schema, (statement, projection) in response_schemas.items()}
+    dict_rows = {schema: [build(row) for row in db.execute(projected).all()]
+                 for schema, (projected, build) in samples.items()}
+    source_for = {
+        schemas.AssetBase: schemas.Asset, schemas.AssetCreate: schemas.Asset,
+        schemas.UserBase: schemas.User, schemas.UserCreate: schemas.User,
+        schemas.TransactionBase: schemas.Transaction, schemas.TransactionCreate: schemas.Transaction,
+    }
+
+    print(f"encoder: {'orjson' if orjson is not None else 'json (orjson not installed)'}, rows={args.rows}")
+    print(f"{'schema':<20} {'pydantic us/row':>16} {'fast us/row':>12} {'speedup':>8}")
+    all_schemas = [obj for obj in vars(schemas).values()
+                   if isinstance(obj, type) and issubclass(obj, BaseModel) and obj.__module__ == schemas.__name__]
+    for schema in all_schemas:
+        adapter = TypeAdapter(List[schema])
+        if schema in response_schemas:
+            statement, _ = response_schemas[schema]
+            objects = db.scalars(statement).unique().all()
+            rows = dict_rows[schema]
+            default = lambda: adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+        else:
+            if schema is schemas.SearchQuery:
+                rows = [{"query": f"owl {i}", "category": "cat1"} for i in range(args.rows)]
+            else:
+                fields = schema.model_fields
+                rows = [{k: v for k, v in row.items() if k in fields} for row in dict_rows[source_for[schema]]]
+            default = lambda: adapter.dump_json(adapter.validate_python(rows))
+        fast = lambda: dumps(rows)
+        slow_us = time_per_row(default, len(rows), args.repeat)
+        fast_us = time_per_row(fast, len(rows), args.repeat)
+        print(f"{schema.__name__:<20} {slow_us:>16.2f} {fast_us:>12.2f} {slow_us / fast_us:>7.1f}x")
+
+    print()
+    print(f"{'query + encode':<20} {'ORM+pydantic':>16} {'projection':>12} {'speedup':>8}")
+    for schema, (statement, projection) in response_schemas.items():
+        adapter = TypeAdapter(List[schema])
+
+        def default():
+            objects = db.scalars(statement).unique().all()
+            adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+            db.expunge_all()
+
+        def fast():
+            projected, build = projection.apply(statement)
+            dumps([build(row) for row in db.execute(projected).all()])
+
+        slow_us = time_per_row(default, args.rows, args.repeat)
+        fast_us = time_per_row(fast, args.rows, args.repeat)
+        print(f"{schema.__name__:<20} {slow_us:>16.2f} {fast_us:>12.2f} {slow_us / fast_us:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Minimal stand-in Ethereum node for listener benchmarks.
+
+Serves the handful of JSON-RPC methods the event listener uses over a
+websocket (eth_blockNumber, eth_getLogs, eth_subscribe/eth_unsubscribe for
+"logs", and batches of them) from an in-memory log store. Benchmarks "mine"
+blocks of logs with mine(); matching subscriptions receive them
+immediately. `get_logs_delay` adds a fixed response time to eth_getLogs, as
+a remote node has. eth_call is answered by `call_handler(to, data)`, which
+returns the result hex string or raises to answer with an error.
+"""
+import asyncio
+import itertools
+import json
+import threading
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+def hex_int(value):
+    return hex(value)
+
+def word(value):
+    """32-byte hex word for an int or an address"""
+    if isinstance(value, str):
+        value = int(value, 16)
+    return "0x" + format(value, "064x")
+
+class StandInNode:
+    def __init__(self, host="127.0.0.1", port=0, subscriptions=True, get_logs_delay=0, call_handler=None):
+        self.host = host
+        self.port = port
+        self.subscriptions_enabled = subscriptions
+        self.get_logs_delay = get_logs_delay
+        self.call_handler = call_handler
+        # JSON-RPC requests received, batches counted once
+        self.requests = 0
+        self.block_number = 0
+        self.logs = []
+        self.subscribers = {}
+        # Open client connections, so benchmarks can wait for their clients
+        self.connections = 0
+        self._ids = itertools.count(1)
+        self._loop = None
+        self._ready = threading.Event()
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+        return self
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._serve())
+
+    async def _serve(self):
+        async with serve(self._handle, self.host, self.port, max_size=None) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await asyncio.Future()
+
+    # -- mining ------------------------------------------------------------
+
+    def mine(self, logs):
+        """Append a block containing `logs` (dicts with address/topics/data); thread-safe"""
+        return asyncio.run_coroutine_threadsafe(self._mine(logs), self._loop).result()
+
+    def mine_many(self, blocks):
+        """mine() every list of logs in `blocks` in one round trip to the node's thread"""
+        async def mine_all():
+            for logs in blocks:
+                await self._mine(logs)
+            return self.block_number
+        return asyncio.run_coroutine_threadsafe(mine_all(), self._loop).result()
+
+    async def _mine(self, logs):
+        self.block_number += 1
+        block_hash = word(self.block_number)
+        mined = []
+        for index, log in enumerate(logs):
+            entry = {
+                "address": log["address"],
+                "topics": log["topics"],
+                "data": log.get("data", "0x"),
+                "blockNumber": hex_int(self.block_number),
+                "blockHash": block_hash,
+                "transactionHash": log.get("transactionHash") or word(len(self.logs) + 1),
+                "transactionIndex": hex_int(index),
+                "logIndex": hex_int(index),
+                "removed": False,
+            }
+            self.logs.append(entry)
+            mined.append(entry)
+        for sub_id, (connection, log_filter) in list(self.subscribers.items()):
+            for entry in mined:
+                if self._matches(entry, log_filter):
+                    message = {"jsonrpc": "2.0", "method": "eth_subscription",
+                               "params": {"subscription": sub_id, "result": entry}}
+                    try:
+                        await connection.send(json.dumps(message))
+                    except Exception:
+                        self.subscribers.pop(sub_id, None)
+        return self.block_number
+
+    # -- JSON-RPC ------------------------------------------------------------
+
+    @staticmethod
+    def _matches(entry, log_filter):
+        address = log_filter.get("address")
+        if address:
+            addresses = address if isinstance(address, list) else [address]
+            if entry["address"].lower() not in {a.lower() for a in addresses}:
+                return False
+        for position, wanted in enumerate(log_filter.get("topics") or []):
+            if wanted is None:
+                continue
+            options = wanted if isinstance(wanted, list) else [wanted]
+            if position >= len(entry["topics"]) or entry["topics"][position].lower() not in {o.lower() for o in options}:
+                return False
+        return True
+
+    async def _answer(self, connection, request):
+        method, params = request["method"], request.get("params", [])
+        result, error = None, None
+        if method == "web3_clientVersion":
+            result = "StandInNode/1.0"
+        elif method in ("eth_chainId", "net_version"):
+            result = "0x539" if method == "eth_chainId" else "1337"
+        elif method == "eth_blockNumber":
+            result = hex_int(self.block_number)
+        elif method == "eth_getLogs":
+            log_filter = params[0]
+            if self.get_logs_delay:
+                await asyncio.sleep(self.get_logs_delay)
+            low, high = self._block(log_filter.get("fromBlock")), self._block(log_filter.get("toBlock"))
+            result = [entry for entry in self.logs
+                      if low <= int(entry["blockNumber"], 16) <= high and self._matches(entry, log_filter)]
+        elif method == "eth_call" and self.call_handler is not None:
+            try:
+                result = self.call_handler(params[0]["to"], params[0]["data"])
+            except Exception as e:
+                error = {"code": 3, "message": f"execution reverted: {e}"}
+        elif method == "eth_subscribe" and self.subscriptions_enabled and params[0] == "logs":
+            result = hex_int(next(self._ids))
+            self.subscribers[result] = (connection, params[1] if len(params) > 1 else {})
+        elif method == "eth_unsubscribe":
+            result = self.subscribers.pop(params[0], None) is not None
+        else:
+            error = {"code": -32601, "message": f"Method {method} not supported"}
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        response.update({"error": error} if error else {"result": result})
+        return response
+
+    def _block(self, tag):
+        if tag in (None, "latest", "pending", "safe", "finalized"):
+            return self.block_number
+        if tag == "earliest":
+            return 0
+        return int(tag, 16)
+
+    async def _handle(self, connection):
+        self.connections += 1
+        try:
+            await self._serve_requests(connection)
+        except ConnectionClosed:
+            # A client process exiting without a closing handshake
+            pass
+        finally:
+            self.connections -= 1
+
+    async def _serve_requests(self, connection):
+        async for raw in connection:
+            self.requests += 1
+            request = json.loads(raw)
+            if isinstance(request, list):
+                response = [await self._answer(connection, item) for item in request]
+            else:
+                response = await self._answer(connection, request)
+            await connection.send(json.dumps(response))
+        for sub_id in [s for s, (c, _) in self.subscribers.items() if c is connection]:
+            self.subscribers.pop(sub_id, None)
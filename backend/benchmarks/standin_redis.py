@@ -0,0 +1,128 @@
+"""
+Minimal stand-in Redis server for cache and live update benchmarks.
+
+Speaks enough RESP2 for the cache backend (PING, GET, SET [EX], DEL, INCRBY)
+from an in-memory dict, plus PUBLISH/SUBSCRIBE for the live update broker, so
+the Redis code paths can be exercised without a Redis install. Expiry is
+checked lazily on read.
+"""
+import asyncio
+import threading
+import time
+
+def bulk(value):
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+class StandInRedis:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.data = {}
+        # channel -> writers of the connections subscribed to it
+        self.channels = {}
+        self._ready = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+        return self
+
+    @property
+    def url(self):
+        return f"redis://{self.host}:{self.port}/0?protocol=2"
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(self._serve())
+
+    async def _serve(self):
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await server.serve_forever()
+
+    # -- protocol ----------------------------------------------------------
+
+    async def _read_command(self, reader):
+        header = await reader.readline()
+        if not header:
+            return None
+        if not header.startswith(b"*"):
+            return header.decode().split()
+        args = []
+        for _ in range(int(header[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                command = await self._read_command(reader)
+                if command is None:
+                    break
+                name = command[0].decode().upper() if isinstance(command[0], bytes) else command[0].upper()
+                if name in ("SUBSCRIBE", "UNSUBSCRIBE"):
+                    writer.write(self._subscribe(name, command[1:], writer))
+                else:
+                    writer.write(self._execute(command))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for writers in self.channels.values():
+                writers.discard(writer)
+            writer.close()
+
+    def _subscribe(self, name, channels, writer):
+        reply = b""
+        for channel in channels:
+            writers = self.channels.setdefault(channel, set())
+            if name == "SUBSCRIBE":
+                writers.add(writer)
+            else:
+                writers.discard(writer)
+            count = sum(writer in members for members in self.channels.values())
+            reply += b"*3\r\n%s%s:%d\r\n" % (bulk(name.lower().encode()), bulk(channel), count)
+        return reply
+
+    def _get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def _execute(self, command):
+        name = command[0].decode().upper() if isinstance(command[0], bytes) else command[0].upper()
+        args = command[1:]
+        if name == "PING":
+            return b"+PONG\r\n"
+        if name == "GET":
+            value = self._get(args[0])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == "SET":
+            expires_at = None
+            if len(args) >= 4 and args[2].upper() == b"EX":
+                expires_at = time.monotonic() + int(args[3])
+            self.data[args[0]] = (args[1], expires_at)
+            return b"+OK\r\n"
+        if name == "DEL":
+            removed = sum(self.data.pop(key, None) is not None for key in args)
+            return b":%d\r\n" % removed
+        if name in ("INCR", "INCRBY"):
+            value = int(self._get(args[0]) or 0) + (int(args[1]) if len(args) > 1 else 1)
+            self.data[args[0]] = (str(value).encode(), None)
+            return b":%d\r\n" % value
+        if name == "PUBLISH":
+            writers = self.channels.get(args[0], ())
+            for writer in writers:
+                writer.write(b"*3\r\n%s%s%s" % (bulk(b"message"), bulk(args[0]), bulk(args[1])))
+            return b":%d\r\n" % len(writers)
+        if name in ("CLIENT", "SELECT"):
+            return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % name.encode()
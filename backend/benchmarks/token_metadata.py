@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Token metadata indexer against a stand-in node and a local HTTP server
+standing in for the metadata hosts.
+
+Mines a mint (Transfer from the zero address) for each of --tokens tokens
+whose tokenURI, answered by the stand-in node's eth_call, points at the
+metadata server. The server answers after --origin-delay seconds; every
+10th token fails twice with a 503 before it is served, and every 50th is
+missing (404). `event_listener.py` runs with METADATA_WORKERS set to each
+of --workers in turn, and the script reports how long the indexer took to
+settle every token, then checks that:
+
+  * every served token is stored with its name and attributes, the flaky
+    ones after retries, and the missing ones are marked failed after
+    METADATA_MAX_ATTEMPTS downloads;
+  * tokenURIs were read in JSON-RPC batches, not one request per token;
+  * GET /api/assets/ returns the metadata with the assets, one request
+    where the frontend used to make 2 per token (tokenURI + document).
+
+    python benchmarks/token_metadata.py --tokens 400 --workers 1,8,32
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from eth_abi import encode as abi_encode
+from eth_utils import keccak
+
+from common import BACKEND_DIR, Timer
+from standin_node import StandInNode, word
+
+CONTRACT_ADDRESS = "0x1b8640FA1A03959F7aCD78f988462D477C3c3639"
+NFT_ABI_PATH = os.path.join(BACKEND_DIR, "..", "frontend", "src", "contracts", "MememonizeNFT.json")
+TRANSFER = "0x" + keccak(text="Transfer(address,address,uint256)").hex()
+TOKEN_URI = keccak(text="tokenURI(uint256)")[:4].hex()
+OWNER = "0x" + "33" * 20
+MAX_ATTEMPTS = 4
+
+def flaky(token):
+    return token % 10 == 0
+
+def missing(token):
+    return token % 50 == 25
+
+class MetadataOrigin:
+    """Serves /meta/<n>.json after `delay` seconds, counting requests per token"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.hits = {}
+        self._lock = threading.Lock()
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                token = int(self.path.removeprefix("/meta/").removesuffix(".json"))
+                with origin._lock:
+                    origin.hits[token] = hits = origin.hits.get(token, 0) + 1
+                time.sleep(origin.delay)
+                if missing(token) or (flaky(token) and hits <= 2):
+                    self.send_error(404 if missing(token) else 503)
+                    return
+                body = json.dumps({
+                    "name": f"Owl #{token}", "description": "Benchmark owl", "image": f"ipfs://owl/{token}.png",
+                    "attributes": [{"trait_type": "Eyes", "value": "sleepy" if token % 2 else "open"}],
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+def token_uri_handler(origin, tokens):
+    def call(to, data):
+        if not data.startswith("0x" + TOKEN_URI):
+            raise ValueError("unknown function")
+        token = int(data[10:], 16)
+        if token >= tokens:
+            raise ValueError("nonexistent token")
+        return "0x" + abi_encode(["string"], [f"{origin.url}/meta/{token}.json"]).hex()
+    return call
+
+def mint_all(node, tokens):
+    return node.mine_many([[{
+        "address": CONTRACT_ADDRESS,
+        "topics": [TRANSFER, word(0), word(OWNER), word(token)],
+        "data": "0x",
+        "transactionHash": word(token + 1),
+    }] for token in range(tokens)])
+
+def statuses(engine):
+    with engine.connect() as connection:
+        return dict(connection.exec_driver_sql(
+            "SELECT status, COUNT(*) FROM token_metadata GROUP BY status"
+        ).all())
+
+def verify(engine, origin, tokens):
+    problems = []
+    with engine.connect() as connection:
+        rows = {row.token_id: row for row in connection.exec_driver_sql(
+            "SELECT token_id, status, name, attributes, attempts FROM token_metadata"
+        )}
+    for token in range(tokens):
+        row = rows.get(str(token))
+        if row is None:
+            problems.append(f"token {token} was not queued")
+        elif missing(token):
+            if row.status != "failed" or origin.hits.get(token) != MAX_ATTEMPTS:
+                problems.append(f"token {token}: {row.status} after {origin.hits.get(token)} downloads")
+        elif row.status != "fetched" or row.name != f"Owl #{token}" or not json.loads(row.attributes):
+            problems.append(f"token {token}: {row.status} {row.name!r}")
+        elif origin.hits.get(token) != (3 if flaky(token) else 1):
+            problems.append(f"token {token} downloaded {origin.hits.get(token)} times")
+    return problems
+
+def start_listener(env, directory, label):
+    log = open(os.path.join(directory, f"listener-{label}.log"), "w")
+    proc = subprocess.Popen(
+        [sys.executable, "event_listener.py"], cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    return proc, log
+
+def start_server(env, port):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not start")
+
+def run(args, workers, check_api):
+    from sqlalchemy import create_engine
+
+    origin = MetadataOrigin(args.origin_delay).start()
+    node = StandInNode(call_handler=token_uri_handler(origin, args.tokens)).start()
+    directory = tempfile.mkdtemp()
+    database_url = f"sqlite:///{os.path.join(directory, 'metadata.db')}"
+    env = dict(
+        os.environ, DATABASE_URL=database_url, CACHE_URL="none", LIVE_UPDATES_URL="none",
+        WS_PROVIDER_URL=node.url, CONTRACT_ADDRESS=CONTRACT_ADDRESS, CONTRACT_ABI_PATH=NFT_ABI_PATH,
+        LISTENER_START_BLOCK="1", LISTENER_METRICS_PORT="0",
+        METADATA_WORKERS=str(workers), METADATA_BATCH_SIZE=str(args.batch_size), METADATA_POLL_INTERVAL="0.05",
+        METADATA_MAX_ATTEMPTS=str(MAX_ATTEMPTS), METADATA_RETRY_BASE_SECONDS=str(args.retry_base),
+        METADATA_RETRY_MAX_SECONDS=str(args.retry_base * 4), METADATA_ALLOW_PRIVATE_HOSTS="true",
+    )
+    proc, log = start_listener(env, directory, workers)
+    engine = create_engine(database_url)
+    try:
+        deadline = time.time() + 60
+        while node.connections < 1:
+            if time.time() > deadline:
+                raise RuntimeError("listener did not connect to the node")
+            time.sleep(0.05)
+        requests_before = node.requests
+        with Timer() as timer:
+            mint_all(node, args.tokens)
+            while True:
+                try:
+                    counts = statuses(engine)
+                except Exception:
+                    # Table not created yet
+                    counts = {}
+                if counts and sum(counts.values()) == args.tokens and not counts.get("pending"):
+                    break
+                if time.perf_counter() - timer.start > args.timeout:
+                    raise RuntimeError(f"metadata not settled after {args.timeout}s: {counts}")
+                time.sleep(0.05)
+    finally:
+        proc.terminate()
+        proc.wait()
+        log.close()
+
+    problems = verify(engine, origin, args.tokens)
+    # get_logs polls and batched tokenURI reads; a request per token would exceed the token count
+    rpc_requests = node.requests - requests_before
+    if rpc_requests >= args.tokens:
+        problems.append(f"{rpc_requests} JSON-RPC requests for {args.tokens} tokens")
+    downloads = sum(origin.hits.values())
+    print(f"workers={workers:<3} tokens={args.tokens} settled in {timer.elapsed:6.2f}s "
+          f"({args.tokens / timer.elapsed:6.1f} tokens/s) documents downloaded={downloads} "
+          f"JSON-RPC requests={rpc_requests} statuses={statuses(engine)} "
+          + ("OK" if not problems else "FAILED: " + "; ".join(problems[:5])))
+
+    if check_api and not problems:
+        port = args.port
+        server = start_server(env, port)
+        try:
+            client = httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30)
+            for token in range(args.tokens):
+                client.post("/api/assets/", json={"name": f"Owl {token}", "price": 1, "token_id": str(token)})
+            assets = client.get("/api/assets/", params={"limit": args.tokens}).json()
+            served = sum(asset["token_metadata"] is not None and asset["token_metadata"]["status"] == "fetched"
+                         for asset in assets)
+            detail = client.get(f"/api/assets/{assets[1]['id']}").json()["token_metadata"]
+            print(f"GET /api/assets/: {len(assets)} assets, {served} with fetched metadata, in 1 request "
+                  f"(tokenURI + document per token: {2 * len(assets)}); detail of token 1: {detail['name']!r}")
+            if served != sum(not missing(token) for token in range(args.tokens)) or detail["name"] != "Owl #1":
+                problems.append("metadata missing from the asset endpoints")
+        finally:
+            server.terminate()
+            server.wait()
+    return not problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Token metadata indexer benchmark")
+    parser.add_argument("--tokens", type=int, default=400)
+    parser.add_argument("--workers", default="1,8,32", help="Comma-separated METADATA_WORKERS values")
+    parser.add_argument("--batch-size", type=int, default=100, help="METADATA_BATCH_SIZE")
+    parser.add_argument("--origin-delay", type=float, default=0.05, help="Metadata host response time (s)")
+    parser.add_argument("--retry-base", type=float, default=0.2, help="METADATA_RETRY_BASE_SECONDS")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--port", type=int, default=8772)
+    args = parser.parse_args()
+
+    counts = [int(count) for count in args.workers.split(",")]
+    ok = all([run(args, workers, check_api=workers == counts[-1]) for workers in counts])
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Peak memory and throughput of GET /api/transactions/export.
+
+Grows a database of synthetic transactions through each --sizes step,
+restarts a uvicorn server for every step and streams the full export to
+/dev/null. The server's peak RSS (VmHWM from /proc) should stay flat as the
+row count grows; with --compare-list the same rows are also fetched through
+GET /api/transactions/?limit=N, whose memory grows with N.
+
+    python benchmarks/transaction_export.py --database-url sqlite:///bench_export.db --sizes 100000,1000000,5000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from common import BACKEND_DIR, Timer
+
+def seed(rows):
+    """Top the transactions table up to `rows` rows"""
+    from sqlalchemy import func, insert, select
+    from database import Base, SessionLocal, engine
+    import models
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if not db.scalar(select(func.count()).select_from(models.User)):
+            db.execute(insert(models.User), [
+                {"wallet_address": f"0xwallet{i:04d}", "username": f"user{i}"} for i in range(1000)
+            ])
+            db.execute(insert(models.Asset), [
+                {"name": f"Owl {i}", "price": i % 100 + 1, "token_id": f"export-{i}", "owner_address": f"0xwallet{i % 1000:04d}"}
+                for i in range(10000)
+            ])
+            db.commit()
+        existing = db.scalar(select(func.count()).select_from(models.Transaction))
+        for offset in range(existing, rows, 50000):
+            db.execute(insert(models.Transaction), [
+                {"asset_id": i % 10000 + 1, "buyer_id": i % 1000 + 1, "seller_id": (i + 7) % 1000 + 1,
+                 "price": i % 100 + 1, "transaction_hash": f"0x{i:064x}",
+                 "status": "completed" if i % 10 else "pending", "escrow_transaction_id": i}
+                for i in range(offset, min(offset + 50000, rows))
+            ])
+            db.commit()
+
+def start_server(port):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=dict(os.environ),
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not start")
+
+def peak_rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def download(url):
+    """Stream `url` and discard it; returns the number of bytes received"""
+    received = 0
+    with httpx.stream("GET", url, timeout=None) as response:
+        response.raise_for_status()
+        for chunk in response.iter_raw():
+            received += len(chunk)
+    return received
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming transaction export benchmark")
+    parser.add_argument("--database-url", default="sqlite:///bench_export.db")
+    parser.add_argument("--sizes", default="100000,1000000,5000000")
+    parser.add_argument("--format", default="ndjson")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--compare-list", action="store_true", help="Also fetch the paged list endpoint with limit=N")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    base_url = f"http://127.0.0.1:{args.port}"
+    print(f"{'endpoint':<10} {'rows':>9} {'seconds':>9} {'rows/s':>10} {'MB sent':>9} {'peak RSS MB':>12}")
+    for rows in (int(size) for size in args.sizes.split(",")):
+        seed(rows)
+        targets = [("export", f"/api/transactions/export?format={args.format}")]
+        if args.compare_list:
+            targets.append(("list", f"/api/transactions/?limit={rows}"))
+        for label, path in targets:
+            server = start_server(args.port)
+            try:
+                with Timer() as timer:
+                    received = download(base_url + path)
+                peak = peak_rss_mb(server.pid)
+            finally:
+                server.terminate()
+                server.wait()
+            print(f"{label:<10} {rows:>9} {timer.elapsed:>9.2f} {rows / timer.elapsed:>10.0f} "
+                  f"{received / 1e6:>9.1f} {peak:>12.1f}")
+
+if __name__ == "__main__":
+    main()
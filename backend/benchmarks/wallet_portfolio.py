@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Latency of GET /api/assets/owner/{wallet} for a wallet holding many tokens.
+
+Seeds one wallet with --tokens assets and serves ownerOf from a stand-in
+JSON-RPC node over HTTP that adds --rpc-latency ms to every request, like a
+remote node would. Reports the index-backed database read, the same read
+with verify=true (one batched JSON-RPC request per OWNERSHIP_BATCH_SIZE
+tokens), and the baseline the frontend used to pay: one eth_call per token,
+sent one after another.
+
+    python benchmarks/wallet_portfolio.py --database-url sqlite:///bench_portfolio.db --tokens 1000 --rpc-latency 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from common import BACKEND_DIR, Timer, summarize
+
+WALLET = "0x00000000000000000000000000000000000B0b01"
+CONTRACT = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+
+class StandInRPC:
+    """HTTP JSON-RPC node answering eth_call as ownerOf(tokenId) -> `owner`, single or batched"""
+
+    def __init__(self, owner, latency):
+        self.owner = owner
+        self.latency = latency
+        self.requests = 0
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                node.requests += 1
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                time.sleep(node.latency)
+                if isinstance(payload, list):
+                    body = [node.answer(call) for call in payload]
+                else:
+                    body = node.answer(payload)
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+
+    def answer(self, call):
+        return {"jsonrpc": "2.0", "id": call["id"], "result": "0x" + self.owner[2:].lower().rjust(64, "0")}
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+def seed(database_url, tokens):
+    os.environ["DATABASE_URL"] = database_url
+    from database import Base, SessionLocal, engine
+    import models
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if db.query(models.Asset).filter(models.Asset.owner_address == WALLET).count() >= tokens:
+            return
+        db.bulk_insert_mappings(models.Asset, [
+            {"name": f"Owl {i}", "price": i % 100 + 1, "token_id": str(1_000_000 + i), "owner_address": WALLET}
+            for i in range(tokens)
+        ])
+        # Other wallets' assets, so the owner index has something to skip
+        db.bulk_insert_mappings(models.Asset, [
+            {"name": f"Other owl {i}", "price": 1, "token_id": str(2_000_000 + i), "owner_address": f"0xother{i % 100}"}
+            for i in range(tokens * 10)
+        ])
+        db.commit()
+
+def start_server(env, port):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not start")
+
+def measure(client, path, runs):
+    latencies = []
+    with Timer() as timer:
+        for _ in range(runs):
+            start = time.perf_counter()
+            response = client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+    return latencies, timer.elapsed, response.json()
+
+def serial_owner_of(node_url, tokens):
+    """One eth_call round-trip per token, as web3.js getTokensOfOwner does"""
+    with httpx.Client(timeout=60) as client, Timer() as timer:
+        for i in range(tokens):
+            client.post(node_url, json={"jsonrpc": "2.0", "id": i, "method": "eth_call", "params": [
+                {"to": CONTRACT, "data": "0x6352211e" + format(1_000_000 + i, "064x")}, "latest",
+            ]}).raise_for_status()
+    return timer.elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Wallet portfolio latency benchmark")
+    parser.add_argument("--database-url", default="sqlite:///bench_portfolio.db")
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--rpc-latency", type=float, default=20, help="Milliseconds added to every node request")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    seed(args.database_url, args.tokens)
+    node = StandInRPC(WALLET, args.rpc_latency / 1000).start()
+    env = dict(os.environ, DATABASE_URL=args.database_url, GANACHE_URL=node.url,
+               CONTRACT_ADDRESS=CONTRACT, CACHE_URL="none")
+    proc = start_server(env, args.port)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=60) as client:
+            path = f"/api/assets/owner/{WALLET}?limit={args.tokens}"
+            latencies, elapsed, assets = measure(client, path, args.runs)
+            summarize(f"database ({len(assets)} assets)", latencies, elapsed)
+
+            node.requests = 0
+            latencies, elapsed, assets = measure(client, path + "&verify=true", args.runs)
+            summarize("verify=true (batched)", latencies, elapsed)
+            verified = sum(asset["owner_verified"] for asset in assets)
+            print(f"{'':<24} node requests/run={node.requests / args.runs:.0f} verified={verified}/{len(assets)}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    seconds = serial_owner_of(node.url, args.tokens)
+    print(f"{'serial eth_call':<24} requests={args.tokens:<7} total={seconds * 1000:10.2f}ms")
+
+if __name__ == "__main__":
+    main()
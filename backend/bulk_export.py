@@ -0,0 +1,210 @@
+import csv
+import io
+import os
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+import database
+import models
+from fast_json import dumps
+
+try:
+    # Optional: Parquet and Arrow exports are offered only when pyarrow is installed
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Streaming transaction export (GET /api/transactions/export). Rows are read
+# through a server-side cursor EXPORT_CHUNK_ROWS at a time and each chunk is
+# encoded and sent before the next is fetched, so memory stays flat however
+# many rows match.
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+def available_formats():
+    return ("ndjson", "csv", "parquet", "arrow") if pyarrow is not None else ("ndjson", "csv")
+
+# Flat columns: one row per transaction with its asset and both wallets inlined
+buyer = aliased(models.User, name="buyer")
+seller = aliased(models.User, name="seller")
+EXPORT_COLUMNS = (
+    models.Transaction.id,
+    models.Transaction.asset_id,
+    models.Asset.token_id.label("token_id"),
+    models.Asset.name.label("asset_name"),
+    models.Transaction.buyer_id,
+    buyer.wallet_address.label("buyer_address"),
+    models.Transaction.seller_id,
+    seller.wallet_address.label("seller_address"),
+    models.Transaction.price,
+    models.Transaction.status,
+    models.Transaction.transaction_hash,
+    models.Transaction.escrow_transaction_id,
+    models.Transaction.created_at,
+    models.Transaction.updated_at,
+)
+FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+def select_export(start=None, end=None, status=None, wallet=None):
+    """
+    Transactions created in [start, end) with the given status, where
+    `wallet` is the buyer or the seller, in id order.
+    """
+    statement = (
+        select(*EXPORT_COLUMNS)
+        .outerjoin(models.Asset, models.Transaction.asset_id == models.Asset.id)
+        .outerjoin(buyer, models.Transaction.buyer_id == buyer.id)
+        .outerjoin(seller, models.Transaction.seller_id == seller.id)
+        .order_by(models.Transaction.id)
+    )
+    if start is not None:
+        statement = statement.filter(models.Transaction.created_at >= start)
+    if end is not None:
+        statement = statement.filter(models.Transaction.created_at < end)
+    if status is not None:
+        statement = statement.filter(models.Transaction.status == status)
+    if wallet is not None:
+        # Resolved to the user id once, so the buyer_id/seller_id filters stay index-friendly
+        user_id = select(models.User.id).filter(models.User.wallet_address == wallet).scalar_subquery()
+        statement = statement.filter(
+            (models.Transaction.buyer_id == user_id) | (models.Transaction.seller_id == user_id)
+        )
+    return statement.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_ROWS)
+
+class ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+class ExportEncoder:
+    """Encodes chunks of export rows; header() and footer() frame the stream"""
+
+    def __init__(self, fmt):
+        self.fmt = fmt
+        self.sink = ChunkSink()
+        self.writer = None
+        if fmt in ("parquet", "arrow"):
+            self.schema = arrow_schema()
+
+    def header(self):
+        if self.fmt == "csv":
+            return self._csv([FIELDS])
+        return b""
+
+    def encode(self, rows):
+        if self.fmt == "ndjson":
+            return b"".join(dumps(dict(zip(FIELDS, row))) + b"\n" for row in rows)
+        if self.fmt == "csv":
+            return self._csv(rows)
+        return self._arrow(rows)
+
+    def footer(self):
+        if self.fmt in ("parquet", "arrow"):
+            # An empty export still produces a valid file with the schema
+            self._open_writer()
+            self.writer.close()
+            return self.sink.drain()
+        return b""
+
+    def _csv(self, rows):
+        out = io.StringIO()
+        csv.writer(out).writerows(
+            [value.isoformat() if hasattr(value, "isoformat") else value for value in row] for row in rows
+        )
+        return out.getvalue().encode()
+
+    def _open_writer(self):
+        if self.writer is not None:
+            return
+        stream = pyarrow.PythonFile(self.sink, mode="w")
+        if self.fmt == "parquet":
+            self.writer = pyarrow.parquet.ParquetWriter(stream, self.schema)
+        else:
+            self.writer = pyarrow.ipc.new_stream(stream, self.schema)
+
+    def _arrow(self, rows):
+        # One Parquet row group / Arrow record batch per chunk
+        self._open_writer()
+        columns = list(zip(*rows))
+        self.writer.write_table(pyarrow.table(
+            [pyarrow.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+        return self.sink.drain()
+
+def arrow_schema():
+    types = {int: pyarrow.int64(), float: pyarrow.float64(), datetime: pyarrow.timestamp("us")}
+    return pyarrow.schema([
+        (column.key, types.get(column.type.python_type, pyarrow.string())) for column in EXPORT_COLUMNS
+    ])
+
+def iter_export(statement, fmt, session_factory, done):
+    """Encoded export chunks from a blocking session (StreamingResponse runs it in the threadpool)"""
+    try:
+        encoder = ExportEncoder(fmt)
+        yield encoder.header()
+        # A session of its own: the request's session is closed once the handler returns
+        with session_factory() as db:
+            for rows in db.execute(statement).partitions():
+                yield encoder.encode(rows)
+        yield encoder.footer()
+    finally:
+        done()
+
+async def aiter_export(statement, fmt, async_session_factory, done):
+    """Encoded export chunks from the async engine"""
+    try:
+        encoder = ExportEncoder(fmt)
+        yield encoder.header()
+        async with async_session_factory() as db:
+            result = await db.stream(statement)
+            async for rows in result.partitions():
+                yield encoder.encode(rows)
+        yield encoder.footer()
+    finally:
+        done()
+
+def export_stream(statement, fmt, replica=None, done=lambda: None):
+    """
+    Export chunks read from `replica` (a db_replicas.Replica) or the primary.
+    `done` is called once the stream ends, however it ends.
+    """
+    session_factory = replica.session_factory if replica is not None else database.SessionLocal
+    async_session_factory = replica.async_session_factory if replica is not None else database.AsyncSessionLocal
+    if async_session_factory is not None:
+        return aiter_export(statement, fmt, async_session_factory, done)
+    return iter_export(statement, fmt, session_factory, done)
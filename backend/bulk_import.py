@@ -0,0 +1,266 @@
+import codecs
+import csv
+import json
+import os
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+import live_updates
+import models
+import schemas
+from upsert import upsert_statement
+
+# Bulk asset ingestion shared by POST /api/assets/bulk and
+# `db_manager.py import-assets`. Input is consumed line by line and written
+# in batches, so memory stays flat whatever the file size; only the first
+# BULK_MAX_ERRORS row errors are kept for the report. A batch is buffered in
+# full before it is written, so clients may ask for batches of at most
+# MAX_BULK_BATCH_SIZE rows.
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+MAX_BULK_BATCH_SIZE = int(os.getenv("MAX_BULK_BATCH_SIZE", "10000"))
+BULK_MAX_ERRORS = int(os.getenv("BULK_MAX_ERRORS", "1000"))
+
+FORMATS = ("ndjson", "csv")
+
+def detect_format(content_type=None, filename=None):
+    if content_type and "csv" in content_type or filename and filename.lower().endswith(".csv"):
+        return "csv"
+    return "ndjson"
+
+class RecordParser:
+    """
+    Incremental NDJSON/CSV parser: feed() takes one text line at a time and
+    returns the (row number, record dict or None, error or None) tuples it
+    completes. CSV fields may span lines when quoted.
+    """
+
+    def __init__(self, fmt):
+        self.fmt = fmt
+        self.header = None
+        self.pending = ""
+        self.row_number = 0
+
+    def feed(self, line):
+        if self.fmt == "csv":
+            return self._feed_csv(line)
+        self.row_number += 1
+        if not line.strip():
+            return []
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            return [(self.row_number, None, f"invalid JSON: {e}")]
+        if not isinstance(record, dict):
+            return [(self.row_number, None, "expected a JSON object")]
+        return [(self.row_number, record, None)]
+
+    def _feed_csv(self, line):
+        self.pending += line
+        # An odd number of quotes means a quoted field continues on the next line
+        if self.pending.count('"') % 2:
+            return []
+        text, self.pending = self.pending, ""
+        if not text.strip():
+            return []
+        values = next(csv.reader([text]))
+        if self.header is None:
+            self.header = [name.strip() for name in values]
+            return []
+        self.row_number += 1
+        if len(values) != len(self.header):
+            return [(self.row_number, None, f"expected {len(self.header)} columns, got {len(values)}")]
+        # Empty cells fall back to the schema defaults
+        return [(self.row_number, {k: v for k, v in zip(self.header, values) if v != ""}, None)]
+
+    def close(self):
+        if self.pending.strip():
+            return [(self.row_number + 1, None, "unterminated quoted field")]
+        return []
+
+async def aiter_lines(chunks):
+    """Split an async stream of UTF-8 byte chunks into text lines, newlines kept"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        parts = (buffer + decoder.decode(chunk)).split("\n")
+        buffer = parts.pop()
+        for part in parts:
+            yield part + "\n"
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+def validation_message(error: ValidationError):
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+    )
+
+class AssetImport:
+    """
+    Accumulates validated asset rows and writes them in batches.
+
+    Rows with a token_id are upserted on it (the last occurrence in a batch
+    wins); rows without one are plain inserts. A batch the database rejects
+    is retried row by row, so one bad row is reported instead of failing its
+    neighbours.
+    """
+
+    def __init__(self, batch_size=BULK_BATCH_SIZE, max_errors=BULK_MAX_ERRORS):
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.batch = []
+        self.received = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        # Ids of existing assets overwritten by the import, for cache invalidation
+        self.updated_ids = set()
+        # Owners the import wrote for, before and after, for read-your-writes
+        self.owner_addresses = set()
+        # Live updates of committed batches, until the caller publishes them (take_updates)
+        self.updates = []
+
+    @property
+    def full(self):
+        return len(self.batch) >= self.batch_size
+
+    def add(self, row_number, record, error=None):
+        """Validate one parsed row and queue it; returns True when the batch is full"""
+        self.received += 1
+        if error is None:
+            try:
+                asset = schemas.AssetCreate(**record)
+                self.batch.append((row_number, asset.dict()))
+            except ValidationError as e:
+                error = validation_message(e)
+            except TypeError as e:
+                error = str(e)
+        if error is not None:
+            self.fail(row_number, record.get("token_id") if record else None, error)
+        return self.full
+
+    def fail(self, row_number, token_id, error):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "token_id": token_id, "error": error})
+
+    def flush(self, db: Session):
+        """Write the queued rows, committing once per batch"""
+        if not self.batch:
+            return
+        batch, self.batch = self.batch, []
+        try:
+            outcome = self._write(db, batch)
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            for row in batch:
+                try:
+                    outcome = self._write(db, [row])
+                    db.commit()
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    self.fail(row[0], row[1].get("token_id"), str(getattr(e, "orig", e)))
+                else:
+                    self._count(*outcome)
+        else:
+            self._count(*outcome)
+
+    def _count(self, inserted, updated, updated_ids, owner_addresses, updates):
+        self.inserted += inserted
+        self.updated += updated
+        self.updated_ids.update(updated_ids)
+        self.owner_addresses.update(owner_addresses)
+        self.updates.extend(updates)
+
+    def take_updates(self):
+        """Live updates of the batches committed since the last call"""
+        updates, self.updates = self.updates, []
+        return updates
+
+    def _write(self, db: Session, batch):
+        """Execute one batch; returns (inserted, updated, ids of updated assets, owners before and after, live updates)"""
+        keyed = {}
+        unkeyed = []
+        for row_number, values in batch:
+            if values.get("token_id"):
+                keyed[values["token_id"]] = values
+            else:
+                unkeyed.append(values)
+
+        existing = {}
+        if keyed:
+            existing = {token_id: (asset_id, owner) for token_id, asset_id, owner in db.execute(
+                select(models.Asset.token_id, models.Asset.id, models.Asset.owner_address)
+                .filter(models.Asset.token_id.in_(list(keyed)))
+            )}
+            statement = upsert_statement(
+                db.get_bind().dialect.name, models.Asset.__table__, "token_id",
+                [column for column in schemas.AssetCreate.model_fields if column != "token_id"],
+            )
+            db.execute(statement, list(keyed.values()))
+        if unkeyed:
+            db.execute(models.Asset.__table__.insert(), unkeyed)
+
+        # Counted per row received: a token repeated within the batch is an update of its first row
+        inserted = updated = 0
+        seen = set(existing)
+        for row_number, values in batch:
+            token_id = values.get("token_id")
+            if token_id and token_id in seen:
+                updated += 1
+            else:
+                inserted += 1
+                if token_id:
+                    seen.add(token_id)
+        updates = self._live_updates(db, keyed, existing, unkeyed) if live_updates.broker is not None else []
+        owner_addresses = {values.get("owner_address") for _, values in batch} | {owner for _, owner in existing.values()}
+        return inserted, updated, {asset_id for asset_id, _ in existing.values()}, owner_addresses - {None}, updates
+
+    def _live_updates(self, db: Session, keyed, existing, unkeyed):
+        """
+        Updates for a written batch, read before it commits. Upserted assets
+        are reread by token_id and reach their asset, owner and previous
+        owner. Rows without a token_id were inserted without a way to learn
+        their ids, so their owners are told to resync instead.
+        """
+        updates = []
+        if keyed:
+            for asset in db.execute(select(
+                models.Asset.id, models.Asset.token_id, models.Asset.owner_address,
+                models.Asset.is_available, models.Asset.price,
+            ).filter(models.Asset.token_id.in_(list(keyed)))):
+                previous_owner = existing.get(asset.token_id, (None, None))[1]
+                updates.append(live_updates.asset_update(asset, previous_owner))
+        if unkeyed:
+            updates.append(live_updates.resync_update(values.get("owner_address") for values in unkeyed))
+        return updates
+
+    def report(self):
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+def import_assets(db: Session, lines, fmt="ndjson", batch_size=BULK_BATCH_SIZE):
+    """Synchronous import of an iterable of text lines (used by the CLI)"""
+    job = AssetImport(batch_size=batch_size)
+    parser = RecordParser(fmt)
+    for line in lines:
+        for row in parser.feed(line):
+            if job.add(*row):
+                job.flush(db)
+                live_updates.publish_sync(job.take_updates())
+    for row in parser.close():
+        job.add(*row)
+    job.flush(db)
+    live_updates.publish_sync(job.take_updates())
+    return job
@@ -0,0 +1,212 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+from fast_json import encode_default
+
+load_dotenv()
+
+# Read-through cache for hot asset reads.
+#   CACHE_URL          memory:// (in-process TTL/LRU, default), redis://host:port/db, or none
+#   CACHE_TTL          seconds an entry may be served before it is reloaded
+#   CACHE_MAX_ENTRIES  LRU bound of the in-process backend
+# The in-process backend is per worker: writes invalidate the worker that made
+# them, other workers and the event listener rely on the TTL. Use Redis to
+# share invalidations across processes.
+CACHE_URL = os.getenv("CACHE_URL", "memory://")
+CACHE_TTL = int(os.getenv("CACHE_TTL", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+
+# Key holding the generation number of every cached asset listing
+ASSET_LISTINGS_VERSION = "assets:version"
+CATEGORIES_KEY = "search:categories"
+
+MISSING = object()
+
+class CacheMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def record(self, field, count=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + count)
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "invalidations": self.invalidations,
+            }
+
+class MemoryCache:
+    """
+    Thread-safe in-process cache with per-entry TTL and LRU eviction.
+
+    Counters (incr) are kept apart from the entries and never evicted: an
+    evicted generation number would restart at an old value and bring back
+    listing pages cached under it.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl if ttl else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._counters.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def stats(self):
+        return {"entries": len(self._entries), "max_entries": self.max_entries}
+
+class RedisCache:
+    """Redis-compatible backend shared by every API worker and the event listener"""
+
+    name = "redis"
+
+    def __init__(self, url=None, client=None):
+        if client is None:
+            # Optional dependency, only needed when CACHE_URL points at Redis
+            import redis
+
+            client = redis.Redis.from_url(url)
+        self.client = client
+
+    def get(self, key):
+        raw = self.client.get(key)
+        return MISSING if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, json.dumps(value, default=encode_default), ex=ttl or None)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*keys)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+    def stats(self):
+        return {}
+
+class Cache:
+    """
+    Cache front end used by the routers and the event listener.
+
+    Values must be JSON-serializable (routers cache encoded response data, not
+    ORM objects). Async methods are for request handlers; the *_sync variants
+    are for the event listener and other blocking code.
+    """
+
+    def __init__(self, backend, ttl=CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.metrics = CacheMetrics()
+        # Memory operations are cheap enough to run on the event loop; network
+        # backends are pushed to the threadpool
+        self._blocking = not isinstance(backend, MemoryCache)
+
+    async def _call(self, fn, *args):
+        if self._blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    async def get_or_load(self, key, loader, ttl=None, tag=None):
+        """
+        Return the cached value for `key`, or await `loader()` and cache its result.
+
+        `tag` is an optional version of the underlying data (e.g. the response
+        ETag); an entry cached under a different tag is treated as a miss.
+        """
+        if self.backend is None:
+            return await loader()
+        entry = await self._call(self.backend.get, key)
+        if entry is not MISSING and (tag is None or entry[0] == tag):
+            self.metrics.record("hits")
+            return entry[1]
+        self.metrics.record("misses")
+        value = await loader()
+        await self._call(self.backend.set, key, [tag, value], ttl or self.ttl)
+        return value
+
+    async def asset_listings_version(self):
+        if self.backend is None:
+            return 0
+        version = await self._call(self.backend.get, ASSET_LISTINGS_VERSION)
+        return 0 if version is MISSING else version
+
+    def _invalidate_assets(self, asset_ids):
+        keys = [f"asset:{asset_id}" for asset_id in asset_ids] + [CATEGORIES_KEY]
+        self.backend.delete(*keys)
+        # Bumping the generation orphans every cached listing/search page at once
+        self.backend.incr(ASSET_LISTINGS_VERSION)
+        self.metrics.record("invalidations", len(keys))
+
+    async def invalidate_assets(self, asset_ids=()):
+        """Drop the given assets plus every listing that could contain them"""
+        if self.backend is not None:
+            await self._call(self._invalidate_assets, list(asset_ids))
+
+    def invalidate_assets_sync(self, asset_ids=()):
+        if self.backend is not None:
+            self._invalidate_assets(list(asset_ids))
+
+    def stats(self):
+        stats = {"backend": self.backend.name if self.backend else "none", "ttl": self.ttl}
+        if self.backend is not None:
+            stats.update(self.backend.stats())
+        stats.update(self.metrics.snapshot())
+        return stats
+
+def create_backend(url):
+    if url in ("", "none"):
+        return None
+    if url.startswith("memory://"):
+        return MemoryCache()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(url)
+    raise ValueError(f"Unsupported CACHE_URL: {url}")
+
+cache = Cache(create_backend(CACHE_URL))
@@ -0,0 +1,86 @@
+import hashlib
+from datetime import timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Response, status
+from sqlalchemy import func, select
+
+# Conditional GET for read endpoints.
+#
+# Validators come from one aggregate query over the rows a request would
+# return (count, sum of ids and the newest updated_at of every table in the
+# representation), so a 304 is answered without loading or serializing rows.
+# ETags are weak: they describe the data, not the bytes, and stay valid
+# across content encodings.
+#
+# updated_at is second-granular, so a row written in the current second may
+# change again without its timestamp moving. Until the newest change is
+# SETTLE_SECONDS old no validators are emitted and clients get a full 200.
+SETTLE_SECONDS = 1
+
+def versions(statement, id_column, *updated_columns):
+    """
+    Project `statement` (filters, ordering and limit included) onto the
+    columns its validators are computed from. Callers may add joins for
+    nested tables afterwards.
+    """
+    return statement.with_only_columns(
+        id_column.label("row_id"),
+        *[column.label(f"updated_{i}") for i, column in enumerate(updated_columns)],
+    )
+
+def version_query(projection):
+    rows = projection.subquery()
+    row_id, *updated = rows.c
+    return select(func.count(), func.sum(row_id), *[func.max(column) for column in updated], func.now())
+
+def http_date(value):
+    # Timestamps are stored as naive UTC
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+def etag_matches(if_none_match, etag):
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored on both sides
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+def not_modified_since(if_modified_since, last_modified):
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+async def check_not_modified(request, response, db, projection, last_modified=False):
+    """
+    Set ETag (and Last-Modified when `last_modified`) on `response` and
+    return a 304 response if the client's copy is current, otherwise None.
+
+    Last-Modified is only meaningful for single rows: a list can lose a row
+    without its newest updated_at moving, which the ETag's count and id sum
+    do catch.
+    """
+    count, id_sum, *updated, now = (await db.execute(version_query(projection))).one()
+    if not count:
+        return None
+    newest = max((value for value in updated if value is not None), default=None)
+    if newest is not None and now - newest < timedelta(seconds=SETTLE_SECONDS):
+        return None
+
+    digest = hashlib.sha1(f"{count}:{id_sum}:{':'.join(map(str, updated))}".encode()).hexdigest()[:20]
+    headers = {"ETag": f'W/"{digest}"'}
+    if last_modified and newest is not None:
+        headers["Last-Modified"] = http_date(newest)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = etag_matches(if_none_match, headers["ETag"])
+    elif "Last-Modified" in headers and request.headers.get("if-modified-since"):
+        fresh = not_modified_since(request.headers["if-modified-since"], newest)
+    else:
+        fresh = False
+    if fresh:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
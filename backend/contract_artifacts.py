@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+# Truffle build artifacts (smart-contracts/build/contracts/*.json) carry the
+# bytecode, AST and source maps next to the ABI, hundreds of KB per contract.
+# The registry parses each file once, keeps only the ABI and the deployed
+# address per network, and re-reads it when its mtime or size changes (a
+# redeploy rewrites the artifact), so lookups cost one stat().
+CONTRACT_BUILD_DIR = os.getenv(
+    "CONTRACT_BUILD_DIR", str(Path(__file__).parent.parent / "smart-contracts" / "build" / "contracts")
+)
+# Network whose deployment is served. Truffle keys deployments by network id,
+# which is the chain id on public networks (Ganache uses 5777). When unset, an
+# artifact deployed to exactly one network uses that one.
+CHAIN_ID = os.getenv("CHAIN_ID")
+
+class ArtifactError(Exception):
+    """The artifact is missing, unreadable, or not deployed on the configured network"""
+
+class Artifact:
+    def __init__(self, contract_name, abi, networks, stamp):
+        self.contract_name = contract_name
+        self.abi = abi
+        # network id -> deployed address
+        self.networks = networks
+        self.stamp = stamp
+        self.digest = hashlib.sha1(
+            json.dumps([abi, networks], sort_keys=True, separators=(",", ":")).encode()
+        ).hexdigest()[:20]
+
+    def deployment(self, chain_id=None):
+        """(network id, address) for `chain_id`, by default the configured CHAIN_ID"""
+        chain_id = chain_id or CHAIN_ID
+        if chain_id is not None:
+            address = self.networks.get(str(chain_id))
+            if not address:
+                raise ArtifactError(f"{self.contract_name} is not deployed on network {chain_id}")
+            return str(chain_id), address
+        if len(self.networks) != 1:
+            found = ", ".join(sorted(self.networks)) or "none"
+            raise ArtifactError(f"{self.contract_name} has deployments on networks: {found}; set CHAIN_ID")
+        return next(iter(self.networks.items()))
+
+    def etag(self, chain_id=None):
+        return f'W/"{self.digest}-{chain_id or CHAIN_ID or ""}"'
+
+def load_artifact(path, stamp):
+    try:
+        with open(path, "rb") as file:
+            data = json.load(file)
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"Cannot read contract artifact {path}: {e}") from e
+    abi = data.get("abi")
+    if not abi:
+        raise ArtifactError(f"ABI not found in contract artifact {path}")
+    networks = {
+        str(network_id): network["address"]
+        for network_id, network in (data.get("networks") or {}).items() if network.get("address")
+    }
+    return Artifact(data.get("contractName") or Path(path).stem, abi, networks, stamp)
+
+class ArtifactRegistry:
+    def __init__(self, build_dir=CONTRACT_BUILD_DIR):
+        self.build_dir = Path(build_dir)
+        self._artifacts = {}
+        self._lock = threading.Lock()
+
+    def path(self, contract_name):
+        # Names come from URLs: never let them leave the build directory
+        if not contract_name or Path(contract_name).name != contract_name:
+            raise ArtifactError(f"Invalid contract name {contract_name!r}")
+        return self.build_dir / f"{contract_name}.json"
+
+    def get(self, contract_name):
+        return self.load(self.path(contract_name))
+
+    def load(self, path):
+        """The artifact at `path`, parsed again only when the file changed"""
+        path = str(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise ArtifactError(f"Contract artifact {path} not found")
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        artifact = self._artifacts.get(path)
+        if artifact is not None and artifact.stamp == stamp:
+            return artifact
+        with self._lock:
+            artifact = self._artifacts.get(path)
+            if artifact is None or artifact.stamp != stamp:
+                artifact = self._artifacts[path] = load_artifact(path, stamp)
+        return artifact
+
+artifacts = ArtifactRegistry()
@@ -1,14 +1,26 @@
 #!/usr/bin/env python3
 import os
+import sys
+import json
 import argparse
 import subprocess
 from pathlib import Path
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
 from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 from dotenv import load_dotenv
-from database import Base
+from database import Base, SessionLocal
+from bulk_import import BULK_BATCH_SIZE, detect_format, import_assets as run_import
+from cache import cache
+import market_stats
 import models
+import token_metadata
+
+ALEMBIC_INI = Path(__file__).resolve().parent / "alembic.ini"
 
 def load_db_config():
     """Load database configuration from .env file"""
@@ -92,8 +104,59 @@ def create_database(config):
         print(f"Error creating database: {e}")
         return False
 
+def alembic_config(config):
+    alembic_cfg = AlembicConfig(str(ALEMBIC_INI))
+    # ConfigParser interpolation: a literal % in the password must be doubled
+    alembic_cfg.set_main_option("sqlalchemy.url", config["url"].replace("%", "%%"))
+    return alembic_cfg
+
+def migrate(config, revision="head"):
+    """Apply schema migrations up to `revision`"""
+    if not config:
+        return False
+    
+    try:
+        command.upgrade(alembic_config(config), revision)
+        print(f"Database migrated to {revision}")
+        return True
+    except SQLAlchemyError as e:
+        print(f"Error migrating database: {e}")
+        return False
+
+def rollback(config, revision):
+    """Revert schema migrations down to `revision` (base reverts all of them)"""
+    if not config:
+        return False
+    
+    try:
+        command.downgrade(alembic_config(config), revision)
+        print(f"Database rolled back to {revision}")
+        return True
+    except SQLAlchemyError as e:
+        print(f"Error rolling back database: {e}")
+        return False
+
+def migration_status(config):
+    """Print the applied and the latest migration revision"""
+    if not config:
+        return False
+    
+    try:
+        engine = create_engine(config["url"])
+        with engine.connect() as conn:
+            current = MigrationContext.configure(conn).get_current_revision()
+        head = ScriptDirectory.from_config(alembic_config(config)).get_current_head()
+        print(f"Current revision: {current or 'none'}")
+        print(f"Latest revision: {head}")
+        if current != head:
+            print("Run 'db_manager.py migrate' to apply pending migrations")
+        return True
+    except SQLAlchemyError as e:
+        print(f"Error reading migration status: {e}")
+        return False
+
 def create_tables(config, force=False):
-    """Create database tables based on SQLAlchemy models"""
+    """Create database tables by applying every schema migration"""
     if not config:
         return False
     
@@ -110,9 +173,10 @@ def create_tables(config, force=False):
             print("Use --force to recreate tables")
             return False
         
-        # Create tables
+        # Migrations only add what is missing, so --force also brings
+        # tables created before migrations existed up to date
         print("Creating tables...")
-        Base.metadata.create_all(bind=engine)
+        command.upgrade(alembic_config(config), "head")
         print("Tables created successfully")
         return True
     except SQLAlchemyError as e:
@@ -147,6 +211,9 @@ def drop_tables(config, confirm=False):
         # Drop tables
         print("Dropping tables...")
         Base.metadata.drop_all(bind=engine)
+        with engine.begin() as conn:
+            # Forget the applied migrations as well, so create-tables starts from scratch
+            conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
         print("Tables dropped successfully")
         return True
     except SQLAlchemyError as e:
@@ -186,6 +253,47 @@ def export_schema(config, output_file=None):
         print(f"Error exporting schema: {e}")
         return False
 
+def import_assets(path, fmt=None, batch_size=None):
+    """Stream assets from an NDJSON or CSV file (or stdin) into the database"""
+    fmt = fmt or detect_format(filename=path)
+    try:
+        source = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        with source, SessionLocal() as db:
+            job = run_import(db, source, fmt, batch_size or BULK_BATCH_SIZE)
+    except (OSError, SQLAlchemyError) as e:
+        print(f"Error importing assets: {e}")
+        return False
+
+    print(json.dumps(job.report(), indent=2))
+    if job.updated_ids:
+        # Only a shared (Redis) cache can be cleared from here; API workers' in-process caches expire on TTL
+        cache.invalidate_assets_sync(job.updated_ids)
+    return job.failed == 0
+
+def rebuild_stats(batch_size=None):
+    """Recompute the market statistics tables from the transactions"""
+    try:
+        with SessionLocal() as db:
+            counted = market_stats.rebuild(db, batch_size or market_stats.STATS_REBUILD_BATCH_SIZE)
+    except SQLAlchemyError as e:
+        print(f"Error rebuilding market statistics: {e}")
+        return False
+
+    print(f"Market statistics rebuilt from {counted} transactions")
+    return True
+
+def requeue_metadata(include_fetched=False):
+    """Have the event listener fetch token metadata again"""
+    try:
+        with SessionLocal() as db:
+            queued = token_metadata.requeue(db, include_fetched)
+    except SQLAlchemyError as e:
+        print(f"Error queuing token metadata: {e}")
+        return False
+
+    print(f"{queued} tokens queued for a metadata fetch")
+    return True
+
 def main():
     parser = argparse.ArgumentParser(description="Mememonize Database Manager")
     subparsers = parser.add_subparsers(dest="command", help="Command to execute")
@@ -202,10 +310,30 @@ def main():
     drop_parser = subparsers.add_parser("drop-tables", help="Drop all database tables")
     drop_parser.add_argument("--yes", action="store_true", help="Skip confirmation prompt")
     
+    # Migration commands
+    migrate_parser = subparsers.add_parser("migrate", help="Apply schema migrations")
+    migrate_parser.add_argument("revision", nargs="?", default="head", help="Target revision (default: head)")
+    rollback_parser = subparsers.add_parser("rollback", help="Revert schema migrations")
+    rollback_parser.add_argument("revision", help="Revision to roll back to, or base")
+    subparsers.add_parser("migration-status", help="Show the applied and the latest migration")
+    
     # Export schema command
     export_parser = subparsers.add_parser("export-schema", help="Export database schema to a SQL file")
     export_parser.add_argument("--output", "-o", help="Output file path")
     
+    # Import assets command
+    import_parser = subparsers.add_parser("import-assets", help="Bulk upsert assets from an NDJSON or CSV file")
+    import_parser.add_argument("file", help="Input file, or - for stdin")
+    import_parser.add_argument("--format", choices=["ndjson", "csv"], help="Input format (default: from the file extension)")
+    import_parser.add_argument("--batch-size", type=int, help="Rows per INSERT batch and commit")
+    
+    # Rebuild statistics command
+    stats_parser = subparsers.add_parser("rebuild-stats", help="Recompute market statistics from the transactions (stop the event listener first)")
+    stats_parser.add_argument("--batch-size", type=int, help="Transactions per batch and commit")
+
+    metadata_parser = subparsers.add_parser("requeue-metadata", help="Retry token metadata fetches that gave up")
+    metadata_parser.add_argument("--all", action="store_true", help="Fetch the metadata of every token again")
+    
     args = parser.parse_args()
     
     # Load database configuration
@@ -222,8 +350,20 @@ def main():
         return create_tables(config, args.force)
     elif args.command == "drop-tables":
         return drop_tables(config, args.yes)
+    elif args.command == "migrate":
+        return migrate(config, args.revision)
+    elif args.command == "rollback":
+        return rollback(config, args.revision)
+    elif args.command == "migration-status":
+        return migration_status(config)
     elif args.command == "export-schema":
         return export_schema(config, args.output)
+    elif args.command == "import-assets":
+        return import_assets(args.file, args.format, args.batch_size)
+    elif args.command == "rebuild-stats":
+        return rebuild_stats(args.batch_size)
+    elif args.command == "requeue-metadata":
+        return requeue_metadata(args.all)
     else:
         parser.print_help()
         return True
@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Connection pool configuration, read from the environment:
+#   DB_POOL_SIZE          connections kept open in the pool
+#   DB_MAX_OVERFLOW       extra connections allowed during bursts
+#   DB_POOL_TIMEOUT       seconds to wait for a free connection before failing
+#   DB_POOL_RECYCLE       seconds after which a connection is replaced (keep below MySQL wait_timeout)
+#   DB_POOL_PRE_PING      test connections on checkout and transparently replace stale ones
+#   DB_POOL_LIFO          reuse the most recently returned connection first (lets idle ones expire)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+POOL_LIFO = os.getenv("DB_POOL_LIFO", "false").lower() in ("1", "true", "yes")
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+class PoolMetrics:
+    """Checkout counters and a cumulative wait-time histogram for one pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+
+    def observe(self, waited, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    self.wait_buckets[i] += 1
+
+    def snapshot(self):
+        with self._lock:
+            count = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_histogram": {
+                    **{str(bound): n for bound, n in zip(WAIT_BUCKETS, self.wait_buckets)},
+                    "+Inf": count,
+                },
+            }
+
+class InstrumentedPoolMixin:
+    """Times how long each checkout waits for a connection to become available"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.observe(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.observe(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        # Pool.recreate() builds a fresh pool on invalidation; carry the metrics over
+        new_pool = super().recreate()
+        new_pool.metrics = self.metrics
+        return new_pool
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def pool_options(url, async_mode=False):
+    """create_engine() keyword arguments for the configured pool"""
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith("sqlite:")):
+        # In-memory SQLite needs its default single-connection pool
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool if async_mode else InstrumentedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+        "pool_use_lifo": POOL_LIFO,
+    }
+
+def pool_status(pool):
+    """Live view of a pool: connection counts plus checkout wait metrics"""
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
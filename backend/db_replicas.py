@@ -0,0 +1,265 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from fastapi import Request
+from sqlalchemy import create_engine, event, literal, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from cache import MemoryCache, cache
+import database
+from db_pool import pool_options, pool_status
+import models
+
+load_dotenv()
+
+logger = logging.getLogger("ReadReplicas")
+
+# Read replicas for the GET endpoints (Depends(get_read_db)); writes and the
+# reads inside write handlers stay on DATABASE_URL.
+#   DATABASE_REPLICA_URLS     comma-separated replica URLs (same schema, fed by
+#                             replication from the primary); empty keeps every
+#                             read on the primary
+#   REPLICA_HEALTH_INTERVAL   seconds between health checks of each replica
+#   REPLICA_MAX_LAG_SECONDS   MySQL replicas further behind their source are
+#                             skipped until they catch up (0 disables the check)
+#   READ_YOUR_WRITES_SECONDS  after a write, reads for the wallets it touched
+#                             go to the primary for this long; keep it above the
+#                             usual replication lag
+# A request's wallets are its X-Wallet-Address header and any wallet in its
+# path or query. The window is kept in the cache backend, so it spans workers
+# when CACHE_URL is Redis; with the in-process cache (or none) it only covers
+# the worker that handled the write.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+WALLET_HEADER = "x-wallet-address"
+
+# Reads a page of a replicated table: unlike SELECT 1, this fails on a replica
+# that is missing the schema or whose files are damaged
+HEALTH_QUERY = select(literal(1)).select_from(models.Asset.__table__).limit(1)
+
+def replication_lag(connection):
+    """
+    Seconds a MySQL replica is behind its source: 0 when it is not set up
+    as a replica or the lag cannot be read, None when replication is stopped.
+    """
+    for statement, column in (("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+                              ("SHOW SLAVE STATUS", "Seconds_Behind_Master")):
+        try:
+            row = connection.exec_driver_sql(statement).mappings().first()
+        except DBAPIError:
+            # Older server without the REPLICA syntax, or no REPLICATION CLIENT privilege
+            continue
+        return 0 if row is None else row[column]
+    return 0
+
+class Replica:
+    """One read replica: its engines, health and the sessions open on it"""
+
+    def __init__(self, name, url, async_url=None):
+        self.name = name
+        self.url = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_engine(url, **pool_options(url))
+        self.session_factory = sessionmaker(bind=self.engine, autoflush=False)
+        self.async_engine = None
+        self.async_session_factory = None
+        if async_url is not None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            self.async_engine = create_async_engine(async_url, **pool_options(async_url, async_mode=True))
+            self.async_session_factory = async_sessionmaker(self.async_engine, autoflush=False, expire_on_commit=False)
+        # Unused until the first health check passes
+        self.healthy = False
+        self.lag = None
+        self.error = "not checked yet"
+        self.in_flight = 0
+        for engine in self.engines():
+            event.listen(engine, "handle_error", self._handle_error)
+
+    def engines(self):
+        """Sync engines to instrument: the engine and the async engine's sync facade"""
+        return [self.engine] + ([self.async_engine.sync_engine] if self.async_engine is not None else [])
+
+    def _handle_error(self, context):
+        # A dropped connection takes the replica out at once, not at the next check
+        if context.is_disconnect and self.healthy:
+            self.mark(False, error=str(context.original_exception))
+
+    def mark(self, healthy, lag=None, error=None):
+        if healthy != self.healthy:
+            if healthy:
+                logger.info(f"Replica {self.name} is healthy")
+            else:
+                logger.warning(f"Replica {self.name} is unavailable: {error}")
+        self.healthy, self.lag, self.error = healthy, lag, error
+
+    def check(self):
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(HEALTH_QUERY)
+                lag = replication_lag(connection) if self.engine.dialect.name == "mysql" else None
+        except Exception as e:
+            self.mark(False, error=str(e))
+            return
+        if self.engine.dialect.name == "mysql" and REPLICA_MAX_LAG_SECONDS:
+            if lag is None:
+                self.mark(False, error="replication is stopped")
+                return
+            if lag > REPLICA_MAX_LAG_SECONDS:
+                self.mark(False, lag=lag, error=f"{lag}s behind the primary")
+                return
+        self.mark(True, lag=lag)
+
+    def status(self):
+        status = {"url": self.url, "healthy": self.healthy, "lag_seconds": self.lag,
+                  "error": self.error, "in_flight": self.in_flight}
+        status.update(pool_status((self.async_engine or self.engine).pool))
+        return status
+
+class ReplicaSet:
+    """
+    Health-checked read replicas. acquire() picks the healthy replica with the
+    fewest open sessions, taking turns between equally busy ones.
+    """
+
+    def __init__(self, urls, async_url=None, interval=REPLICA_HEALTH_INTERVAL):
+        self.replicas = [
+            Replica(f"replica-{i + 1}", url, async_url(url) if async_url else None) for i, url in enumerate(urls)
+        ]
+        self.interval = interval
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._checker = None
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    def start(self):
+        """Start the background health checks (once)"""
+        with self._lock:
+            if self._checker is None and self.replicas:
+                self._checker = threading.Thread(target=self._check_forever, name="replica-health", daemon=True)
+                self._checker.start()
+
+    def _check_forever(self):
+        while True:
+            self.check_all()
+            time.sleep(self.interval)
+
+    def check_all(self):
+        for replica in self.replicas:
+            replica.check()
+
+    def acquire(self):
+        """The replica to read from (its in-flight count taken), or None to use the primary"""
+        self.start()
+        with self._lock:
+            healthy = [replica for replica in self.replicas if replica.healthy]
+            if not healthy:
+                return None
+            turn = next(self._turn)
+            replica = min(healthy, key=lambda r: (r.in_flight, (self.replicas.index(r) - turn) % len(self.replicas)))
+            replica.in_flight += 1
+            return replica
+
+    def release(self, replica):
+        """Give back a replica from acquire(); None (the primary) is ignored"""
+        if replica is None:
+            return
+        with self._lock:
+            replica.in_flight -= 1
+
+    def engines(self):
+        return [engine for replica in self.replicas for engine in replica.engines()]
+
+    def status(self):
+        return {replica.name: replica.status() for replica in self.replicas}
+
+class RecentWrites:
+    """Wallets that wrote within the read-your-writes window"""
+
+    def __init__(self, store, window=READ_YOUR_WRITES_SECONDS):
+        self.store = store
+        self.window = window
+        # Memory operations run on the event loop; network stores in the threadpool
+        self._blocking = not isinstance(store, MemoryCache)
+
+    async def _call(self, fn, *args):
+        if self._blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    def _remember(self, wallets):
+        for wallet in wallets:
+            self.store.set(f"ryw:{wallet}", 1, self.window)
+
+    def _includes(self, wallets):
+        return any(self.store.get(f"ryw:{wallet}") == 1 for wallet in wallets)
+
+    async def remember(self, wallets):
+        wallets = normalize_wallets(wallets)
+        if wallets and self.window:
+            await self._call(self._remember, wallets)
+
+    async def includes(self, wallets):
+        wallets = normalize_wallets(wallets)
+        return bool(wallets and self.window) and await self._call(self._includes, wallets)
+
+def normalize_wallets(wallets):
+    return sorted({wallet.lower() for wallet in wallets if wallet})
+
+def request_wallets(request: Request):
+    """Wallets a request reads on behalf of: the X-Wallet-Address header, and path or query wallets"""
+    return [
+        request.headers.get(WALLET_HEADER),
+        request.path_params.get("wallet"),
+        request.path_params.get("wallet_address"),
+        request.query_params.get("wallet"),
+    ]
+
+replicas = ReplicaSet(DATABASE_REPLICA_URLS, database.to_async_url if database.DB_ASYNC else None)
+recent_writes = RecentWrites(cache.backend if cache.backend is not None else MemoryCache())
+
+async def remember_writes(wallets):
+    """Keep the reads of these wallets on the primary for READ_YOUR_WRITES_SECONDS; call after committing"""
+    if replicas:
+        await recent_writes.remember(wallets)
+
+async def read_replica(request: Request):
+    """The replica to serve a read-only request from, or None for the primary; release() it afterwards"""
+    if not replicas or await recent_writes.includes(request_wallets(request)):
+        return None
+    return replicas.acquire()
+
+@asynccontextmanager
+async def read_session(request: Request):
+    """
+    A session for read-only work: on a healthy read replica, or on the
+    primary when none is configured or healthy, or when one of the
+    request's wallets wrote within READ_YOUR_WRITES_SECONDS.
+    """
+    replica = await read_replica(request)
+    if replica is None:
+        async with database.open_session(database.SessionLocal, database.AsyncSessionLocal) as db:
+            yield db
+        return
+    try:
+        async with database.open_session(replica.session_factory, replica.async_session_factory) as db:
+            yield db
+    finally:
+        replicas.release(replica)
+
+async def get_read_db(request: Request):
+    """get_db() for read-only handlers, through read_session()"""
+    async with read_session(request) as db:
+        yield db
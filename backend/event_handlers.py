@@ -0,0 +1,409 @@
+import logging
+import time
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, joinedload
+
+from cache import cache
+from database import SessionLocal
+import live_updates
+from listener_leases import utcnow
+from market_stats import record_trades_completed, record_trades_created
+from metrics import registry
+import models
+from upsert import upsert_users
+
+logger = logging.getLogger("EventListener")
+
+# Upper bound on the number of values bound into one IN (...) list
+IN_CLAUSE_CHUNK = 1000
+
+EVENTS_PROCESSED = registry.counter(
+    "listener_events_processed_total", "Events applied by their handler", ("contract", "event")
+)
+EVENTS_SKIPPED = registry.counter("listener_events_skipped_total", "Events skipped because an earlier run applied them")
+HANDLER_DURATION = registry.histogram(
+    "listener_handler_duration_seconds", "Time spent in an event handler per run of events", ("contract", "event")
+)
+BATCH_DURATION = registry.histogram(
+    "listener_batch_duration_seconds", "Time to apply and commit one batch of events"
+)
+
+def normalize_tx_hash(tx_hash):
+    """Hex string with a "0x" prefix, whatever form the node returned the hash in"""
+    if isinstance(tx_hash, (bytes, bytearray)):
+        tx_hash = tx_hash.hex()
+    if not tx_hash.startswith("0x"):
+        tx_hash = "0x" + tx_hash
+    return tx_hash
+
+def chunked(values, size=IN_CLAUSE_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def load_pending_transactions(db: Session, tx_hashes):
+    """Pending transactions for a set of hashes, keyed by hash"""
+    pending = {}
+    for chunk in chunked(tx_hashes):
+        for tx_record in db.scalars(select(models.Transaction).filter(
+            models.Transaction.transaction_hash.in_(chunk),
+            models.Transaction.status == "pending"
+        )):
+            pending.setdefault(tx_record.transaction_hash, tx_record)
+    return pending
+
+def load_assets_by_token(db: Session, token_ids):
+    """Assets for a set of token ids, keyed by token id"""
+    assets = {}
+    for chunk in chunked(token_ids):
+        for asset_record in db.scalars(select(models.Asset).filter(models.Asset.token_id.in_(chunk))):
+            assets[asset_record.token_id] = asset_record
+    return assets
+
+def event_key(event):
+    """Identity of a log entry: (transaction hash, log index)"""
+    return normalize_tx_hash(event["transactionHash"]), event.get("logIndex", 0)
+
+def claim_new_events(db: Session, events):
+    """
+    Drop events that were already applied and record the rest as processed
+    in the caller's transaction, so replaying a block range is idempotent.
+    """
+    keys = [event_key(event) for event in events]
+    seen = set()
+    for chunk in chunked({tx_hash for tx_hash, _ in keys}):
+        seen.update(db.execute(select(
+            models.ProcessedEvent.transaction_hash, models.ProcessedEvent.log_index
+        ).filter(models.ProcessedEvent.transaction_hash.in_(chunk))).tuples())
+
+    new_events = []
+    for event, key in zip(events, keys):
+        if key in seen:
+            continue
+        seen.add(key)
+        new_events.append(event)
+        db.add(models.ProcessedEvent(
+            transaction_hash=key[0], log_index=key[1],
+            block_number=event.get("blockNumber"), event_name=event.get("event")
+        ))
+    return new_events
+
+def load_checkpoint(name):
+    """Last block processed by the named stream, or None if it never ran"""
+    with SessionLocal() as db:
+        checkpoint = db.get(models.ListenerCheckpoint, name)
+        return checkpoint.last_block if checkpoint else None
+
+def save_checkpoint(db: Session, name, block_number):
+    checkpoint = db.get(models.ListenerCheckpoint, name)
+    if checkpoint is None:
+        db.add(models.ListenerCheckpoint(name=name, last_block=block_number))
+    elif block_number > checkpoint.last_block:
+        checkpoint.last_block = block_number
+
+# Registry of event handlers keyed by (contract name, event name). A handler
+# receives a list of decoded events of that type, in log order, and applies
+# them inside the caller's transaction. It returns the number of rows changed.
+EVENT_HANDLERS = {}
+
+def event_handler(contract_name, event_name):
+    def register(handler):
+        EVENT_HANDLERS[(contract_name, event_name)] = handler
+        return handler
+    return register
+
+WEI_PER_ETH = 10 ** 18
+
+# Event arguments are uint256 and unbounded strings; BIGINT columns hold at most this
+MAX_BIGINT = 2 ** 63 - 1
+
+def fit_text(column, value):
+    """`value` as a string cut to the length of a String `column`"""
+    value = str(value)
+    length = column.type.length
+    return value[:length] if length else value
+
+def events_with_bigint_id(events, arg):
+    """`events` whose `arg` fits a BIGINT column; the others are logged and dropped"""
+    kept = []
+    for event in events:
+        if 0 <= event["args"][arg] <= MAX_BIGINT:
+            kept.append(event)
+        else:
+            logger.warning(f"Skipping {event['event']} in {normalize_tx_hash(event['transactionHash'])}: "
+                           f"{arg} {event['args'][arg]} is out of range")
+    return kept
+
+def load_transactions_by_escrow_id(db: Session, escrow_ids):
+    """Transactions (with asset and buyer) for a set of escrow transaction ids"""
+    transactions = {}
+    for chunk in chunked(escrow_ids):
+        for tx_record in db.scalars(select(models.Transaction).options(
+            joinedload(models.Transaction.asset), joinedload(models.Transaction.buyer)
+        ).filter(models.Transaction.escrow_transaction_id.in_(chunk))):
+            transactions[tx_record.escrow_transaction_id] = tx_record
+    return transactions
+
+def load_assets_by_escrow_id(db: Session, escrow_ids):
+    assets = {}
+    for chunk in chunked(escrow_ids):
+        for asset_record in db.scalars(select(models.Asset).filter(models.Asset.escrow_asset_id.in_(chunk))):
+            assets[asset_record.escrow_asset_id] = asset_record
+    return assets
+
+@event_handler("MememonizeNFT", "NFTPurchased")
+def apply_nft_purchased_events(db: Session, events):
+    """
+    Mark the pending transactions of NFT purchases completed and hand the
+    token to the buyer. The pending transactions and assets for the whole
+    batch are resolved with two IN (...) lookups; events are applied in log
+    order so the last purchase of a token decides its owner.
+    """
+    decoded = [
+        (normalize_tx_hash(event["transactionHash"]), str(event["args"].get("tokenId")), event["args"].get("buyer"))
+        for event in events
+    ]
+    pending = load_pending_transactions(db, {tx_hash for tx_hash, _, _ in decoded})
+    assets = load_assets_by_token(db, {token_id for _, token_id, _ in decoded})
+
+    updated = 0
+    completed = []
+    for tx_hash, token_id, buyer in decoded:
+        tx_record = pending.pop(tx_hash, None)
+        if tx_record:
+            tx_record.status = "completed"
+            completed.append(tx_record)
+            updated += 1
+        else:
+            logger.warning(f"No matching pending transaction found for transaction hash: {tx_hash}")
+
+        asset_record = assets.get(token_id)
+        if asset_record:
+            asset_record.owner_address = buyer
+            asset_record.is_available = False
+            updated += 1
+        else:
+            logger.warning(f"No asset found for token ID: {token_id}")
+    record_trades_completed(db, completed)
+    return updated
+
+@event_handler("MememonizeNFT", "Transfer")
+def apply_transfer_events(db: Session, events):
+    """
+    Queue tokens for the metadata indexer (token_metadata.py): a mint
+    (re)queues its token, a transfer queues a token minted before the
+    listener indexed Transfer events.
+    """
+    token_ids = {str(event["args"]["tokenId"]) for event in events}
+    minted = {str(event["args"]["tokenId"]) for event in events if int(event["args"]["from"], 16) == 0}
+    known = {}
+    for chunk in chunked(token_ids):
+        known.update((record.token_id, record) for record in db.scalars(
+            select(models.TokenMetadata).filter(models.TokenMetadata.token_id.in_(chunk))
+        ))
+    now = utcnow()
+    queued = 0
+    for token_id in token_ids:
+        record = known.get(token_id)
+        if record is None:
+            db.add(models.TokenMetadata(token_id=token_id, status="pending", attempts=0, next_attempt_at=now))
+        elif token_id in minted:
+            # Also drops the claim of an indexer pass that is fetching the old URI
+            record.token_uri, record.claim = None, None
+            record.status, record.attempts, record.next_attempt_at = "pending", 0, now
+        else:
+            continue
+        queued += 1
+    return queued
+
+@event_handler("MememonizeEscrow", "AssetListed")
+def apply_asset_listed_events(db: Session, events):
+    """
+    Create or refresh the asset row for each escrow listing. The listing is
+    whatever the lister sent to the contract: names longer than the column
+    are cut, and a listing whose id does not fit the database is logged and
+    skipped, so one event cannot fail the batch and stall the listener.
+    """
+    listings = [event["args"] for event in events_with_bigint_id(events, "assetId")]
+    assets = load_assets_by_escrow_id(db, {args["assetId"] for args in listings})
+    for args in listings:
+        asset_record = assets.get(args["assetId"])
+        if asset_record is None:
+            asset_record = models.Asset(escrow_asset_id=args["assetId"])
+            db.add(asset_record)
+            assets[args["assetId"]] = asset_record
+        asset_record.name = fit_text(models.Asset.name, args["name"])
+        asset_record.price = args["price"] / WEI_PER_ETH
+        asset_record.owner_address = fit_text(models.Asset.owner_address, args["owner"])
+        asset_record.is_available = True
+    return len(listings)
+
+@event_handler("MememonizeEscrow", "AssetPurchased")
+def apply_asset_purchased_events(db: Session, events):
+    """
+    Link escrow purchases to their transaction rows (matched on transaction
+    hash, or created when the purchase did not go through the API) and take
+    the asset off the market while funds are held in escrow.
+    """
+    events = events_with_bigint_id(events, "transactionId")
+    pending = load_pending_transactions(db, {normalize_tx_hash(event["transactionHash"]) for event in events})
+    assets = load_assets_by_escrow_id(db, {event["args"]["assetId"] for event in events})
+    known = load_transactions_by_escrow_id(db, {event["args"]["transactionId"] for event in events})
+    user_ids = upsert_users(db, {event["args"][role] for event in events for role in ("buyer", "seller")})
+
+    updated = 0
+    created = []
+    for event in events:
+        args = event["args"]
+        if args["transactionId"] in known:
+            continue
+        asset_record = assets.get(args["assetId"])
+        tx_record = pending.pop(normalize_tx_hash(event["transactionHash"]), None)
+        if tx_record is None:
+            if asset_record is None:
+                logger.warning(f"No asset found for escrow asset ID: {args['assetId']}")
+                continue
+            tx_record = models.Transaction(
+                asset_id=asset_record.id, price=args["price"] / WEI_PER_ETH,
+                transaction_hash=normalize_tx_hash(event["transactionHash"]), status="pending"
+            )
+            db.add(tx_record)
+            created.append((asset_record.category, tx_record.price))
+        tx_record.escrow_transaction_id = args["transactionId"]
+        tx_record.buyer_id = user_ids[args["buyer"]]
+        tx_record.seller_id = user_ids[args["seller"]]
+        known[args["transactionId"]] = tx_record
+        if asset_record is not None:
+            asset_record.is_available = False
+        updated += 1
+    record_trades_created(db, created)
+    return updated
+
+def settle_escrow_transactions(db: Session, events, status):
+    transactions = load_transactions_by_escrow_id(db, {event["args"]["transactionId"] for event in events})
+    updated = 0
+    completed = []
+    for event in events:
+        tx_record = transactions.get(event["args"]["transactionId"])
+        if tx_record is None:
+            logger.warning(f"No transaction found for escrow transaction ID: {event['args']['transactionId']}")
+            continue
+        tx_record.status = status
+        if status == "completed":
+            completed.append(tx_record)
+        if tx_record.asset is not None:
+            if status == "completed" and tx_record.buyer is not None:
+                tx_record.asset.owner_address = tx_record.buyer.wallet_address
+            # The contract relists the asset: for the new owner on completion,
+            # for the original owner on cancellation
+            tx_record.asset.is_available = True
+        updated += 1
+    record_trades_completed(db, completed)
+    return updated
+
+@event_handler("MememonizeEscrow", "TransactionCompleted")
+def apply_transaction_completed_events(db: Session, events):
+    """Escrow released: the buyer now owns the asset"""
+    return settle_escrow_transactions(db, events, "completed")
+
+@event_handler("MememonizeEscrow", "TransactionCancelled")
+def apply_transaction_cancelled_events(db: Session, events):
+    """Escrow refunded: the asset goes back on sale for its original owner"""
+    return settle_escrow_transactions(db, events, "cancelled")
+
+def track_asset_changes(db: Session):
+    """Collect the ids of assets the session inserts, updates or deletes"""
+    changed = set()
+
+    @event.listens_for(db, "after_flush")
+    def collect(session, flush_context):
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, models.Asset) and obj.id is not None:
+                changed.add(obj.id)
+
+    return changed
+
+def apply_events(db: Session, entries):
+    """
+    Dispatch (contract name, decoded event) pairs to their handlers.
+
+    Consecutive events of the same type are handed over together so handlers
+    can batch their lookups, while the overall log order is preserved.
+    """
+    updated = 0
+    run = []
+    for contract_name, event in entries + [(None, None)]:
+        key = (contract_name, event["event"]) if event is not None else None
+        if run and key != run[0][0]:
+            handler = EVENT_HANDLERS.get(run[0][0])
+            if handler is None:
+                logger.warning(f"No handler registered for {run[0][0][0]}.{run[0][0][1]}")
+            else:
+                start = time.perf_counter()
+                updated += handler(db, [e for _, e in run])
+                # Later handlers query rows this one changed
+                db.flush()
+                contract_name, event_name = run[0][0]
+                HANDLER_DURATION.observe(time.perf_counter() - start, contract=contract_name, event=event_name)
+                EVENTS_PROCESSED.inc(len(run), contract=contract_name, event=event_name)
+            run = []
+        if key is not None:
+            run.append((key, event))
+    return updated
+
+def process_event_batch(entries, checkpoint=None, lease=None):
+    """
+    Apply a batch of (contract name, decoded event) pairs in a single database
+    transaction and report the ingestion rate. Returns the number of events
+    in the batch.
+
+    Events already applied by an earlier run are skipped. `checkpoint` is an
+    optional (stream name, block number) pair advanced in the same
+    transaction, so the checkpoint never gets ahead of applied data. When
+    the blocks were claimed with a listener_leases.Lease, the lease moves the
+    checkpoint instead, and the batch is rolled back unless this replica still
+    holds it. Errors are logged and re-raised after rolling back.
+    """
+    if not entries and checkpoint is None:
+        return 0
+    start = time.perf_counter()
+    db: Session = SessionLocal()
+    changed_assets = track_asset_changes(db)
+    changes = live_updates.track_changes(db)
+    try:
+        if lease is not None:
+            # First, so a replica that lost its lease stops before doing any work
+            lease.advance(db, checkpoint[1])
+        new_events = claim_new_events(db, [event for _, event in entries])
+        new_ids = {id(event) for event in new_events}
+        updated = apply_events(db, [(name, event) for name, event in entries if id(event) in new_ids])
+        if checkpoint is not None and lease is None:
+            save_checkpoint(db, *checkpoint)
+        db.flush()
+        updates = changes.updates()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error updating records for a batch of {len(entries)} events: {e}")
+        raise
+    finally:
+        db.close()
+    if changed_assets:
+        # Ownership and availability changed: drop the cached copies
+        cache.invalidate_assets_sync(changed_assets)
+    live_updates.publish_sync(updates)
+    if not entries:
+        return 0
+    elapsed = time.perf_counter() - start
+    BATCH_DURATION.observe(elapsed)
+    EVENTS_SKIPPED.inc(len(entries) - len(new_events))
+    logger.info(
+        f"Applied {len(entries)} events ({len(entries) - len(new_events)} already processed, "
+        f"{updated} records updated) in {elapsed:.3f}s, {len(entries) / elapsed:.0f} events/s"
+    )
+    return len(entries)
+
+def process_nft_purchased_batch(events, checkpoint=None):
+    """Apply a batch of NFTPurchased events; see process_event_batch"""
+    return process_event_batch([("MememonizeNFT", event) for event in events], checkpoint=checkpoint)
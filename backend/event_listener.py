@@ -1,15 +1,25 @@
 import os
-import json
-import time
+import asyncio
 import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-from web3 import Web3
+from web3 import AsyncWeb3, Web3, WebSocketProvider
 from dotenv import load_dotenv
 
-# Import SQLAlchemy session and models
-from sqlalchemy.orm import Session
-from database import SessionLocal
+# Database side of event processing
+from database import Base, engine
 import models
+from event_handlers import (
+    EVENT_HANDLERS, load_checkpoint, normalize_tx_hash, process_event_batch, process_nft_purchased_batch
+)
+from contract_artifacts import ArtifactError, artifacts
+import listener_leases
+from listener_leases import LeaseLost
+import metrics
+from token_metadata import METADATA_WORKERS, MetadataIndexer
 
 # Load environment variables from .env file
 load_dotenv()
@@ -23,15 +33,49 @@ WS_PROVIDER_URL = os.getenv("WS_PROVIDER_URL", "wss://your-websocket-provider-ur
 CONTRACT_ADDRESS = os.getenv("CONTRACT_ADDRESS", "0xYourContractAddress")
 # Path to the contract's ABI JSON file. Adjust the path relative to this file.
 CONTRACT_ABI_PATH = os.getenv("CONTRACT_ABI_PATH", "../smart-contracts/build/contracts/MememonizeNFT.json")
+# The escrow contract is indexed when its address is configured
+ESCROW_CONTRACT_ADDRESS = os.getenv("ESCROW_CONTRACT_ADDRESS")
+ESCROW_ABI_PATH = os.getenv("ESCROW_ABI_PATH", "../smart-contracts/build/contracts/MememonizeEscrow.json")
+# Maximum number of events applied per database transaction
+EVENT_BATCH_SIZE = int(os.getenv("EVENT_BATCH_SIZE", "500"))
+# Catch-up: blocks per get_logs request and number of concurrent fetchers
+BACKFILL_CHUNK_SIZE = int(os.getenv("BACKFILL_CHUNK_SIZE", "2000"))
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "4"))
+# First block to index when no checkpoint exists yet (defaults to the chain head)
+LISTENER_START_BLOCK = os.getenv("LISTENER_START_BLOCK")
+# Live tailing: eth_subscribe push, with adaptive polling whenever subscriptions are unavailable
+MIN_POLL_INTERVAL = float(os.getenv("LISTENER_MIN_POLL_INTERVAL", "0.5"))
+MAX_POLL_INTERVAL = float(os.getenv("LISTENER_MAX_POLL_INTERVAL", "15"))
+RECONNECT_MAX_BACKOFF = float(os.getenv("LISTENER_RECONNECT_MAX_BACKOFF", "60"))
+# Checkpoint stream shared by every indexed contract
+CHECKPOINT_NAME = os.getenv("LISTENER_CHECKPOINT_NAME", "indexer")
+# Replica coordination: "none" (default) for a single listener process, or
+# "lease" to run several replicas against the same database. Replicas claim
+# BACKFILL_CHUNK_SIZE-block ranges through leases (see listener_leases.py),
+# fetch them in parallel and apply them in block order. They poll instead of
+# subscribing, since every replica would receive every pushed log.
+LISTENER_COORDINATION = os.getenv("LISTENER_COORDINATION", "none")
+# How often a replica waiting for earlier ranges to be applied checks on them
+LEASE_WAIT_INTERVAL = 0.05
+# Prometheus scrape port for the listener's own metrics (0 disables it)
+LISTENER_METRICS_PORT = int(os.getenv("LISTENER_METRICS_PORT", "9102"))
+
+HEAD_BLOCK = metrics.registry.gauge("listener_head_block", "Latest block number seen on the chain")
+APPLIED_BLOCK = metrics.registry.gauge("listener_applied_block", "Last block whose events are committed")
+LAG_BLOCKS = metrics.registry.gauge("listener_lag_blocks", "Blocks between the chain head and the last applied block")
 
-# Load contract ABI
+# Contracts to index: name -> (ABI path, address). Every event of these
+# contracts with a handler registered in event_handlers.EVENT_HANDLERS is indexed.
+INDEXED_CONTRACTS = {"MememonizeNFT": (CONTRACT_ABI_PATH, CONTRACT_ADDRESS)}
+if ESCROW_CONTRACT_ADDRESS:
+    INDEXED_CONTRACTS["MememonizeEscrow"] = (ESCROW_ABI_PATH, ESCROW_CONTRACT_ADDRESS)
+
+# Load contract ABIs from the shared artifact registry
+contract_abis = {}
 try:
-    with open(CONTRACT_ABI_PATH) as abi_file:
-        contract_json = json.load(abi_file)
-        contract_abi = contract_json.get("abi")
-        if not contract_abi:
-            raise Exception("ABI not found in contract JSON.")
-except Exception as e:
+    for contract_name, (abi_path, _) in INDEXED_CONTRACTS.items():
+        contract_abis[contract_name] = artifacts.load(abi_path).abi
+except ArtifactError as e:
     logger.error(f"Error loading contract ABI: {e}")
     exit(1)
 
@@ -43,89 +87,325 @@ if not web3.is_connected():
 else:
     logger.info("Connected to Web3 provider.")
 
-# Create contract instance
-contract = web3.eth.contract(
-    address=Web3.to_checksum_address(CONTRACT_ADDRESS),
-    abi=contract_abi
-)
+# LegacyWebSocketProvider answers one request at a time on its socket, so
+# `web3` only serves the checks above and the contract ABIs below. Every
+# thread that calls the node (backfill workers, the asyncio.to_thread
+# callers) goes through thread_web3(), with a connection of its own.
+_thread_local = threading.local()
+
+def thread_web3():
+    """This thread's Web3 connection to WS_PROVIDER_URL, opened on first use"""
+    if not hasattr(_thread_local, "web3"):
+        _thread_local.web3 = Web3(Web3.LegacyWebSocketProvider(WS_PROVIDER_URL))
+    return _thread_local.web3
+
+# Long-lived, so backfill workers keep their connections from one catch-up to the next
+backfill_pool = ThreadPoolExecutor(max_workers=BACKFILL_WORKERS, thread_name_prefix="backfill")
+
+# Create contract instances
+contracts = {
+    contract_name: web3.eth.contract(address=Web3.to_checksum_address(address), abi=contract_abis[contract_name])
+    for contract_name, (_, address) in INDEXED_CONTRACTS.items()
+}
+contract = contracts["MememonizeNFT"]
+
+def topic_key(value):
+    return normalize_tx_hash(value).lower()
+
+# Route raw logs to (contract name, event decoder) by (address, topic0), and
+# build the single filter that fetches every indexed event in one pass
+LOG_ROUTES = {}
+for contract_name, event_name in EVENT_HANDLERS:
+    if contract_name in contracts:
+        event_type = getattr(contracts[contract_name].events, event_name)()
+        LOG_ROUTES[(contracts[contract_name].address.lower(), topic_key(event_type.topic))] = (contract_name, event_type)
+        logger.info(f"Indexing {contract_name}.{event_name}")
+LOG_FILTER = {
+    "address": [indexed.address for indexed in contracts.values()],
+    "topics": [sorted({topic for _, topic in LOG_ROUTES})],
+}
 
 def update_transaction_status(event):
     """
     Given a blockchain NFTPurchased event, update the corresponding transaction
     record in the database and update the asset record with the new owner address.
     """
-    # Extract transaction hash from the event
-    event_tx_hash = event.transactionHash.hex()
-    # Normalize to always have a "0x" prefix
-    if not event_tx_hash.startswith("0x"):
-        event_tx_hash = "0x" + event_tx_hash
-    
-    # Extract additional event details if needed
-    token_id = event['args'].get('tokenId')
-    buyer = event['args'].get('buyer')
-    seller = event['args'].get('seller')
-    price = event['args'].get('price')
-    
-    logger.info(f"Processing NFTPurchased event for tx hash: {event_tx_hash}")
-    logger.info(f"Token ID: {token_id}, Buyer: {buyer}, Seller: {seller}, Price: {price}")
-
-    db: Session = SessionLocal()
-    try:
-        # Find a pending transaction with matching transaction_hash
-        tx_record = db.query(models.Transaction).filter(
-            models.Transaction.transaction_hash == event_tx_hash,
-            models.Transaction.status == "pending"
-        ).first()
-
-        if tx_record:
-            logger.info(f"Found pending transaction record (ID: {tx_record.id}). Marking as 'completed'.")
-            tx_record.status = "completed"
-            # Optionally update other fields (for example, tokenId, price, etc.)
-        else:
-            logger.warning(f"No matching pending transaction found for transaction hash: {event_tx_hash}")
-            
-        # Update asset record with new owner
-        asset_record = db.query(models.Asset).filter(models.Asset.token_id == str(token_id)).first()
-        if asset_record:
-            logger.info(f"Updating asset (ID: {asset_record.id}) owner to buyer: {buyer} and marking as unavailable.")
-            asset_record.owner_address = buyer
-            asset_record.is_available = False
+    logger.info(f"Processing NFTPurchased event for tx hash: {normalize_tx_hash(event['transactionHash'])}")
+    process_nft_purchased_batch([event])
+
+# Highest chain head and applied block seen, for the lag gauge
+observed_blocks = {"head": None, "applied": None}
+
+def observe_blocks(head=None, applied=None):
+    """Track the chain head and the last applied block, and the lag between them"""
+    for name, block, gauge in (("head", head, HEAD_BLOCK), ("applied", applied, APPLIED_BLOCK)):
+        if block is not None:
+            observed_blocks[name] = max(observed_blocks[name] or 0, block)
+            gauge.set(observed_blocks[name])
+    if observed_blocks["head"] is not None and observed_blocks["applied"] is not None:
+        LAG_BLOCKS.set(max(observed_blocks["head"] - observed_blocks["applied"], 0))
+
+def block_ranges(start_block, end_block, size):
+    """Split [start_block, end_block] into consecutive ranges of at most `size` blocks"""
+    for from_block in range(start_block, end_block + 1, size):
+        yield from_block, min(from_block + size - 1, end_block)
+
+def decode_logs(raw_logs):
+    """Decode raw logs into (contract name, event) pairs, dropping unrouted ones"""
+    entries = []
+    for raw_log in raw_logs:
+        if raw_log.get("removed") or not raw_log["topics"]:
+            continue
+        route = LOG_ROUTES.get((raw_log["address"].lower(), topic_key(raw_log["topics"][0])))
+        if route is not None:
+            contract_name, event_type = route
+            entries.append((contract_name, event_type.process_log(raw_log)))
+    return entries
+
+def fetch_logs(block_range):
+    """Every indexed event of every indexed contract in one get_logs request"""
+    from_block, to_block = block_range
+    return decode_logs(thread_web3().eth.get_logs({"fromBlock": from_block, "toBlock": to_block, **LOG_FILTER}))
+
+def apply_block_range(block_range, entries, lease=None):
+    """
+    Apply one range's events in batches, advancing the checkpoint with the
+    last batch. With a lease, every batch checks that this replica still
+    holds the range and advances the checkpoint up to its own blocks. Returns
+    the number of events in the range.
+    """
+    from_block, to_block = block_range
+    entries = sorted(entries, key=lambda entry: (entry[1]["blockNumber"], entry[1]["logIndex"]))
+    batches = [entries[i:i + EVENT_BATCH_SIZE] for i in range(0, len(entries), EVENT_BATCH_SIZE)] or [[]]
+    for i, batch in enumerate(batches):
+        if i == len(batches) - 1:
+            checkpoint = (CHECKPOINT_NAME, to_block)
+        elif lease is not None:
+            # Blocks before the next batch's first event are complete
+            checkpoint = (CHECKPOINT_NAME, batches[i + 1][0][1]["blockNumber"] - 1)
         else:
-            logger.warning(f"No asset found for token ID: {token_id}")
-            
-        db.commit()
-        logger.info("Database records updated successfully.")
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Error updating records: {e}")
-    finally:
-        db.close()
+            checkpoint = None
+        process_event_batch(batch, checkpoint=checkpoint, lease=lease)
+    observe_blocks(applied=to_block)
+    if entries:
+        logger.info(f"Blocks {from_block}-{to_block}: applied {len(entries)} events")
+    return len(entries)
 
-def listen_for_nft_purchased_events(poll_interval=5):
+def catch_up(head=None):
     """
-    Listen for NFTPurchased events emitted by the smart contract and process them.
+    Process every block between the checkpoint and the chain head.
+
+    Block ranges are fetched concurrently by a bounded worker pool but applied
+    strictly in order, each range committing its checkpoint together with its
+    data. Events are deduplicated on (tx hash, log index), so a crash anywhere
+    in here is safe to restart. Returns the number of events processed.
     """
+    if head is None:
+        head = thread_web3().eth.block_number
+    last_block = load_checkpoint(CHECKPOINT_NAME)
+    if last_block is None:
+        last_block = start_block(head) - 1
+    observe_blocks(head=head, applied=last_block)
+    if last_block >= head:
+        return 0
+
+    if head - last_block > BACKFILL_CHUNK_SIZE:
+        logger.info(f"Backfilling blocks {last_block + 1}-{head}")
+    ranges = block_ranges(last_block + 1, head, BACKFILL_CHUNK_SIZE)
+    in_flight = deque()
+    processed = 0
+    # Keep a bounded window of fetches ahead of the range being applied
+    for block_range in ranges:
+        in_flight.append((block_range, backfill_pool.submit(fetch_logs, block_range)))
+        if len(in_flight) >= BACKFILL_WORKERS * 2:
+            break
     try:
-        # Create an event filter for the NFTPurchased event starting from the latest block
-        nft_purchased_filter = contract.events.NFTPurchased.create_filter(from_block='latest')
-    except Exception as e:
-        logger.error(f"Error creating NFTPurchased event filter: {e}")
-        return
+        while in_flight:
+            block_range, future = in_flight.popleft()
+            logs = future.result()
+            next_range = next(ranges, None)
+            if next_range is not None:
+                in_flight.append((next_range, backfill_pool.submit(fetch_logs, next_range)))
+            processed += apply_block_range(block_range, logs)
+    finally:
+        # A failed range ends this pass; fetches that have not started yet are dropped
+        for _, future in in_flight:
+            future.cancel()
+    return processed
+
+def start_block(head):
+    """First block to index when the checkpoint stream never ran"""
+    return int(LISTENER_START_BLOCK) if LISTENER_START_BLOCK else head
+
+def wait_for_turn(lease):
+    """
+    Wait until every block before `lease` is applied, renewing the lease.
+
+    A range before it whose lease expired is taken over and processed here:
+    its replica died, and every other replica may be waiting on it too.
+    """
+    renewed = time.monotonic()
+    while (load_checkpoint(CHECKPOINT_NAME) or 0) < lease.from_block - 1:
+        expired = listener_leases.claim_expired(CHECKPOINT_NAME, below=lease.from_block)
+        if expired is not None:
+            try:
+                process_lease(expired)
+            except LeaseLost as e:
+                logger.warning(str(e))
+        else:
+            time.sleep(LEASE_WAIT_INTERVAL)
+        if time.monotonic() - renewed > listener_leases.LISTENER_LEASE_SECONDS / 3:
+            lease.renew()
+            renewed = time.monotonic()
 
-    logger.info("Started listening for NFTPurchased events...")
+def process_lease(lease):
+    """Fetch a claimed range, then apply it once the ranges before it are applied"""
+    entries = fetch_logs(lease.block_range)
+    lease.renew()
+    wait_for_turn(lease)
+    return apply_block_range(lease.block_range, entries, lease=lease)
+
+def catch_up_replica(head=None):
+    """
+    catch_up() for one of several replicas: claim block ranges up to the
+    chain head, expired ones first, and process them one at a time. Ranges
+    are fetched concurrently across replicas and applied in block order.
+    Returns the number of events processed.
+    """
+    if head is None:
+        head = thread_web3().eth.block_number
+    observe_blocks(head=head)
+    processed = 0
     while True:
+        lease = listener_leases.claim_expired(CHECKPOINT_NAME) or listener_leases.claim_next(
+            CHECKPOINT_NAME, head, BACKFILL_CHUNK_SIZE, start_block(head)
+        )
+        if lease is None:
+            return processed
+        try:
+            processed += process_lease(lease)
+        except LeaseLost as e:
+            # Stalled past its lease: another replica applies the range
+            logger.warning(str(e))
+
+def apply_pushed_logs(raw_logs):
+    """Decode raw logs delivered by a subscription and apply them as one batch"""
+    entries = decode_logs(raw_logs)
+    if not entries:
+        return 0
+    # Only blocks before the earliest pushed log are known to be complete
+    checkpoint = (CHECKPOINT_NAME, min(event["blockNumber"] for _, event in entries) - 1)
+    processed = process_event_batch(entries, checkpoint=checkpoint)
+    # Pushed logs come from the newest blocks; their events are now applied
+    newest = max(event["blockNumber"] for _, event in entries)
+    observe_blocks(head=newest, applied=newest)
+    return processed
+
+async def subscribe_to_events(on_subscribed=None):
+    """
+    Apply indexed logs pushed by the node through eth_subscribe.
+
+    Runs until the connection drops or the node rejects the subscription, and
+    raises in both cases. Logs that queue up while a batch is being written
+    are drained and applied together.
+    """
+    async with AsyncWeb3(WebSocketProvider(WS_PROVIDER_URL)) as w3:
+        await w3.eth.subscribe("logs", LOG_FILTER)
+        logger.info("Subscribed to contract logs")
+        if on_subscribed:
+            on_subscribed()
+        # Pick up anything mined between the checkpoint and the subscription going live
+        await asyncio.to_thread(catch_up)
+
+        queue = asyncio.Queue()
+
+        async def read_subscription():
+            async for payload in w3.socket.process_subscriptions():
+                queue.put_nowait(payload["result"])
+
+        reader = asyncio.create_task(read_subscription())
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, reader}, return_when=asyncio.FIRST_COMPLETED)
+                if getter not in done:
+                    getter.cancel()
+                    reader.result()
+                    raise ConnectionError("Subscription stream ended")
+                logs = [getter.result()]
+                while not queue.empty() and len(logs) < EVENT_BATCH_SIZE:
+                    logs.append(queue.get_nowait())
+                await asyncio.to_thread(apply_pushed_logs, logs)
+        finally:
+            reader.cancel()
+
+async def poll_for_events(duration=None, step=catch_up):
+    """
+    Adaptive polling fallback: catch up from the checkpoint, then poll again
+    after MIN_POLL_INTERVAL while events keep arriving, doubling the interval
+    up to MAX_POLL_INTERVAL while the contract is idle. `step` is the catch-up
+    function to run.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = None if duration is None else loop.time() + duration
+    interval = MIN_POLL_INTERVAL
+    while deadline is None or loop.time() < deadline:
         try:
-            new_events = nft_purchased_filter.get_new_entries()
-            for event in new_events:
-                logger.info(f"New NFTPurchased event: {event}")
-                update_transaction_status(event)
+            processed = await asyncio.to_thread(step)
         except Exception as e:
             logger.error(f"Error processing events: {e}")
-        
-        time.sleep(poll_interval)
+            processed = 0
+        interval = MIN_POLL_INTERVAL if processed else min(interval * 2, MAX_POLL_INTERVAL)
+        if deadline is not None:
+            interval = min(interval, max(deadline - loop.time(), 0))
+        await asyncio.sleep(interval)
+
+async def listen_for_events():
+    """
+    Listen for the events of every indexed contract and process them.
+
+    Catches up from the persisted checkpoint, then prefers push delivery over
+    an eth_subscribe log subscription. When the subscription is unavailable or
+    the connection drops, it polls adaptively while waiting to reconnect, with
+    exponential backoff between attempts. Replicas (LISTENER_COORDINATION=lease)
+    only poll.
+    """
+    if LISTENER_COORDINATION == "lease":
+        logger.info(f"Started listening for contract events as replica {listener_leases.LISTENER_REPLICA_ID}...")
+        await poll_for_events(step=catch_up_replica)
+        return
+
+    backoff = 1.0
+
+    def reset_backoff():
+        nonlocal backoff
+        backoff = 1.0
+
+    logger.info("Started listening for contract events...")
+    while True:
+        try:
+            await subscribe_to_events(on_subscribed=reset_backoff)
+        except Exception as e:
+            logger.warning(f"Log subscription unavailable ({e}); polling for {backoff:.0f}s before reconnecting")
+        await poll_for_events(duration=backoff)
+        backoff = min(backoff * 2, RECONNECT_MAX_BACKOFF)
+
+async def run_listener():
+    """Index contract events and, unless METADATA_WORKERS is 0, the metadata of minted tokens"""
+    tasks = [listen_for_events()]
+    if METADATA_WORKERS:
+        # Its own socket: tokenURI batches run in a worker thread, concurrently
+        # with the listener's requests on web3.provider
+        tasks.append(MetadataIndexer(Web3.LegacyWebSocketProvider(WS_PROVIDER_URL), contract.address).run())
+    await asyncio.gather(*tasks)
 
 if __name__ == "__main__":
+    # Make sure the checkpoint and processed-event tables exist
+    Base.metadata.create_all(bind=engine)
+    if LISTENER_METRICS_PORT:
+        metrics.start_http_server(LISTENER_METRICS_PORT)
+        logger.info(f"Serving metrics on :{LISTENER_METRICS_PORT}/metrics")
     try:
-        listen_for_nft_purchased_events()
+        asyncio.run(run_listener())
     except KeyboardInterrupt:
         logger.info("Event listener shutdown requested. Exiting...")
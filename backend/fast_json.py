@@ -0,0 +1,111 @@
+import json
+import os
+from datetime import date, datetime
+
+from fastapi.responses import JSONResponse
+from pydantic_core import PydanticUndefined
+from sqlalchemy.orm import aliased
+
+try:
+    # Optional: the fast path falls back to the stdlib encoder without it
+    import orjson
+except ImportError:
+    orjson = None
+
+# Opt-in fast serialization for list endpoints. Rows are selected as plain
+# column tuples (no ORM identity map, no Pydantic validation per row) and
+# encoded straight to JSON bytes. The routes keep their response_model, so
+# the OpenAPI schema is unchanged.
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() == "true"
+
+def encode_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content):
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=encode_default, separators=(",", ":")).encode()
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by orjson when installed; datetimes become ISO 8601"""
+
+    def render(self, content):
+        return dumps(content)
+
+class Projection:
+    """
+    Maps a response schema onto the columns of a mapped class.
+
+    Scalar fields become selected columns; `nested` maps relationship fields
+    to (Projection, join condition factory) pairs, loaded through aliased outer
+    joins. Schema fields the model does not have take their schema default,
+    as they would through orm_mode.
+    """
+
+    def __init__(self, schema, model, nested=None):
+        self.schema = schema
+        self.model = model
+        self.nested = nested or {}
+        self._bound = None
+
+    def bind(self, entity=None):
+        """Column list plus a row -> dict builder for this projection rooted at `entity`"""
+        entity = entity if entity is not None else self.model
+        columns, builders, joins = [], [], []
+        for name, field in self.schema.model_fields.items():
+            if name in self.nested:
+                projection, on = self.nested[name]
+                target = aliased(projection.model)
+                nested_columns, build_nested, nested_joins = projection.bind(target)
+                joins.append((target, on(entity, target)))
+                joins.extend(nested_joins)
+                builders.append((name, len(columns), len(nested_columns), build_nested))
+                columns.extend(nested_columns)
+            elif hasattr(entity, name):
+                builders.append((name, len(columns), 1, None))
+                columns.append(getattr(entity, name))
+            else:
+                default = None if field.default is PydanticUndefined else field.default
+                builders.append((name, None, default, None))
+
+        def build(row):
+            item = {}
+            for name, start, width, build_nested in builders:
+                if start is None:
+                    item[name] = width
+                elif build_nested is None:
+                    item[name] = row[start]
+                else:
+                    values = row[start:start + width]
+                    # An outer join that matched nothing yields all NULLs
+                    item[name] = build_nested(values) if any(v is not None for v in values) else None
+            return item
+
+        return columns, build, joins
+
+    def apply(self, statement):
+        """Project `statement` (filters, ordering and limit kept) onto this schema"""
+        # Bound once: fresh aliases per call would defeat the compiled statement cache
+        if self._bound is None:
+            self._bound = self.bind()
+        columns, build, joins = self._bound
+        statement = statement.with_only_columns(*columns)
+        for target, on in joins:
+            statement = statement.outerjoin(target, on)
+        return statement, build
+
+async def fetch(db, statement, projection):
+    """Execute `statement` through `projection` and return the rows as dicts"""
+    projected, build = projection.apply(statement)
+    result = await db.execute(projected)
+    return [build(row) for row in result.all()]
+
+def fast_response(content, response):
+    """Render `content` directly, keeping headers already set on the injected response"""
+    fast = FastJSONResponse(content)
+    for name, value in response.headers.items():
+        if name not in ("content-length", "content-type"):
+            fast.headers[name] = value
+    return fast
@@ -0,0 +1,290 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import aiohttp
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+from metrics import registry
+from remote_fetch import FetchError, download
+
+try:
+    # Optional: without Pillow, GET /api/assets/{id}/image redirects to the original
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+load_dotenv()
+
+logger = logging.getLogger("ImageProxy")
+
+# Resized asset images (GET /api/assets/{id}/image?w=256). Each origin URL is
+# downloaded once; the original and its WebP/JPEG variants are stored on disk
+# under the SHA-256 of the original's bytes, so assets sharing an image share
+# its files.
+#   IMAGE_CACHE_DIR          where originals and variants are kept
+#   IMAGE_CACHE_MAX_BYTES    total size of the cache; least recently served
+#                            files are deleted beyond it
+#   IMAGE_WIDTHS             widths served; a requested width is rounded up to
+#                            the next one (the largest caps it), which bounds
+#                            the variants per image
+#   IMAGE_QUALITY            WebP and JPEG encoder quality
+#   IMAGE_FETCH_TIMEOUT      seconds allowed for downloading an original
+#   IMAGE_MAX_SOURCE_BYTES   larger originals are refused
+#   IMAGE_MAX_PIXELS         originals with more pixels are refused (decoding
+#                            them would need width * height * 4 bytes)
+#   IMAGE_ALLOW_PRIVATE_HOSTS  image_url is user input: unless this is set,
+#                            origins on loopback, private or link-local
+#                            addresses are refused (see remote_fetch.py)
+# Concurrent requests for a variant that is not cached yet share one download
+# and one resize per worker; several workers may each produce it once, and
+# every one of them keeps its own view of the cache's LRU order.
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "image_cache"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(1024 ** 3)))
+IMAGE_WIDTHS = sorted(int(width) for width in os.getenv("IMAGE_WIDTHS", "64,128,256,512,1024").split(","))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "10"))
+IMAGE_MAX_SOURCE_BYTES = int(os.getenv("IMAGE_MAX_SOURCE_BYTES", str(20 * 1024 ** 2)))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(50_000_000)))
+IMAGE_ALLOW_PRIVATE_HOSTS = os.getenv("IMAGE_ALLOW_PRIVATE_HOSTS", "false").lower() == "true"
+
+MEDIA_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+ORIGIN_FETCHES = registry.counter(
+    "image_origin_fetches_total", "Original images downloaded from their origin", ("result",)
+)
+VARIANTS_RENDERED = registry.counter("image_variants_rendered_total", "Image variants resized and encoded", ("format",))
+VARIANT_LOOKUPS = registry.counter("image_variant_lookups_total", "Image variant reads from the disk cache", ("result",))
+
+class ImageError(Exception):
+    """The original could not be fetched or decoded"""
+
+def snap_width(width):
+    """The served width for a requested one: the next configured width up, at most the largest"""
+    for served in IMAGE_WIDTHS:
+        if width <= served:
+            return served
+    return IMAGE_WIDTHS[-1]
+
+def negotiate_format(accept):
+    return "webp" if "image/webp" in (accept or "") else "jpeg"
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+class DiskCache:
+    """
+    Files under `root`, keyed by relative path, kept below `max_bytes` by
+    deleting the least recently read or written ones. Recency is also kept
+    in file mtimes, so the order survives restarts.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # Called with the lock held, on first use
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith(".tmp"):
+                    # Being written by another worker (or left by one that died)
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, os.path.relpath(path, self.root), stat.st_size))
+        self._entries = OrderedDict((key, size) for _, key, size in sorted(files))
+        self._size = sum(self._entries.values())
+
+    def _index(self):
+        if self._entries is None:
+            self._load()
+        return self._entries
+
+    def _track(self, key, size):
+        """Mark `key` most recently used; returns the paths to delete to get back under max_bytes"""
+        with self._lock:
+            entries = self._index()
+            self._size += size - entries.pop(key, 0)
+            entries[key] = size
+            evicted = []
+            while self._size > self.max_bytes and len(entries) > 1:
+                victim, victim_size = entries.popitem(last=False)
+                self._size -= victim_size
+                evicted.append(os.path.join(self.root, victim))
+            return evicted
+
+    def _forget(self, key):
+        with self._lock:
+            self._size -= self._index().pop(key, 0)
+
+    def _remove(self, paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def read(self, key):
+        """Contents of `key`, or None when it is not cached"""
+        path = os.path.join(self.root, key)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # Never written, or evicted by another worker
+            self._forget(key)
+            return None
+        self._remove(self._track(key, len(data)))
+        return data
+
+    def write(self, key, data):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written aside and renamed, so readers in other workers never see part of a file
+        temporary = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)
+        self._remove(self._track(key, len(data)))
+
+    def size(self):
+        with self._lock:
+            self._index()
+            return self._size
+
+def render(original, width, format):
+    """`original` resized to at most `width` pixels wide and encoded as `format` (webp or jpeg)"""
+    try:
+        with Image.open(io.BytesIO(original)) as image:
+            if image.width * image.height > IMAGE_MAX_PIXELS:
+                raise ImageError(f"Image is too large ({image.width}x{image.height})")
+            # JPEGs decode straight at a reduced scale that still covers the target
+            image.draft("RGB", (width, width))
+            image = ImageOps.exif_transpose(image)
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.Resampling.LANCZOS)
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+            output = io.BytesIO()
+            if format == "webp":
+                image = image.convert("RGBA" if has_alpha else "RGB")
+                image.save(output, "WEBP", quality=IMAGE_QUALITY, method=4)
+            else:
+                if has_alpha:
+                    # JPEG has no alpha channel: flatten onto white
+                    image = image.convert("RGBA")
+                    background = Image.new("RGB", image.size, (255, 255, 255))
+                    background.paste(image, mask=image.getchannel("A"))
+                    image = background
+                image.convert("RGB").save(output, "JPEG", quality=IMAGE_QUALITY, optimize=True, progressive=True)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ImageError(f"Image could not be decoded: {e}")
+    return output.getvalue()
+
+class ImageProxy:
+    """Downloads originals once and serves resized variants from a DiskCache"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._inflight = {}
+        self._session = None
+
+    def _http(self):
+        # Created on first use, inside the server's event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=IMAGE_FETCH_TIMEOUT))
+        return self._session
+
+    async def close(self):
+        """Close the download session; called at application shutdown"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _single_flight(self, key, produce):
+        """
+        Await produce() once for all concurrent callers with the same key.
+        It runs as its own task, so a caller that disconnects does not cancel
+        it for the others.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(produce())
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            # Retrieved here so a failure nobody waits for any more is not logged as unhandled
+            task.exception()
+
+    async def _download(self, url):
+        try:
+            return await download(self._http(), url, IMAGE_MAX_SOURCE_BYTES, IMAGE_ALLOW_PRIVATE_HOSTS)
+        except FetchError as e:
+            raise ImageError(str(e))
+
+    async def _fetch(self, url, url_key):
+        try:
+            original = await self._download(url)
+        except ImageError:
+            ORIGIN_FETCHES.inc(result="error")
+            raise
+        ORIGIN_FETCHES.inc(result="ok")
+        digest = sha256(original)
+        await run_in_threadpool(self.cache.write, f"originals/{digest[:2]}/{digest}", original)
+        await run_in_threadpool(self.cache.write, url_key, digest.encode())
+        return digest
+
+    async def source(self, url, refetch=False):
+        """SHA-256 of the original at `url`, downloading it the first time"""
+        url_digest = sha256(url.encode())
+        url_key = f"urls/{url_digest[:2]}/{url_digest}"
+        if not refetch:
+            digest = await run_in_threadpool(self.cache.read, url_key)
+            if digest is not None:
+                return digest.decode()
+        return await self._single_flight(url_key, lambda: self._fetch(url, url_key))
+
+    async def _render(self, url, digest, width, format, key):
+        original = await run_in_threadpool(self.cache.read, f"originals/{digest[:2]}/{digest}")
+        if original is None or sha256(original) != digest:
+            # Evicted (or damaged) since: download it again
+            if await self.source(url, refetch=True) != digest:
+                raise ImageError("Image changed at its origin")
+            original = await run_in_threadpool(self.cache.read, f"originals/{digest[:2]}/{digest}")
+            if original is None:
+                raise ImageError("Image was evicted while it was being resized")
+        data = await run_in_threadpool(render, original, width, format)
+        VARIANTS_RENDERED.inc(format=format)
+        await run_in_threadpool(self.cache.write, key, data)
+        return data
+
+    async def variant(self, url, digest, width, format):
+        """Bytes of the original `digest` (from `url`) at `width` as `format`, resized on first request"""
+        key = f"variants/{digest[:2]}/{digest}-{width}.{format}"
+        data = await run_in_threadpool(self.cache.read, key)
+        VARIANT_LOOKUPS.inc(result="miss" if data is None else "hit")
+        if data is None:
+            data = await self._single_flight(key, lambda: self._render(url, digest, width, format, key))
+        return data
+
+def variant_etag(digest, width, format):
+    return f'"{digest[:32]}-{width}.{format}"'
+
+images = ImageProxy(DiskCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)) if Image is not None else None
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
+from alembic import command
 from database import Base
+from db_manager import alembic_config
 import models
 import os
 from dotenv import load_dotenv
@@ -50,9 +52,9 @@ def init_db():
             create_tables = True
         
         if create_tables:
-            # Create tables based on the models
+            # Create tables by applying the schema migrations
             print("Creating tables...")
-            Base.metadata.create_all(bind=engine)
+            command.upgrade(alembic_config({"url": DATABASE_URL}), "head")
             print("Tables created successfully")
         else:
             print("Skipping table creation")
@@ -0,0 +1,138 @@
+import contextvars
+import logging
+import os
+import time
+
+from sqlalchemy import event
+
+from metrics import Counter, Gauge, registry
+
+# Request instrumentation for the API:
+#   InstrumentationMiddleware  per-route latency histograms and status counts
+#   instrument_engine          per-request query count and database time,
+#                              plus the slow-query log
+# Everything is exported at GET /metrics (main.py).
+#   SLOW_QUERY_MS  statements taking at least this long are logged with their
+#                  route; 0 disables the log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+logger = logging.getLogger("SlowQuery")
+
+# Upper bounds of the per-request query count histogram buckets
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by route template and status code", ("method", "route", "status")
+)
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the last body chunk", ("method", "route")
+)
+REQUEST_QUERIES = registry.histogram(
+    "http_request_db_queries", "SQL statements executed per request", ("method", "route"), buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_DURATION = registry.histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL statements per request", ("method", "route")
+)
+QUERY_DURATION = registry.histogram("db_query_duration_seconds", "Duration of individual SQL statements")
+SLOW_QUERIES = registry.counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS", ("route",))
+
+class RequestStats:
+    __slots__ = ("scope", "queries", "db_seconds")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+
+# Set per request by the middleware. The threadpool and the async engine's
+# greenlets run with a copy of the request context, so queries issued there
+# still reach the same RequestStats.
+current_request = contextvars.ContextVar("current_request", default=None)
+
+def route_template(scope):
+    """The matched route's path template, so /api/assets/1 and /api/assets/2 share a series"""
+    # FastAPI releases that keep included routers nested record the prefixed template
+    # here; older ones flatten them, so the matched route already carries it
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    return getattr(context, "path", None) or getattr(scope.get("route"), "path", None) or "unmatched"
+
+class InstrumentationMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request.reset(token)
+            method, route = scope["method"], route_template(scope)
+            REQUESTS.inc(method=method, route=route, status=str(status))
+            REQUEST_DURATION.observe(elapsed, method=method, route=route)
+            REQUEST_QUERIES.observe(stats.queries, method=method, route=route)
+            REQUEST_DB_DURATION.observe(stats.db_seconds, method=method, route=route)
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    QUERY_DURATION.observe(elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        route = route_template(stats.scope) if stats is not None else "-"
+        SLOW_QUERIES.inc(route=route)
+        logger.warning(f"{elapsed * 1000:.1f}ms [{route}] {' '.join(statement.split())[:1000]}")
+
+def handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None:
+        starts = context.connection.info.get("query_start")
+        if starts:
+            starts.pop()
+
+def instrument_engine(engine):
+    """Attach the query hooks to an Engine (or an AsyncEngine's sync_engine)"""
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+def collect_pool_and_cache():
+    """Connection pool and read-through cache figures, read at scrape time"""
+    from cache import cache
+    from database import get_pool_status
+
+    checked_out = Gauge("db_pool_checked_out", "Connections currently checked out", ("engine",))
+    overflow = Gauge("db_pool_overflow", "Overflow connections currently open", ("engine",))
+    checkouts = Counter("db_pool_checkouts_total", "Successful connection checkouts", ("engine",))
+    timeouts = Counter("db_pool_timeouts_total", "Checkouts that timed out waiting for a connection", ("engine",))
+    for engine_name, status in get_pool_status().items():
+        checked_out.set(status.get("checked_out", 0), engine=engine_name)
+        overflow.set(status.get("overflow", 0), engine=engine_name)
+        checkouts.inc(status.get("checkouts", 0), engine=engine_name)
+        timeouts.inc(status.get("timeouts", 0), engine=engine_name)
+
+    cache_stats = cache.stats()
+    lookups = Counter("cache_lookups_total", "Read-through cache lookups", ("result",))
+    lookups.inc(cache_stats.get("hits", 0), result="hit")
+    lookups.inc(cache_stats.get("misses", 0), result="miss")
+    invalidations = Counter("cache_invalidations_total", "Cache keys invalidated by writes")
+    invalidations.inc(cache_stats.get("invalidations", 0))
+    return [line for metric in (checked_out, overflow, checkouts, timeouts, lookups, invalidations) for line in metric.render()]
@@ -0,0 +1,155 @@
+import logging
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+from metrics import registry
+import models
+
+load_dotenv()
+
+logger = logging.getLogger("EventListener")
+
+# Coordination of event listener replicas (LISTENER_COORDINATION=lease).
+# Replicas claim consecutive block ranges of a checkpoint stream through rows
+# of listener_leases and fetch them in parallel. Ranges are still applied in
+# block order: a range commits only when the stream's checkpoint has reached
+# its first block, moving the checkpoint forward in the same transaction.
+#   LISTENER_LEASE_SECONDS  how long a claimed range stays with its replica
+#                           without a renewal. A replica that dies hands its
+#                           range over to the others within this time.
+#   LISTENER_REPLICA_ID     name of this replica in the lease table
+# Expiry times come from the replicas' clocks, which must be kept in sync (NTP)
+# to well within LISTENER_LEASE_SECONDS.
+LISTENER_LEASE_SECONDS = float(os.getenv("LISTENER_LEASE_SECONDS", "30"))
+LISTENER_REPLICA_ID = os.getenv("LISTENER_REPLICA_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+LEASES_CLAIMED = registry.counter(
+    "listener_leases_claimed_total", "Block ranges claimed by this replica", ("kind",)
+)
+LEASES_LOST = registry.counter("listener_leases_lost_total", "Block ranges taken over from this replica")
+
+class LeaseLost(Exception):
+    """The range is no longer this replica's to apply"""
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def expiry():
+    return utcnow() + timedelta(seconds=LISTENER_LEASE_SECONDS)
+
+class Lease:
+    """Blocks [from_block, to_block] of a stream, claimed by this replica"""
+
+    def __init__(self, stream, from_block, to_block):
+        self.stream = stream
+        self.from_block = from_block
+        self.to_block = to_block
+
+    def __str__(self):
+        return f"{self.from_block}-{self.to_block}"
+
+    @property
+    def block_range(self):
+        return self.from_block, self.to_block
+
+    def _owned(self):
+        lease = models.ListenerLease
+        return (lease.stream == self.stream, lease.from_block == self.from_block, lease.owner == LISTENER_REPLICA_ID)
+
+    def _keep(self, db, release=False):
+        """Renew (or delete) the lease row; raises LeaseLost if another replica took it over"""
+        if release:
+            statement = delete(models.ListenerLease).where(*self._owned())
+        else:
+            statement = update(models.ListenerLease).where(*self._owned()).values(expires_at=expiry())
+        if db.execute(statement).rowcount != 1:
+            LEASES_LOST.inc()
+            raise LeaseLost(f"Blocks {self} of {self.stream} were taken over by another replica")
+
+    def renew(self):
+        with SessionLocal() as db:
+            self._keep(db)
+            db.commit()
+
+    def advance(self, db, block):
+        """
+        Move the stream's checkpoint to `block` within the caller's
+        transaction, renewing the lease, or releasing it once `block` is the
+        end of the range. Raises LeaseLost when the lease was taken over or
+        the blocks before the range are not all applied yet, and the caller
+        must then roll back.
+        """
+        # Updating the lease row first locks it against a concurrent takeover
+        self._keep(db, release=block >= self.to_block)
+        checkpoint = models.ListenerCheckpoint
+        moved = db.execute(update(checkpoint).where(
+            checkpoint.name == self.stream,
+            checkpoint.last_block >= self.from_block - 1,
+        ).values(last_block=case((checkpoint.last_block < block, block), else_=checkpoint.last_block)))
+        if moved.rowcount != 1:
+            raise LeaseLost(f"Blocks before {self} of {self.stream} are not applied yet")
+
+def claim_expired(stream, below=None):
+    """
+    Take over the lowest range of `stream` (starting before block `below`)
+    whose lease expired, or return None when there is none.
+    """
+    lease = models.ListenerLease
+    now = utcnow()
+    with SessionLocal() as db:
+        query = select(lease).filter(lease.stream == stream, lease.expires_at < now).order_by(lease.from_block)
+        if below is not None:
+            query = query.filter(lease.from_block < below)
+        for expired in db.scalars(query.limit(10)).all():
+            # Conditional on the row being unchanged: exactly one replica wins it
+            taken = db.execute(update(lease).where(
+                lease.stream == stream, lease.from_block == expired.from_block,
+                lease.owner == expired.owner, lease.expires_at < now,
+            ).values(owner=LISTENER_REPLICA_ID, expires_at=expiry()))
+            db.commit()
+            if taken.rowcount == 1:
+                LEASES_CLAIMED.inc(kind="takeover")
+                logger.warning(f"Took over blocks {expired.from_block}-{expired.to_block} from {expired.owner}")
+                return Lease(stream, expired.from_block, expired.to_block)
+    return None
+
+def claim_next(stream, head, size, start_block):
+    """
+    Claim up to `size` blocks of `stream` after both its checkpoint and its
+    newest lease, ending at `head`. The checkpoint starts before
+    `start_block` if the stream never ran. Returns None once every block up
+    to `head` is claimed.
+    """
+    lease = models.ListenerLease
+    while True:
+        with SessionLocal() as db:
+            # One statement, so a range released in between is not claimed again
+            leased_to, last_block = db.execute(select(
+                select(func.max(lease.to_block)).filter(lease.stream == stream).scalar_subquery(),
+                select(models.ListenerCheckpoint.last_block)
+                .filter(models.ListenerCheckpoint.name == stream).scalar_subquery(),
+            )).one()
+            if last_block is None:
+                last_block = start_block - 1
+                db.add(models.ListenerCheckpoint(name=stream, last_block=last_block))
+            from_block = max(last_block, leased_to if leased_to is not None else last_block) + 1
+            if from_block > head:
+                return None
+            to_block = min(from_block + size - 1, head)
+            db.add(models.ListenerLease(
+                stream=stream, from_block=from_block, to_block=to_block, owner=LISTENER_REPLICA_ID, expires_at=expiry()
+            ))
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another replica claimed this range (or created the checkpoint) first: try the next one
+                db.rollback()
+                continue
+        LEASES_CLAIMED.inc(kind="new")
+        return Lease(stream, from_block, to_block)
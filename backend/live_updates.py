@@ -0,0 +1,365 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+
+from dotenv import load_dotenv
+from sqlalchemy import event, inspect, select
+from starlette.concurrency import run_in_threadpool
+
+from fast_json import encode_default
+from metrics import registry
+import models
+
+load_dotenv()
+
+logger = logging.getLogger("LiveUpdates")
+
+# Live push of asset and transaction changes (/api/live).
+#   LIVE_UPDATES_URL        memory:// (in-process hub, default), redis://host:port/db, or none
+#   LIVE_QUEUE_SIZE         messages buffered per connection; a consumer that falls
+#                           further behind has its backlog dropped and is told to resync
+#   LIVE_HEARTBEAT_SECONDS  keep-alive interval of idle connections
+# Write routers publish after they commit and the event listener after each
+# batch commits. The memory broker only reaches clients of the worker that
+# made the change, and never the event listener's changes (it is a separate
+# process); use Redis pub/sub for multi-worker deployments and on-chain updates.
+LIVE_UPDATES_URL = os.getenv("LIVE_UPDATES_URL", "memory://")
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+# Redis channel carrying every update between processes
+LIVE_CHANNEL = "live:updates"
+
+# Upper bound on the number of values bound into one IN (...) list
+IN_CLAUSE_CHUNK = 1000
+
+# Subscribers to this topic receive every update
+ALL = "*"
+
+CONNECTIONS = registry.gauge("live_connections", "Open live update connections")
+PUBLISHED = registry.counter("live_messages_published_total", "Updates published", ("type",))
+RESYNCS = registry.counter("live_resyncs_total", "Slow consumers whose backlog was dropped")
+
+def wallet_topic(address):
+    return f"wallet:{address.lower()}"
+
+def asset_topic(asset_id):
+    return f"asset:{asset_id}"
+
+def subscription_topics(wallets=(), asset_ids=()):
+    """Topics for a connection; no filter at all subscribes to everything"""
+    topics = {wallet_topic(wallet) for wallet in wallets if wallet} | {asset_topic(asset_id) for asset_id in asset_ids}
+    return topics or {ALL}
+
+class Message:
+    """One update, encoded once however many connections it is delivered to"""
+
+    def __init__(self, type, data):
+        self.type = type
+        self.data = data
+        self._sse = None
+
+    @property
+    def sse(self):
+        if self._sse is None:
+            self._sse = f"event: {self.type}\ndata: {self.data}\n\n"
+        return self._sse
+
+RESYNC = Message("resync", '{"type": "resync"}')
+
+def asset_update(asset, previous_owner=None, deleted=False):
+    """Update for an asset's availability, ownership or price"""
+    payload = {
+        "type": "asset", "id": asset.id, "owner_address": asset.owner_address,
+        "is_available": asset.is_available, "price": asset.price,
+    }
+    if previous_owner and previous_owner != asset.owner_address:
+        payload["previous_owner_address"] = previous_owner
+    if deleted:
+        payload["deleted"] = True
+    topics = {asset_topic(asset.id)} | {wallet_topic(owner) for owner in (asset.owner_address, previous_owner) if owner}
+    return topics, payload
+
+def resync_update(wallets=()):
+    """Tells the wallets' subscribers (and unfiltered ones) to refetch: changes they cannot be sent one by one"""
+    return {wallet_topic(wallet) for wallet in wallets if wallet}, {"type": "resync"}
+
+def transaction_update(tx_record, buyer_address=None, seller_address=None):
+    """Update for a transaction's status, addressed to its asset and both parties"""
+    payload = {
+        "type": "transaction", "id": tx_record.id, "asset_id": tx_record.asset_id, "status": tx_record.status,
+        "transaction_hash": tx_record.transaction_hash, "buyer_address": buyer_address, "seller_address": seller_address,
+    }
+    topics = {wallet_topic(address) for address in (buyer_address, seller_address) if address}
+    if tx_record.asset_id is not None:
+        topics.add(asset_topic(tx_record.asset_id))
+    return topics, payload
+
+class Subscriber:
+    """A connection's bounded queue of pending messages"""
+
+    def __init__(self, topics, queue_size=LIVE_QUEUE_SIZE):
+        self.topics = topics
+        self.queue = asyncio.Queue(queue_size)
+        self.lagged = False
+
+    def offer(self, message):
+        if self.lagged:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow consumer: rather than buffer without bound, drop what it has
+            # not read yet and have it refetch once it catches up
+            self.lagged = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            RESYNCS.inc()
+
+    async def get(self, timeout=None):
+        """Next message, or None after `timeout` seconds without one"""
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if message is RESYNC:
+            self.lagged = False
+        return message
+
+class Hub:
+    """Routes published messages to the subscribers of their topics, on the event loop"""
+
+    def __init__(self):
+        self._by_topic = defaultdict(set)
+        self._subscribers = set()
+        self.loop = None
+
+    def subscribe(self, topics):
+        self.loop = asyncio.get_running_loop()
+        subscriber = Subscriber(topics)
+        for topic in topics:
+            self._by_topic[topic].add(subscriber)
+        self._subscribers.add(subscriber)
+        CONNECTIONS.set(len(self._subscribers))
+        return subscriber
+
+    def resubscribe(self, subscriber, topics):
+        """Replace a subscriber's topics, keeping its queue"""
+        self.unsubscribe(subscriber)
+        subscriber.topics = topics
+        for topic in topics:
+            self._by_topic[topic].add(subscriber)
+        self._subscribers.add(subscriber)
+        CONNECTIONS.set(len(self._subscribers))
+
+    def unsubscribe(self, subscriber):
+        for topic in subscriber.topics:
+            subscribers = self._by_topic.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._by_topic[topic]
+        self._subscribers.discard(subscriber)
+        CONNECTIONS.set(len(self._subscribers))
+
+    @property
+    def connections(self):
+        return len(self._subscribers)
+
+    def deliver(self, topics, message):
+        targets = set(self._by_topic.get(ALL, ()))
+        for topic in topics:
+            targets.update(self._by_topic.get(topic, ()))
+        for subscriber in targets:
+            subscriber.offer(message)
+
+    def deliver_threadsafe(self, topics, message):
+        """deliver() from any thread; dropped when nothing ever subscribed in this process"""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self.deliver(topics, message)
+        else:
+            loop.call_soon_threadsafe(self.deliver, topics, message)
+
+    def resync_all(self):
+        for subscriber in self._subscribers:
+            subscriber.offer(RESYNC)
+
+def encode(updates):
+    """(topics, payload) pairs to (topics, Message) pairs"""
+    return [
+        (sorted(topics), Message(payload["type"], json.dumps(payload, default=encode_default)))
+        for topics, payload in updates
+    ]
+
+class MemoryBroker:
+    """Delivers to this process's subscribers only"""
+
+    name = "memory"
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    async def start(self):
+        pass
+
+    async def publish(self, updates):
+        for topics, message in encode(updates):
+            self.hub.deliver(topics, message)
+
+    def publish_sync(self, updates):
+        for topics, message in encode(updates):
+            self.hub.deliver_threadsafe(topics, message)
+
+class RedisBroker:
+    """
+    Redis pub/sub shared by every API worker and the event listener. Each API
+    worker relays the channel to its own subscribers from one background task.
+    """
+
+    name = "redis"
+
+    def __init__(self, hub, url):
+        self.hub = hub
+        self.url = url
+        self._client = None
+        self._task = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                # Optional dependency, only needed when LIVE_UPDATES_URL points at Redis
+                import redis
+
+                self._client = redis.Redis.from_url(self.url)
+            return self._client
+
+    def publish_sync(self, updates):
+        client = self.client()
+        for topics, message in encode(updates):
+            client.publish(LIVE_CHANNEL, json.dumps({"topics": topics, "type": message.type, "data": message.data}))
+
+    async def publish(self, updates):
+        await run_in_threadpool(self.publish_sync, updates)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._relay())
+
+    async def _relay(self):
+        import redis.asyncio
+
+        backoff = 1
+        while True:
+            client = redis.asyncio.Redis.from_url(self.url)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(LIVE_CHANNEL)
+                    backoff = 1
+                    async for raw in pubsub.listen():
+                        if raw["type"] != "message":
+                            continue
+                        envelope = json.loads(raw["data"])
+                        self.hub.deliver(envelope["topics"], Message(envelope["type"], envelope["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Live update relay disconnected ({e}); reconnecting in {backoff}s")
+            finally:
+                await client.aclose()
+            # Updates published while disconnected are lost: clients must refetch
+            self.hub.resync_all()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+def create_broker(url, hub):
+    if url in ("", "none"):
+        return None
+    if url.startswith("memory://"):
+        return MemoryBroker(hub)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(hub, url)
+    raise ValueError(f"Unsupported LIVE_UPDATES_URL: {url}")
+
+hub = Hub()
+broker = create_broker(LIVE_UPDATES_URL, hub)
+
+async def publish(updates):
+    """Publish (topics, payload) pairs from request handlers, after the commit"""
+    if broker is not None and updates:
+        for _, payload in updates:
+            PUBLISHED.inc(type=payload["type"])
+        await broker.publish(updates)
+
+def publish_sync(updates):
+    """publish() for the event listener and other blocking code"""
+    if broker is not None and updates:
+        for _, payload in updates:
+            PUBLISHED.inc(type=payload["type"])
+        try:
+            broker.publish_sync(updates)
+        except Exception as e:
+            # The data is committed; clients catch up on their next fetch
+            logger.warning(f"Could not publish {len(updates)} live updates: {e}")
+
+def track_changes(db):
+    """
+    Collect the assets and transactions a session inserts, updates or
+    deletes. Call `updates()` on the result before committing (attribute
+    values and owners are read from the session), publish after.
+    """
+    return ChangeTracker(db)
+
+class ChangeTracker:
+    def __init__(self, db):
+        self.db = db
+        self.assets = {}
+        self.transactions = {}
+        self.deleted_assets = {}
+        event.listen(db, "after_flush", self._collect)
+
+    def _collect(self, session, flush_context):
+        for obj in (*session.new, *session.dirty):
+            if isinstance(obj, models.Asset) and obj.id is not None:
+                previous = self.assets.get(obj.id, (None, None))[1]
+                if previous is None:
+                    # History still holds the pre-flush value in after_flush
+                    deleted = inspect(obj).attrs.owner_address.history.deleted
+                    previous = deleted[0] if deleted else None
+                self.assets[obj.id] = (obj, previous)
+            elif isinstance(obj, models.Transaction) and obj.id is not None:
+                self.transactions[obj.id] = obj
+        for obj in session.deleted:
+            if isinstance(obj, models.Asset):
+                self.assets.pop(obj.id, None)
+                self.deleted_assets[obj.id] = obj
+
+    def updates(self):
+        if broker is None:
+            return []
+        updates = [asset_update(asset, previous_owner) for asset, previous_owner in self.assets.values()]
+        updates += [asset_update(asset, deleted=True) for asset in self.deleted_assets.values()]
+        if self.transactions:
+            user_ids = sorted({user_id for tx_record in self.transactions.values()
+                               for user_id in (tx_record.buyer_id, tx_record.seller_id) if user_id is not None})
+            wallets = {}
+            for start in range(0, len(user_ids), IN_CLAUSE_CHUNK):
+                wallets.update(self.db.execute(
+                    select(models.User.id, models.User.wallet_address)
+                    .filter(models.User.id.in_(user_ids[start:start + IN_CLAUSE_CHUNK]))
+                ).all())
+            updates += [
+                transaction_update(tx_record, wallets.get(tx_record.buyer_id), wallets.get(tx_record.seller_id))
+                for tx_record in self.transactions.values()
+            ]
+        return updates
@@ -1,19 +1,34 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
 import uvicorn
 import traceback
 import sys
 
-from database import get_db, engine, Base
+from cache import cache
+from compression import CompressionMiddleware
+from database import async_engine, engine, Base, SessionLocal, get_pool_status
+from db_replicas import replicas
+from image_proxy import images
+from instrumentation import InstrumentationMiddleware, collect_pool_and_cache, instrument_engine
+from metrics import CONTENT_TYPE, registry
 import models
 import schemas
-from routers import assets, transactions, search, contract, users
+from routers import assets, transactions, search, contract, users, stats, live
 
-# Create database tables
+# Create missing tables for local development. create_all never alters an
+# existing table; schema changes ship as migrations (db_manager.py migrate).
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Sleepy Owl Trading API")
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    # The image proxy's HTTP session is opened on first use and held for the app's lifetime
+    await images.close()
+
+app = FastAPI(title="Sleepy Owl Trading API", lifespan=lifespan)
 
 # Define allowed origins
 origins = [
@@ -33,12 +48,28 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Negotiated gzip/brotli compression of large JSON responses
+app.add_middleware(CompressionMiddleware)
+
+# Per-route latency, status and database time, exported at /metrics
+app.add_middleware(InstrumentationMiddleware)
+instrument_engine(engine)
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)
+for replica_engine in replicas.engines():
+    instrument_engine(replica_engine)
+# Health-check the read replicas from startup, so the first reads can use them
+replicas.start()
+registry.add_collector(collect_pool_and_cache)
+
 # Include routers
 app.include_router(assets.router, prefix="/api/assets", tags=["assets"])
 app.include_router(transactions.router, prefix="/api/transactions", tags=["transactions"])
 app.include_router(search.router, prefix="/api/search", tags=["search"])
 app.include_router(contract.router, prefix="/api/contract-address", tags=["contract"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
+app.include_router(stats.router, prefix="/api/stats", tags=["stats"])
+app.include_router(live.router, prefix="/api/live", tags=["live"])
 
 @app.get("/")
 def read_root():
@@ -48,6 +79,21 @@ def read_root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/api/health/pool", include_in_schema=False)
+def pool_metrics():
+    """Internal endpoint exposing live connection pool metrics"""
+    return get_pool_status()
+
+@app.get("/api/health/cache", include_in_schema=False)
+def cache_metrics():
+    """Internal endpoint exposing read-through cache hit/miss counters"""
+    return cache.stats()
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
 @app.get("/api/debug")
 def debug_info():
     """Endpoint for debugging purposes"""
@@ -58,9 +104,9 @@ def debug_info():
         # Test database connection
         db_status = "Unknown"
         try:
-            db = next(get_db())
-            # Try a simple query
-            db.execute("SELECT 1")
+            with SessionLocal() as db:
+                # Try a simple query
+                db.execute(text("SELECT 1"))
             db_status = "Connected"
         except Exception as e:
             db_status = f"Error: {str(e)}"
@@ -76,22 +122,43 @@ def debug_info():
             "traceback": traceback.format_exc()
         }
 
-# Add error handling middleware
-@app.middleware("http")
-async def add_error_handling(request, call_next):
-    try:
-        return await call_next(request)
-    except Exception as e:
-        # Log the error
-        print(f"Error processing request: {str(e)}")
-        print(traceback.format_exc())
-        
-        # Return a 500 response
-        from fastapi.responses import JSONResponse
-        return JSONResponse(
-            status_code=500,
-            content={"detail": "Internal server error", "error": str(e)}
-        )
+# Add error handling middleware. Plain ASGI rather than @app.middleware("http"),
+# which re-buffers every streamed response (exports, live update streams)
+# through an extra task and memory stream per request.
+class ErrorHandlingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = False
+
+        async def send_wrapper(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            # Log the error
+            print(f"Error processing request: {str(e)}")
+            print(traceback.format_exc())
+            if started:
+                # Too late for an error response
+                raise
+
+            # Return a 500 response
+            response = JSONResponse(
+                status_code=500,
+                content={"detail": "Internal server error", "error": str(e)}
+            )
+            await response(scope, receive, send)
+
+app.add_middleware(ErrorHandlingMiddleware)
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,134 @@
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+import models
+from upsert import increment_statement
+
+# Market statistics served by /api/stats. Trades update per-hour, per-category
+# and per-seller counters in the transaction that creates or completes them,
+# with upserts that add to the stored values, so reads never aggregate the
+# transactions table. `db_manager.py rebuild-stats` recomputes every counter
+# from the transactions in batches of STATS_REBUILD_BATCH_SIZE.
+STATS_REBUILD_BATCH_SIZE = int(os.getenv("STATS_REBUILD_BATCH_SIZE", "10000"))
+
+COUNTERS = ("trades", "volume", "completed_trades", "completed_volume")
+SELLER_COUNTERS = ("completed_trades", "completed_volume")
+
+# Upper bound on the number of values bound into one IN (...) list
+IN_CLAUSE_CHUNK = 1000
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def hour_bucket(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+class StatsDelta:
+    """Counter increments accumulated in memory, written with one upsert per table"""
+
+    def __init__(self):
+        self.hourly = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        self.categories = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        self.sellers = defaultdict(lambda: dict.fromkeys(SELLER_COUNTERS, 0))
+
+    def created(self, category, price, moment):
+        for counters in (self.hourly[(category or "", hour_bucket(moment))], self.categories[category or ""]):
+            counters["trades"] += 1
+            counters["volume"] += price
+
+    def completed(self, category, seller_id, price, moment):
+        for counters in (self.hourly[(category or "", hour_bucket(moment))], self.categories[category or ""]):
+            counters["completed_trades"] += 1
+            counters["completed_volume"] += price
+        if seller_id is not None:
+            self.sellers[seller_id]["completed_trades"] += 1
+            self.sellers[seller_id]["completed_volume"] += price
+
+    def apply(self, db: Session):
+        """Add the increments to the stored counters, inside the caller's transaction"""
+        dialect_name = db.get_bind().dialect.name
+        # Rows are written in key order so concurrent writers lock them in the same order
+        for model, index_columns, counters, rows in (
+            (models.MarketStatsHourly, ["category", "bucket"], COUNTERS,
+             [{"category": category, "bucket": bucket, **values} for (category, bucket), values in self.hourly.items()]),
+            (models.CategoryStats, ["category"], COUNTERS,
+             [{"category": category, **values} for category, values in self.categories.items()]),
+            (models.SellerStats, ["seller_id"], SELLER_COUNTERS,
+             [{"seller_id": seller_id, **values} for seller_id, values in self.sellers.items()]),
+        ):
+            if rows:
+                rows.sort(key=lambda row: [row[column] for column in index_columns])
+                db.execute(increment_statement(dialect_name, model.__table__, index_columns, counters), rows)
+
+def record_trades_created(db: Session, trades):
+    """Count new trades, given as (asset category, price) pairs"""
+    delta = StatsDelta()
+    now = utcnow()
+    for category, price in trades:
+        delta.created(category, price, now)
+    delta.apply(db)
+
+def record_trades_completed(db: Session, transactions):
+    """Count transactions that were just marked completed"""
+    if not transactions:
+        return
+    asset_ids = sorted({tx_record.asset_id for tx_record in transactions if tx_record.asset_id is not None})
+    categories = {}
+    for start in range(0, len(asset_ids), IN_CLAUSE_CHUNK):
+        categories.update(db.execute(
+            select(models.Asset.id, models.Asset.category)
+            .filter(models.Asset.id.in_(asset_ids[start:start + IN_CLAUSE_CHUNK]))
+        ).all())
+    delta = StatsDelta()
+    now = utcnow()
+    for tx_record in transactions:
+        delta.completed(categories.get(tx_record.asset_id), tx_record.seller_id, tx_record.price, now)
+    delta.apply(db)
+
+def rebuild(db: Session, batch_size=STATS_REBUILD_BATCH_SIZE):
+    """
+    Recompute every counter from the transactions table, committing after
+    each batch of `batch_size` transactions. Completed trades are bucketed by
+    their last update. Returns the number of transactions counted.
+
+    Trades completed while the rebuild runs can be counted twice, so run it
+    with the event listener stopped.
+    """
+    for model in (models.MarketStatsHourly, models.CategoryStats, models.SellerStats):
+        db.execute(delete(model))
+    # Transactions created after this point are counted by the live path
+    last_id = db.scalar(select(func.max(models.Transaction.id))) or 0
+    counted = 0
+    after_id = 0
+    while True:
+        rows = db.execute(
+            select(models.Transaction.id, models.Transaction.price, models.Transaction.status,
+                   models.Transaction.seller_id, models.Transaction.created_at, models.Transaction.updated_at,
+                   models.Asset.category)
+            .outerjoin(models.Asset, models.Transaction.asset_id == models.Asset.id)
+            .filter(models.Transaction.id > after_id, models.Transaction.id <= last_id)
+            .order_by(models.Transaction.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        delta = StatsDelta()
+        for row in rows:
+            created_at = row.created_at or utcnow()
+            delta.created(row.category, row.price, created_at)
+            if row.status == "completed":
+                delta.completed(row.category, row.seller_id, row.price, row.updated_at or created_at)
+        delta.apply(db)
+        db.commit()
+        counted += len(rows)
+        after_id = rows[-1].id
+    db.commit()
+    return counted
+
+def window_start(hours, now=None):
+    """First hourly bucket of a rolling window of `hours` hours ending now"""
+    return hour_bucket(now or utcnow()) - timedelta(hours=hours - 1)
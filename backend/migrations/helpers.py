@@ -0,0 +1,44 @@
+from alembic import op
+from sqlalchemy import inspect
+
+# Databases created before migrations existed (Base.metadata.create_all in
+# main.py or db_manager.py create-tables) have no alembic_version table, so
+# every revision runs against them. Revisions therefore create only the
+# tables, columns and indexes that are missing, which lets those databases
+# adopt the migration history without a manual stamp. create_all never
+# alters an existing table, so a column added to an existing table needs its
+# own add_column_if_missing, even where create_all already creates it for
+# new databases.
+
+def existing_tables():
+    return set(inspect(op.get_bind()).get_table_names())
+
+def existing_columns(table):
+    return {column["name"] for column in inspect(op.get_bind()).get_columns(table)}
+
+def existing_indexes(table):
+    return {index["name"] for index in inspect(op.get_bind()).get_indexes(table)}
+
+def dialect_name():
+    return op.get_bind().dialect.name
+
+def create_table_if_missing(name, *columns, **kwargs):
+    if op.get_context().as_sql or name not in existing_tables():
+        op.create_table(name, *columns, **kwargs)
+
+def add_column_if_missing(table, column):
+    if op.get_context().as_sql or column.name not in existing_columns(table):
+        op.add_column(table, column)
+
+def drop_column_if_exists(table, name):
+    if op.get_context().as_sql or name in existing_columns(table):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column(name)
+
+def create_index_if_missing(name, table, columns, **kwargs):
+    if op.get_context().as_sql or name not in existing_indexes(table):
+        op.create_index(name, table, columns, **kwargs)
+
+def drop_index_if_exists(name, table):
+    if op.get_context().as_sql or name in existing_indexes(table):
+        op.drop_index(name, table_name=table)
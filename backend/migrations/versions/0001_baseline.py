@@ -0,0 +1,65 @@
+"""Baseline: the schema Base.metadata.create_all built before migrations existed
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index_if_missing, create_table_if_missing
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Exactly the tables of the models before migrations were introduced. Every
+# later column, index and table has its own revision, which also adds it to
+# a database create_all built from those models.
+
+def upgrade():
+    create_table_if_missing(
+        "assets",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("image_url", sa.String(255)),
+        sa.Column("category", sa.String(50)),
+        sa.Column("token_id", sa.String(100), unique=True),
+        sa.Column("owner_address", sa.String(100)),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("is_available", sa.Boolean()),
+    )
+    create_index_if_missing("ix_assets_id", "assets", ["id"])
+
+    create_table_if_missing(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("wallet_address", sa.String(100)),
+        sa.Column("username", sa.String(50)),
+        sa.Column("email", sa.String(100)),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    create_index_if_missing("ix_users_id", "users", ["id"])
+    create_index_if_missing("ix_users_wallet_address", "users", ["wallet_address"], unique=True)
+
+    create_table_if_missing(
+        "transactions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("asset_id", sa.Integer(), sa.ForeignKey("assets.id")),
+        sa.Column("buyer_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("seller_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("transaction_hash", sa.String(100)),
+        sa.Column("status", sa.String(20)),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    create_index_if_missing("ix_transactions_id", "transactions", ["id"])
+
+def downgrade():
+    for table in ("transactions", "users", "assets"):
+        op.drop_table(table)
@@ -0,0 +1,31 @@
+"""Composite indexes for the hot filters
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from migrations.helpers import create_index_if_missing, drop_index_if_exists
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # Event listener: pending trades looked up by transaction hash
+    ("ix_transactions_hash_status", "transactions", ["transaction_hash", "status"]),
+    # GET /api/transactions/user/{id}: buyer_id = ? OR seller_id = ?, served by an index merge / multi-index OR
+    ("ix_transactions_buyer_id", "transactions", ["buyer_id", "id"]),
+    ("ix_transactions_seller_id", "transactions", ["seller_id", "id"]),
+    # GET /api/search/: is_available plus an optional category and a price range
+    ("ix_assets_available_category_price", "assets", ["is_available", "category", "price"]),
+    ("ix_assets_available_price", "assets", ["is_available", "price"]),
+]
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        create_index_if_missing(name, table, columns)
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        drop_index_if_exists(name, table)
@@ -0,0 +1,50 @@
+"""Incrementally maintained market statistics
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index_if_missing, create_table_if_missing
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def counter_columns():
+    return [
+        sa.Column("trades", sa.Integer(), nullable=False),
+        sa.Column("volume", sa.Float(), nullable=False),
+        sa.Column("completed_trades", sa.Integer(), nullable=False),
+        sa.Column("completed_volume", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+    ]
+
+def upgrade():
+    create_table_if_missing(
+        "market_stats_hourly",
+        sa.Column("category", sa.String(50), primary_key=True),
+        sa.Column("bucket", sa.DateTime(), primary_key=True),
+        *counter_columns(),
+    )
+    create_index_if_missing("ix_market_stats_hourly_bucket", "market_stats_hourly", ["bucket"])
+    create_table_if_missing(
+        "category_stats",
+        sa.Column("category", sa.String(50), primary_key=True),
+        *counter_columns(),
+    )
+    create_table_if_missing(
+        "seller_stats",
+        sa.Column("seller_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("completed_trades", sa.Integer(), nullable=False),
+        sa.Column("completed_volume", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    create_index_if_missing("ix_seller_stats_volume", "seller_stats", ["completed_volume"])
+
+def downgrade():
+    for table in ("seller_stats", "category_stats", "market_stats_hourly"):
+        op.drop_table(table)
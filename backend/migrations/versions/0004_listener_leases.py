@@ -0,0 +1,28 @@
+"""Block-range leases of event listener replicas
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_table_if_missing
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    create_table_if_missing(
+        "listener_leases",
+        sa.Column("stream", sa.String(100), primary_key=True),
+        sa.Column("from_block", sa.BigInteger(), primary_key=True),
+        sa.Column("to_block", sa.BigInteger(), nullable=False),
+        sa.Column("owner", sa.String(100), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table("listener_leases")
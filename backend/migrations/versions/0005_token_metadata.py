@@ -0,0 +1,40 @@
+"""Off-chain token metadata fetched from tokenURI
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index_if_missing, create_table_if_missing
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    create_table_if_missing(
+        "token_metadata",
+        sa.Column("token_id", sa.String(100), primary_key=True),
+        sa.Column("token_uri", sa.Text()),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("name", sa.String(255)),
+        sa.Column("description", sa.Text()),
+        sa.Column("image", sa.Text()),
+        sa.Column("attributes", sa.JSON()),
+        sa.Column("document", sa.JSON()),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime()),
+        sa.Column("claim", sa.String(32)),
+        sa.Column("last_error", sa.String(255)),
+        sa.Column("fetched_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    create_index_if_missing(
+        "ix_token_metadata_status_next_attempt", "token_metadata", ["status", "next_attempt_at"]
+    )
+
+def downgrade():
+    op.drop_table("token_metadata")
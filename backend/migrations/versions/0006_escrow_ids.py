@@ -0,0 +1,30 @@
+"""Escrow asset and transaction ids on existing assets and transactions
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+import sqlalchemy as sa
+
+from migrations.helpers import add_column_if_missing, create_index_if_missing, drop_column_if_exists, drop_index_if_exists
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# The escrow event handlers (event_handlers.py) look rows up by these ids
+COLUMNS = [
+    ("assets", "escrow_asset_id", "ix_assets_escrow_asset_id"),
+    ("transactions", "escrow_transaction_id", "ix_transactions_escrow_transaction_id"),
+]
+
+def upgrade():
+    for table, column, index in COLUMNS:
+        add_column_if_missing(table, sa.Column(column, sa.BigInteger()))
+        create_index_if_missing(index, table, [column], unique=True)
+
+def downgrade():
+    for table, column, index in reversed(COLUMNS):
+        drop_index_if_exists(index, table)
+        drop_column_if_exists(table, column)
@@ -0,0 +1,31 @@
+"""users.updated_at, the change marker behind the users ETag validator
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import dialect_name, drop_column_if_exists, existing_columns
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if not op.get_context().as_sql and "updated_at" in existing_columns("users"):
+        return
+    column = sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now())
+    if dialect_name() == "sqlite":
+        # SQLite's ALTER TABLE refuses a CURRENT_TIMESTAMP default; batch mode rebuilds the table instead
+        with op.batch_alter_table("users", recreate="always") as batch:
+            batch.add_column(column)
+    else:
+        op.add_column("users", column)
+    # Existing users have not changed since they were created
+    op.execute(sa.text("UPDATE users SET updated_at = created_at"))
+
+def downgrade():
+    drop_column_if_exists("users", "updated_at")
@@ -0,0 +1,39 @@
+"""Event listener checkpoints and processed-event log
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index_if_missing, create_table_if_missing
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    create_table_if_missing(
+        "listener_checkpoints",
+        sa.Column("name", sa.String(100), primary_key=True),
+        sa.Column("last_block", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+
+    create_table_if_missing(
+        "processed_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("transaction_hash", sa.String(100), nullable=False),
+        sa.Column("log_index", sa.Integer(), nullable=False),
+        sa.Column("block_number", sa.BigInteger()),
+        sa.Column("event_name", sa.String(50)),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.UniqueConstraint("transaction_hash", "log_index", name="uq_processed_events_tx_log"),
+    )
+    create_index_if_missing("ix_processed_events_id", "processed_events", ["id"])
+
+def downgrade():
+    for table in ("processed_events", "listener_checkpoints"):
+        op.drop_table(table)
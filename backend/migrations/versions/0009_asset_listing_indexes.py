@@ -0,0 +1,27 @@
+"""Keyset pagination indexes of the marketplace listing and wallet portfolio
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from migrations.helpers import create_index_if_missing, drop_index_if_exists
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # GET /api/assets/: is_available = true, paginated by id
+    ("ix_assets_available_id", "assets", ["is_available", "id"]),
+    # GET /api/assets/owner/{wallet}: owner_address = ?, paginated by id
+    ("ix_assets_owner_id", "assets", ["owner_address", "id"]),
+]
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        create_index_if_missing(name, table, columns)
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        drop_index_if_exists(name, table)
@@ -0,0 +1,20 @@
+"""FULLTEXT index behind the relevance-ranked search (MySQL only)
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17
+"""
+from migrations.helpers import create_index_if_missing, dialect_name, drop_index_if_exists
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if dialect_name() == "mysql":
+        create_index_if_missing("ix_assets_fulltext", "assets", ["name", "description"], mysql_prefix="FULLTEXT")
+
+def downgrade():
+    if dialect_name() == "mysql":
+        drop_index_if_exists("ix_assets_fulltext", "assets")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Text, DateTime, ForeignKey, Boolean, Index, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -17,10 +17,23 @@ class Asset(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     is_available = Column(Boolean, default=True)
+    escrow_asset_id = Column(BigInteger, unique=True, index=True)  # MememonizeEscrow asset ID
     
     # Relationships
     transactions = relationship("Transaction", back_populates="asset")
 
+    __table_args__ = (
+        # Keyset pagination of the marketplace listing
+        Index("ix_assets_available_id", "is_available", "id"),
+        # Wallet portfolio (GET /api/assets/owner/{wallet}), keyset paginated by id
+        Index("ix_assets_owner_id", "owner_address", "id"),
+        # Search filters (routers/search.py): availability plus category and/or a price range
+        Index("ix_assets_available_category_price", "is_available", "category", "price"),
+        Index("ix_assets_available_price", "is_available", "price"),
+        # Relevance-ranked text search (routers/search.py); MySQL only
+        Index("ix_assets_fulltext", "name", "description", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
+
 class User(Base):
     __tablename__ = "users"
 
@@ -29,6 +42,7 @@ class User(Base):
     username = Column(String(50))
     email = Column(String(100))
     created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     # Relationships
     transactions_as_buyer = relationship("Transaction", foreign_keys="Transaction.buyer_id", back_populates="buyer")
@@ -44,6 +58,7 @@ class Transaction(Base):
     price = Column(Float, nullable=False)
     transaction_hash = Column(String(100))  # Blockchain transaction hash
     status = Column(String(20), default="pending")  # pending, completed, cancelled
+    escrow_transaction_id = Column(BigInteger, unique=True, index=True)  # MememonizeEscrow transaction ID
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
@@ -52,3 +67,120 @@ class Transaction(Base):
     buyer = relationship("User", foreign_keys=[buyer_id], back_populates="transactions_as_buyer")
     seller = relationship("User", foreign_keys=[seller_id], back_populates="transactions_as_seller")
 
+    __table_args__ = (
+        # Event listener lookup of pending trades by hash
+        Index("ix_transactions_hash_status", "transaction_hash", "status"),
+        # A user's trades: buyer_id = ? OR seller_id = ? is answered by merging both indexes
+        Index("ix_transactions_buyer_id", "buyer_id", "id"),
+        Index("ix_transactions_seller_id", "seller_id", "id"),
+    )
+
+class ListenerCheckpoint(Base):
+    """Last block fully processed by an event listener stream"""
+    __tablename__ = "listener_checkpoints"
+
+    name = Column(String(100), primary_key=True)  # Stream name: LISTENER_CHECKPOINT_NAME, "indexer" by default
+    last_block = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class ListenerLease(Base):
+    """A block range of a listener stream claimed by one event listener replica"""
+    __tablename__ = "listener_leases"
+
+    stream = Column(String(100), primary_key=True)  # Checkpoint name the range advances
+    from_block = Column(BigInteger, primary_key=True)
+    to_block = Column(BigInteger, nullable=False)
+    owner = Column(String(100), nullable=False)  # LISTENER_REPLICA_ID of the claiming replica
+    expires_at = Column(DateTime, nullable=False)  # UTC; other replicas may take it over afterwards
+
+class ProcessedEvent(Base):
+    """Blockchain logs already applied, so replaying a block range is a no-op"""
+    __tablename__ = "processed_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    transaction_hash = Column(String(100), nullable=False)
+    log_index = Column(Integer, nullable=False)
+    block_number = Column(BigInteger)
+    event_name = Column(String(50))
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("transaction_hash", "log_index", name="uq_processed_events_tx_log"),
+    )
+
+# Market statistics (market_stats.py): counters maintained incrementally as
+# trades are created and completed, so dashboards never aggregate the
+# transactions table. Uncategorized assets are counted under "".
+
+class MarketStatsHourly(Base):
+    """Trades per category and hour"""
+    __tablename__ = "market_stats_hourly"
+
+    category = Column(String(50), primary_key=True)
+    bucket = Column(DateTime, primary_key=True)  # Start of the hour (UTC)
+    trades = Column(Integer, nullable=False, default=0)  # Created, whatever their outcome
+    volume = Column(Float, nullable=False, default=0)
+    completed_trades = Column(Integer, nullable=False, default=0)  # Confirmed on chain
+    completed_volume = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Rolling windows read only the most recent buckets
+        Index("ix_market_stats_hourly_bucket", "bucket"),
+    )
+
+class CategoryStats(Base):
+    """All-time trade totals per category"""
+    __tablename__ = "category_stats"
+
+    category = Column(String(50), primary_key=True)
+    trades = Column(Integer, nullable=False, default=0)
+    volume = Column(Float, nullable=False, default=0)
+    completed_trades = Column(Integer, nullable=False, default=0)
+    completed_volume = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class SellerStats(Base):
+    """All-time completed sales per seller"""
+    __tablename__ = "seller_stats"
+
+    seller_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    completed_trades = Column(Integer, nullable=False, default=0)
+    completed_volume = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Top sellers by volume
+        Index("ix_seller_stats_volume", "completed_volume"),
+    )
+
+class TokenMetadata(Base):
+    """
+    Off-chain metadata document of an NFT, fetched from its tokenURI by
+    the metadata indexer (token_metadata.py). Keyed by Asset.token_id without
+    a foreign key: tokens are queued when minted, before their asset row may
+    exist.
+    """
+    __tablename__ = "token_metadata"
+
+    token_id = Column(String(100), primary_key=True)
+    token_uri = Column(Text)  # Read from the contract on the first attempt
+    status = Column(String(20), nullable=False, default="pending")  # pending, fetched, failed
+    name = Column(String(255))
+    description = Column(Text)
+    image = Column(Text)
+    attributes = Column(JSON)
+    document = Column(JSON)  # The whole metadata document
+    attempts = Column(Integer, nullable=False, default=0)  # Failed attempts since the token was queued
+    next_attempt_at = Column(DateTime)  # UTC; pending tokens are fetched once it has passed
+    claim = Column(String(32))  # Pass of the indexer working on the token
+    last_error = Column(String(255))
+    fetched_at = Column(DateTime)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    asset = relationship("Asset", primaryjoin="foreign(TokenMetadata.token_id) == Asset.token_id", viewonly=True)
+
+    __table_args__ = (
+        # Due tokens, oldest first
+        Index("ix_token_metadata_status_next_attempt", "status", "next_attempt_at"),
+    )
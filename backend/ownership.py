@@ -0,0 +1,84 @@
+import asyncio
+import os
+
+from web3 import AsyncHTTPProvider, Web3
+
+# On-chain ownership checks for GET /api/assets/owner/{wallet}?verify=true.
+# Every token's ownerOf(tokenId) is sent as one eth_call inside a JSON-RPC
+# batch request, so a wallet holding N tokens costs ceil(N / OWNERSHIP_BATCH_SIZE)
+# round-trips to the node instead of N.
+GANACHE_URL = os.getenv("GANACHE_URL", "http://127.0.0.1:7545")
+CONTRACT_ADDRESS = os.getenv("CONTRACT_ADDRESS", "0xYourContractAddress")
+# Nodes and hosted providers cap the size of a batch
+OWNERSHIP_BATCH_SIZE = int(os.getenv("OWNERSHIP_BATCH_SIZE", "500"))
+
+OWNER_OF = Web3.keccak(text="ownerOf(uint256)")[:4].hex().removeprefix("0x")
+
+class OwnershipCheckError(Exception):
+    """The node could not be reached or rejected the whole batch"""
+
+_provider = None
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        _provider = AsyncHTTPProvider(GANACHE_URL)
+    return _provider
+
+def token_number(token_id):
+    """uint256 token id for an Asset.token_id, or None when it is not numeric"""
+    try:
+        value = int(token_id, 0) if isinstance(token_id, str) else int(token_id)
+    except (TypeError, ValueError):
+        return None
+    return value if 0 <= value < 2 ** 256 else None
+
+def owner_of_call(token):
+    return ("eth_call", [{"to": CONTRACT_ADDRESS, "data": "0x" + OWNER_OF + format(token, "064x")}, "latest"])
+
+def decode_owner(response):
+    """Checksum address from an ownerOf response, or None for tokens that were burned or never minted"""
+    result = response.get("result") if isinstance(response, dict) else None
+    if not result or "error" in response or len(result) < 42:
+        return None
+    return Web3.to_checksum_address("0x" + result[-40:])
+
+async def owners_batch(tokens):
+    try:
+        responses = await get_provider().make_batch_request([owner_of_call(token) for token in tokens])
+    except Exception as e:
+        raise OwnershipCheckError(str(e)) from e
+    if not isinstance(responses, list):
+        # The node answered the batch with a single error object
+        raise OwnershipCheckError(str(responses.get("error", responses)))
+    return [decode_owner(response) for response in responses]
+
+async def owners_of(token_ids):
+    """
+    Current on-chain owner of each token id, as {token_id: address or None}.
+    Batches are sent concurrently.
+    """
+    numbers = {token_id: token_number(token_id) for token_id in token_ids}
+    tokens = sorted({token for token in numbers.values() if token is not None})
+    batches = [tokens[i:i + OWNERSHIP_BATCH_SIZE] for i in range(0, len(tokens), OWNERSHIP_BATCH_SIZE)]
+    owners = {}
+    for batch, results in zip(batches, await asyncio.gather(*(owners_batch(batch) for batch in batches))):
+        owners.update(zip(batch, results))
+    return {token_id: owners.get(token) for token_id, token in numbers.items()}
+
+async def verify_owners(assets):
+    """
+    Copies of the asset dicts annotated with the on-chain owner and whether
+    it matches owner_address. Cached pages are shared, so they are not mutated.
+    """
+    owners = await owners_of([asset["token_id"] for asset in assets if asset.get("token_id") is not None])
+    verified = []
+    for asset in assets:
+        onchain_owner = owners.get(asset.get("token_id"))
+        recorded = asset.get("owner_address")
+        verified.append({
+            **asset,
+            "onchain_owner": onchain_owner,
+            "owner_verified": bool(onchain_owner and recorded and onchain_owner.lower() == recorded.lower()),
+        })
+    return verified
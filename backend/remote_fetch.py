@@ -0,0 +1,58 @@
+import asyncio
+import ipaddress
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+
+# Downloads from URLs that come from user input or the chain (asset
+# image_url, tokenURI). Only http(s) is fetched, redirects are followed one
+# hop at a time so each target is checked, and unless `allow_private` is
+# set, hosts resolving to loopback, private or link-local addresses are
+# refused. The check happens before aiohttp resolves the name again, so a
+# DNS answer that changes in between is not caught; put the servers behind
+# an egress proxy where that matters.
+MAX_REDIRECTS = 3
+CHUNK_SIZE = 64 * 1024
+
+class FetchError(Exception):
+    """The URL was refused, could not be downloaded, or is too large"""
+
+async def check_url(url, allow_private=False):
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise FetchError(f"Not an http(s) URL: {url[:100]}")
+    if allow_private:
+        return
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(parts.hostname, parts.port or parts.scheme)
+    except OSError as e:
+        raise FetchError(f"Host {parts.hostname} could not be resolved: {e}")
+    for *_, sockaddr in addresses:
+        if not ipaddress.ip_address(sockaddr[0].split("%")[0]).is_global:
+            raise FetchError(f"Host {parts.hostname} is not a public address")
+
+async def download(session, url, max_bytes, allow_private=False):
+    """Body of a 200 response for `url`, fetched with the aiohttp `session`"""
+    redirects = 0
+    while True:
+        await check_url(url, allow_private)
+        try:
+            async with session.get(url, allow_redirects=False) as response:
+                if response.status in (301, 302, 303, 307, 308) and "Location" in response.headers:
+                    redirects += 1
+                    if redirects > MAX_REDIRECTS:
+                        raise FetchError("Too many redirects")
+                    url = urljoin(url, response.headers["Location"])
+                    continue
+                if response.status != 200:
+                    raise FetchError(f"Origin answered {response.status}")
+                if (response.content_length or 0) > max_bytes:
+                    raise FetchError(f"Response is larger than {max_bytes} bytes")
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    body += chunk
+                    if len(body) > max_bytes:
+                        raise FetchError(f"Response is larger than {max_bytes} bytes")
+                return bytes(body)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise FetchError(f"Origin could not be reached: {e!r}")
@@ -1,52 +1,288 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import RedirectResponse
+from sqlalchemy import select
+from typing import List, Optional
 import models
 import schemas
+from bulk_import import BULK_BATCH_SIZE, FORMATS, MAX_BULK_BATCH_SIZE, AssetImport, RecordParser, aiter_lines, detect_format
+from cache import cache
+from conditional import check_not_modified, etag_matches, versions
 from database import get_db
+from db_replicas import get_read_db, read_session, remember_writes
+from fast_json import FAST_JSON, Projection, fast_response, fetch
+from image_proxy import MEDIA_TYPES, ImageError, images, negotiate_format, snap_width, variant_etag
+import live_updates
+from ownership import OwnershipCheckError, verify_owners
+from pagination import paginate, set_next_cursor
 
 router = APIRouter()
 
+ASSET_PAGE_KEY = (models.Asset.id,)
+ASSET_PROJECTION = Projection(schemas.Asset, models.Asset)
+# The asset endpoints serve each asset's token metadata, read through the same
+# query by an outer join (token_id is unique on both sides, so LIMIT stays
+# exact). Transactions embed the plain ASSET_PROJECTION and leave it out.
+def asset_metadata_projection(schema):
+    return Projection(schema, models.Asset, nested={
+        "token_metadata": (
+            Projection(schemas.TokenMetadata, models.TokenMetadata),
+            lambda asset, metadata: asset.token_id == metadata.token_id,
+        ),
+    })
+
+ASSET_METADATA_PROJECTION = asset_metadata_projection(schemas.Asset)
+# Wallet portfolio pages carry the ownership fields too (null until verified)
+OWNED_ASSET_PROJECTION = asset_metadata_projection(schemas.OwnedAsset)
+
+def encode_assets(assets):
+    """JSON-ready response data for the cache; ORM objects are tied to their session"""
+    return jsonable_encoder([schemas.Asset.model_validate(asset, from_attributes=True) for asset in assets])
+
+def with_token_metadata(statement):
+    """`statement` over assets, also selecting each one's TokenMetadata row (None when it has none)"""
+    return statement.add_columns(models.TokenMetadata).outerjoin(
+        models.TokenMetadata, models.TokenMetadata.token_id == models.Asset.token_id
+    )
+
+def encode_asset_rows(rows, schema=schemas.Asset):
+    """encode_assets for (Asset, TokenMetadata) rows of with_token_metadata(), as `schema`"""
+    return jsonable_encoder([
+        schema.model_validate(asset, from_attributes=True).model_copy(update={
+            "token_metadata": metadata and schemas.TokenMetadata.model_validate(metadata, from_attributes=True),
+        })
+        for asset, metadata in rows
+    ])
+
+async def load_asset_page(db, page, projection=ASSET_METADATA_PROJECTION):
+    """Cached form of a page of assets, with their token metadata, shaped by `projection`'s schema"""
+    if FAST_JSON:
+        return await fetch(db, page, projection)
+    return encode_asset_rows((await db.execute(with_token_metadata(page))).all(), projection.schema)
+
 @router.get("/", response_model=List[schemas.Asset])
-def get_assets(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    assets = db.query(models.Asset).filter(models.Asset.is_available == True).offset(skip).limit(limit).all()
+async def get_assets(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db=Depends(get_read_db)
+):
+    page = paginate(
+        select(models.Asset).filter(models.Asset.is_available == True),
+        ASSET_PAGE_KEY, cursor=cursor, skip=skip, limit=limit
+    )
+    not_modified = await check_not_modified(
+        request, response, db, versions(page, models.Asset.id, models.Asset.updated_at)
+    )
+    if not_modified:
+        return not_modified
+
+    # Pages are keyed by the listings generation, which every asset write bumps
+    version = await cache.asset_listings_version()
+    assets = await cache.get_or_load(
+        f"assets:list:{version}:{skip}:{limit}:{cursor or ''}", lambda: load_asset_page(db, page),
+        tag=response.headers.get("etag")
+    )
+    set_next_cursor(response, assets, ASSET_PAGE_KEY, limit)
+    if FAST_JSON:
+        return fast_response(assets, response)
     return assets
 
-@router.get("/{asset_id}", response_model=schemas.Asset)
-def get_asset(asset_id: int, db: Session = Depends(get_db)):
-    asset = db.query(models.Asset).filter(models.Asset.id == asset_id).first()
-    if asset is None:
+@router.get("/owner/{wallet}", response_model=List[schemas.OwnedAsset])
+async def get_assets_by_owner(
+    wallet: str,
+    request: Request,
+    response: Response,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    verify: bool = False,
+    db=Depends(get_read_db)
+):
+    """
+    Assets whose owner_address is `wallet`, listed or not, served from the
+    (owner_address, id) index. With verify=true every token's owner is also
+    read from the chain in batched JSON-RPC requests and reported alongside.
+    """
+    page = paginate(
+        select(models.Asset).filter(models.Asset.owner_address == wallet),
+        ASSET_PAGE_KEY, cursor=cursor, limit=limit
+    )
+    if not verify:
+        # Chain state can change without a database write, so verified pages are never answered with a 304
+        not_modified = await check_not_modified(
+            request, response, db, versions(page, models.Asset.id, models.Asset.updated_at)
+        )
+        if not_modified:
+            return not_modified
+
+    version = await cache.asset_listings_version()
+    assets = await cache.get_or_load(
+        f"assets:owner:{version}:{wallet}:{limit}:{cursor or ''}",
+        lambda: load_asset_page(db, page, OWNED_ASSET_PROJECTION),
+        tag=response.headers.get("etag")
+    )
+    set_next_cursor(response, assets, ASSET_PAGE_KEY, limit)
+    if verify:
+        try:
+            assets = await verify_owners(assets)
+        except OwnershipCheckError as e:
+            raise HTTPException(status_code=502, detail=f"Could not verify ownership on chain: {e}")
+    if FAST_JSON:
+        return fast_response(assets, response)
+    return assets
+
+async def load_asset(db, asset_id):
+    """Cached form of one asset (the asset:{id} entry)"""
+    assets = await load_asset_page(db, select(models.Asset).filter(models.Asset.id == asset_id))
+    if not assets:
         raise HTTPException(status_code=404, detail="Asset not found")
-    return asset
+    return assets[0]
+
+@router.get("/{asset_id}", response_model=schemas.Asset)
+async def get_asset(asset_id: int, request: Request, response: Response, db=Depends(get_read_db)):
+    not_modified = await check_not_modified(request, response, db, versions(
+        select(models.Asset).filter(models.Asset.id == asset_id), models.Asset.id, models.Asset.updated_at
+    ), last_modified=True)
+    if not_modified:
+        return not_modified
+
+    return await cache.get_or_load(
+        f"asset:{asset_id}", lambda: load_asset(db, asset_id), tag=response.headers.get("etag")
+    )
+
+# Versioned image URLs (with ?v=) are never revalidated; bare ones for a day
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+IMAGE_CACHE_CONTROL = "public, max-age=86400"
+
+@router.get("/{asset_id}/image", response_class=Response, responses={
+    200: {"content": {media_type: {} for media_type in MEDIA_TYPES.values()}},
+})
+async def get_asset_image(
+    asset_id: int,
+    request: Request,
+    w: int = 512,
+    format: Optional[str] = None,
+    v: Optional[str] = None,
+):
+    """
+    The asset's image resized to `w` pixels wide (rounded up to one of
+    IMAGE_WIDTHS), as WebP when the client accepts it and JPEG otherwise,
+    unless `format` asks for one. `v` is any value that changes with the
+    image (the frontend sends updated_at); with it the response may be
+    cached for good.
+    """
+    async def load():
+        # A session of its own: no connection is held while the image is downloaded or resized
+        async with read_session(request) as db:
+            return await load_asset(db, asset_id)
+
+    image_url = (await cache.get_or_load(f"asset:{asset_id}", load))["image_url"]
+    if not image_url:
+        raise HTTPException(status_code=404, detail="Asset has no image")
+    if format is not None and format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format {format}; use one of {', '.join(MEDIA_TYPES)}")
+    if images is None:
+        # Pillow is not installed: the browser loads the original
+        return RedirectResponse(image_url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+    width = snap_width(w)
+    format = format or negotiate_format(request.headers.get("accept"))
+    try:
+        digest = await images.source(image_url)
+        etag = variant_etag(digest, width, format)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if v else IMAGE_CACHE_CONTROL,
+            "Vary": "Accept",
+        }
+        if etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        data = await images.variant(image_url, digest, width, format)
+    except ImageError as e:
+        raise HTTPException(status_code=502, detail=f"Could not load the asset's image: {e}")
+    return Response(data, media_type=MEDIA_TYPES[format], headers=headers)
 
 @router.post("/", response_model=schemas.Asset, status_code=status.HTTP_201_CREATED)
-def create_asset(asset: schemas.AssetCreate, db: Session = Depends(get_db)):
+async def create_asset(asset: schemas.AssetCreate, db=Depends(get_db)):
     db_asset = models.Asset(**asset.dict())
     db.add(db_asset)
-    db.commit()
-    db.refresh(db_asset)
+    await db.commit()
+    await db.refresh(db_asset)
+    await cache.invalidate_assets()
+    await remember_writes([db_asset.owner_address])
+    await live_updates.publish([live_updates.asset_update(db_asset)])
     return db_asset
 
+@router.post("/bulk", response_model=schemas.BulkImportReport, openapi_extra={
+    "requestBody": {"required": True, "content": {
+        "application/x-ndjson": {"schema": {"type": "string"}},
+        "text/csv": {"schema": {"type": "string"}},
+    }},
+})
+async def bulk_import_assets(
+    request: Request,
+    format: Optional[str] = None,
+    batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=MAX_BULK_BATCH_SIZE),
+    db=Depends(get_db)
+):
+    """
+    Stream NDJSON (one asset per line) or CSV (header row of asset fields)
+    and upsert the assets on token_id in batches. Rows that fail validation
+    or are rejected by the database are reported without stopping the import.
+    """
+    fmt = format or detect_format(request.headers.get("content-type"))
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+
+    job = AssetImport(batch_size=batch_size)
+    parser = RecordParser(fmt)
+
+    async def flush():
+        await db.run_sync(job.flush)
+        await live_updates.publish(job.take_updates())
+
+    try:
+        async for line in aiter_lines(request.stream()):
+            for row in parser.feed(line):
+                if job.add(*row):
+                    await flush()
+        for row in parser.close():
+            job.add(*row)
+        await flush()
+    finally:
+        # Earlier batches are committed even if the upload is cut short
+        await cache.invalidate_assets(job.updated_ids)
+        await remember_writes(job.owner_addresses)
+    return job.report()
+
 @router.put("/{asset_id}", response_model=schemas.Asset)
-def update_asset(asset_id: int, asset: schemas.AssetCreate, db: Session = Depends(get_db)):
-    db_asset = db.query(models.Asset).filter(models.Asset.id == asset_id).first()
+async def update_asset(asset_id: int, asset: schemas.AssetCreate, db=Depends(get_db)):
+    db_asset = await db.scalar(select(models.Asset).filter(models.Asset.id == asset_id))
     if db_asset is None:
         raise HTTPException(status_code=404, detail="Asset not found")
-    
+
+    previous_owner = db_asset.owner_address
     for key, value in asset.dict().items():
         setattr(db_asset, key, value)
-    
-    db.commit()
-    db.refresh(db_asset)
+
+    await db.commit()
+    await db.refresh(db_asset)
+    await cache.invalidate_assets([asset_id])
+    await remember_writes([previous_owner, db_asset.owner_address])
+    await live_updates.publish([live_updates.asset_update(db_asset, previous_owner)])
     return db_asset
 
 @router.delete("/{asset_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_asset(asset_id: int, db: Session = Depends(get_db)):
-    db_asset = db.query(models.Asset).filter(models.Asset.id == asset_id).first()
+async def delete_asset(asset_id: int, db=Depends(get_db)):
+    db_asset = await db.scalar(select(models.Asset).filter(models.Asset.id == asset_id))
     if db_asset is None:
         raise HTTPException(status_code=404, detail="Asset not found")
-    
-    db.delete(db_asset)
-    db.commit()
-    return None
 
+    await db.delete(db_asset)
+    await db.commit()
+    await cache.invalidate_assets([asset_id])
+    await remember_writes([db_asset.owner_address])
+    await live_updates.publish([live_updates.asset_update(db_asset, deleted=True)])
+    return None
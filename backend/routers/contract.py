@@ -1,36 +1,39 @@
-from fastapi import APIRouter, HTTPException
-import os
-import json
-from pathlib import Path
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from conditional import etag_matches
+from contract_artifacts import ArtifactError, artifacts
 
 router = APIRouter()
 
-@router.get("/")
-def get_contract_address():
+# Artifacts come from the shared registry, parsed once and re-read only when
+# the file changes. Responses carry an ETag derived from the ABI and the
+# deployments, so clients revalidate with a 304 instead of downloading the ABI
+# again.
+
+def artifact_response(request, response, contract_name, chain_id, include_abi):
     try:
-        # Path to contract JSON file for MememonizeNFT of the SleepyOwl trading platform
-        contract_path = Path(__file__).parent.parent.parent / "smart-contracts" / "build" / "contracts" / "MememonizeNFT.json"
-        
-        if not contract_path.exists():
-            raise HTTPException(status_code=404, detail="Contract file not found")
-        
-        with open(contract_path, 'r') as file:
-            contract_json = json.load(file)
-            
-            networks = contract_json.get('networks', {})
-            if not networks:
-                raise HTTPException(status_code=404, detail="No networks found in contract file")
-            
-            # Use the first network key, typically corresponding to Ganache (e.g., 5777)
-            network_id = list(networks.keys())[0]
-            contract_address = networks[network_id].get('address')
-            
-            if not contract_address:
-                raise HTTPException(status_code=404, detail="Contract address not found in the network data")
-            
-            return {"address": contract_address, "network_id": network_id}
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        artifact = artifacts.get(contract_name)
+        network_id, address = artifact.deployment(chain_id)
+    except ArtifactError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    etag = artifact.etag(chain_id)
+    # Revalidate on every use: a redeploy changes the address under the same URL
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    body = {"address": address, "network_id": network_id}
+    if include_abi:
+        body.update(contract_name=artifact.contract_name, abi=artifact.abi)
+    return body
+
+@router.get("/")
+async def get_contract_address(request: Request, response: Response, chain_id: Optional[str] = None):
+    """Deployed address of the MememonizeNFT contract of the SleepyOwl trading platform"""
+    return artifact_response(request, response, "MememonizeNFT", chain_id, include_abi=False)
 
+@router.get("/{contract_name}")
+async def get_contract_artifact(contract_name: str, request: Request, response: Response, chain_id: Optional[str] = None):
+    """ABI and deployed address of a compiled contract"""
+    return artifact_response(request, response, contract_name, chain_id, include_abi=True)
@@ -0,0 +1,85 @@
+import asyncio
+import json
+from typing import List
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+import live_updates
+from live_updates import LIVE_HEARTBEAT_SECONDS, hub, subscription_topics
+
+router = APIRouter()
+
+# Push channel for asset availability, ownership and transaction status
+# changes, so pages update in place instead of re-fetching whole lists.
+# Subscribe by wallet and/or asset id; without either, every update is sent.
+# Each connection buffers LIVE_QUEUE_SIZE messages: a client that falls
+# further behind gets a single `resync` event and should refetch.
+# /ws needs a WebSocket implementation in uvicorn (`pip install websockets`,
+# included in uvicorn[standard]); /events works with plain uvicorn.
+
+async def start_broker():
+    if live_updates.broker is not None:
+        await live_updates.broker.start()
+
+@router.get("/events", response_class=StreamingResponse, responses={200: {"content": {"text/event-stream": {}}}})
+async def stream_events(wallet: List[str] = Query([]), asset: List[int] = Query([])):
+    """Server-Sent Events stream of `asset`, `transaction` and `resync` events"""
+    await start_broker()
+    subscriber = hub.subscribe(subscription_topics(wallet, asset))
+
+    async def events():
+        try:
+            # Sends the headers right away, so the client knows it is subscribed
+            yield ": subscribed\n\n"
+            while True:
+                message = await subscriber.get(timeout=LIVE_HEARTBEAT_SECONDS)
+                # Comment lines keep proxies from closing idle streams
+                yield ": ping\n\n" if message is None else message.sse
+        finally:
+            hub.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        # Disable response buffering in nginx
+        "X-Accel-Buffering": "no",
+    })
+
+@router.websocket("/ws")
+async def stream_websocket(websocket: WebSocket, wallet: List[str] = Query([]), asset: List[int] = Query([])):
+    """
+    The same updates as /events, one JSON object per frame. Clients may
+    replace their subscription at any time by sending
+    {"wallet": [...], "asset": [...]}.
+    """
+    await start_broker()
+    await websocket.accept()
+    subscriber = hub.subscribe(subscription_topics(wallet, asset))
+
+    async def receive_subscriptions():
+        async for text in websocket.iter_text():
+            try:
+                request = json.loads(text)
+                topics = subscription_topics(request.get("wallet", ()), [int(i) for i in request.get("asset", ())])
+            except (ValueError, TypeError, AttributeError):
+                await websocket.send_text(json.dumps({"type": "error", "detail": "Invalid subscription"}))
+                continue
+            hub.resubscribe(subscriber, topics)
+
+    async def send_messages():
+        # uvicorn's protocol-level pings keep idle WebSockets alive
+        while True:
+            message = await subscriber.get()
+            await websocket.send_text(message.data)
+
+    tasks = [asyncio.create_task(receive_subscriptions()), asyncio.create_task(send_messages())]
+    try:
+        # Whichever ends first (client closed, send failed) ends the connection
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            # A client going away surfaces as WebSocketDisconnect, or RuntimeError when sending on a closed socket
+            if error is not None and not isinstance(error, (WebSocketDisconnect, RuntimeError)):
+                raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+        hub.unsubscribe(subscriber)
@@ -1,47 +1,110 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from typing import List, Optional
+import os
+import re
 import models
 import schemas
-from database import get_db
-from sqlalchemy import or_
+from cache import cache, CATEGORIES_KEY
+from conditional import check_not_modified, versions
+from database import engine
+from db_replicas import get_read_db
+from fast_json import FAST_JSON, fast_response
+from routers.assets import load_asset_page
+from sqlalchemy import desc, or_, select, text
 
 router = APIRouter()
 
+# MySQL serves text search from the FULLTEXT index on (name, description).
+# Other dialects (SQLite in development) keep the substring scan.
+FULLTEXT_SEARCH = engine.dialect.name == "mysql"
+
+# Characters with a meaning in MySQL boolean-mode full-text syntax
+BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]')
+
+# Words InnoDB leaves out of the FULLTEXT index: its default stopword list
+# (INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD) and words shorter than
+# innodb_ft_min_token_size. A required term on one of them matches no row,
+# so they are dropped from the search string. Keep FULLTEXT_MIN_TOKEN_SIZE
+# equal to the server's innodb_ft_min_token_size.
+FULLTEXT_MIN_TOKEN_SIZE = int(os.getenv("FULLTEXT_MIN_TOKEN_SIZE", "3"))
+FULLTEXT_STOPWORDS = frozenset((
+    "a about an are as at be by com de en for from how i in is it la of on or "
+    "that the this to was what when where who will with und www"
+).split())
+
+def fulltext_terms(query):
+    """
+    Build a boolean-mode search string: every indexed word is required and
+    matched as a prefix, so "slee ow" finds "Sleepy Owl". Returns "" when no
+    word of the query is indexed; the caller then falls back to the
+    substring scan.
+    """
+    words = BOOLEAN_OPERATORS.sub(" ", query).split()
+    return " ".join(
+        f"+{word}*" for word in words
+        if len(word) >= FULLTEXT_MIN_TOKEN_SIZE and word.lower() not in FULLTEXT_STOPWORDS
+    )
+
+def fulltext_match(terms):
+    return text("MATCH (assets.name, assets.description) AGAINST (:terms IN BOOLEAN MODE)").bindparams(terms=terms)
+
 @router.get("/", response_model=List[schemas.Asset])
-def search_assets(
+async def search_assets(
+    request: Request,
+    response: Response,
     query: Optional[str] = None,
     category: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
-    db: Session = Depends(get_db)
+    skip: int = 0,
+    limit: int = 100,
+    db=Depends(get_read_db)
 ):
-    search_query = db.query(models.Asset).filter(models.Asset.is_available == True)
-    
+    search_query = select(models.Asset).filter(models.Asset.is_available == True)
+
     # Apply text search if query provided
-    if query:
+    terms = fulltext_terms(query) if query and FULLTEXT_SEARCH else ""
+    if terms:
+        # Rank by relevance; MySQL evaluates the identical MATCH in WHERE and ORDER BY once
+        relevance = fulltext_match(terms)
+        search_query = search_query.filter(relevance).order_by(desc(relevance), models.Asset.id)
+    elif query:
+        # No FULLTEXT index, or only stopwords and short words: scan for the substring
         search_query = search_query.filter(
             or_(
                 models.Asset.name.ilike(f"%{query}%"),
                 models.Asset.description.ilike(f"%{query}%")
             )
-        )
-    
+        ).order_by(models.Asset.id)
+
     # Apply category filter if provided
     if category:
         search_query = search_query.filter(models.Asset.category == category)
-    
+
     # Apply price range filters if provided
     if min_price is not None:
         search_query = search_query.filter(models.Asset.price >= min_price)
     if max_price is not None:
         search_query = search_query.filter(models.Asset.price <= max_price)
-    
-    return search_query.all()
+
+    page = search_query.offset(skip).limit(limit)
+    not_modified = await check_not_modified(
+        request, response, db, versions(page, models.Asset.id, models.Asset.updated_at)
+    )
+    if not_modified:
+        return not_modified
+
+    assets = await load_asset_page(db, page)
+    if FAST_JSON:
+        return fast_response(assets, response)
+    return assets
 
 @router.get("/categories", response_model=List[str])
-def get_categories(db: Session = Depends(get_db)):
-    # Get distinct categories from assets
-    categories = db.query(models.Asset.category).distinct().all()
-    return [category[0] for category in categories if category[0]]
+async def get_categories(db=Depends(get_read_db)):
+    async def load():
+        # Get distinct categories from assets
+        categories = await db.execute(select(models.Asset.category).distinct())
+        return [category[0] for category in categories.all() if category[0]]
 
+    # The DISTINCT scans the whole table; asset writes invalidate the cached list
+    return await cache.get_or_load(CATEGORIES_KEY, load)
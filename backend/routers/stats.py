@@ -0,0 +1,89 @@
+from collections import defaultdict
+from datetime import timedelta
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import desc, func, select
+from typing import List, Optional
+import models
+import schemas
+from cache import cache
+from database import get_db
+from market_stats import COUNTERS, utcnow, window_start
+
+router = APIRouter()
+
+# Every read touches a bounded number of counter rows (one per category, the
+# last 24 hourly buckets, the top sellers), never the transactions table, so
+# it costs the same however long the trade history is. Responses are cached
+# for CACHE_TTL seconds.
+MAX_TOP_SELLERS = 100
+MAX_DAYS = 366
+
+@router.get("/", response_model=schemas.MarketStats)
+async def get_market_stats(top: int = 10, db=Depends(get_db)):
+    """Floor price, rolling 24h and all-time trade counts per category, and the top sellers by volume"""
+    if not 0 <= top <= MAX_TOP_SELLERS:
+        raise HTTPException(status_code=400, detail=f"top must be between 0 and {MAX_TOP_SELLERS}")
+
+    async def load():
+        totals = {row.category: row for row in (await db.scalars(select(models.CategoryStats))).all()}
+        window = {
+            row.category: row for row in (await db.execute(
+                select(models.MarketStatsHourly.category,
+                       *(func.sum(getattr(models.MarketStatsHourly, counter)).label(counter) for counter in COUNTERS))
+                .filter(models.MarketStatsHourly.bucket >= window_start(24))
+                .group_by(models.MarketStatsHourly.category)
+            )).all()
+        }
+        # Served from the (is_available, category, price) index
+        floors = {}
+        for category, price in (await db.execute(
+            select(models.Asset.category, func.min(models.Asset.price))
+            .filter(models.Asset.is_available == True)
+            .group_by(models.Asset.category)
+        )).all():
+            # NULL and "" are both uncategorized
+            floors[category or ""] = min(price, floors.get(category or "", price))
+        categories = []
+        for category in sorted(set(totals) | set(floors)):
+            total, recent = totals.get(category), window.get(category)
+            categories.append(schemas.CategoryStats(
+                category=category or None,
+                floor_price=floors.get(category),
+                **{f"{counter}_24h": getattr(recent, counter) or 0 for counter in COUNTERS if recent is not None},
+                **{counter: getattr(total, counter) for counter in COUNTERS if total is not None},
+            ))
+
+        sellers = (await db.execute(
+            select(models.SellerStats, models.User.wallet_address)
+            .outerjoin(models.User, models.SellerStats.seller_id == models.User.id)
+            .order_by(desc(models.SellerStats.completed_volume))
+            .limit(top)
+        )).all()
+        top_sellers = [
+            schemas.SellerStats(seller_id=seller.seller_id, wallet_address=wallet_address,
+                                completed_trades=seller.completed_trades, completed_volume=seller.completed_volume)
+            for seller, wallet_address in sellers
+        ]
+        return jsonable_encoder(schemas.MarketStats(generated_at=utcnow(), categories=categories, top_sellers=top_sellers))
+
+    return await cache.get_or_load(f"stats:summary:{top}", load)
+
+@router.get("/daily", response_model=List[schemas.DailyStats])
+async def get_daily_stats(category: Optional[str] = None, days: int = 30, db=Depends(get_db)):
+    """Per-day trade counts over the last `days` days, for one category or the whole market"""
+    if not 1 <= days <= MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"days must be between 1 and {MAX_DAYS}")
+
+    async def load():
+        start = utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+        statement = select(models.MarketStatsHourly).filter(models.MarketStatsHourly.bucket >= start)
+        if category is not None:
+            statement = statement.filter(models.MarketStatsHourly.category == category)
+        by_day = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        for bucket in (await db.scalars(statement)).all():
+            for counter in COUNTERS:
+                by_day[bucket.bucket.date()][counter] += getattr(bucket, counter)
+        return jsonable_encoder([schemas.DailyStats(day=day, **by_day[day]) for day in sorted(by_day)])
+
+    return await cache.get_or_load(f"stats:daily:{category or ''}:{days}", load)
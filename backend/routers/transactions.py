@@ -1,28 +1,125 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import aliased, joinedload
+from datetime import datetime
+from functools import partial
+from typing import List, Optional
 import models
 import schemas
+from bulk_export import MEDIA_TYPES, available_formats, export_stream, select_export
+from cache import cache
+from conditional import check_not_modified, versions
 from database import get_db
+from db_replicas import get_read_db, read_replica, remember_writes, replicas
+import live_updates
+from market_stats import record_trades_created
+from fast_json import FAST_JSON, Projection, fast_response, fetch
+from pagination import paginate, set_next_cursor
 import traceback
-from routers.users import get_or_create_user
+from routers.assets import ASSET_PROJECTION
+from routers.users import USER_PROJECTION, resolve_user_ids
 
 router = APIRouter()
 
+TRANSACTION_PAGE_KEY = (models.Transaction.id,)
+
+# schemas.Transaction nests asset, buyer and seller. Join them into the same
+# SELECT so a page of transactions costs one query instead of 1 + 3N lazy loads
+# (an AsyncSession cannot lazy-load during response serialization at all).
+# All three are many-to-one, so the join never multiplies rows and LIMIT stays exact.
+def select_transactions():
+    return select(models.Transaction).options(
+        joinedload(models.Transaction.asset),
+        joinedload(models.Transaction.buyer),
+        joinedload(models.Transaction.seller),
+    )
+
+TRANSACTION_PROJECTION = Projection(schemas.Transaction, models.Transaction, nested={
+    "asset": (ASSET_PROJECTION, lambda transaction, asset: transaction.asset_id == asset.id),
+    "buyer": (USER_PROJECTION, lambda transaction, user: transaction.buyer_id == user.id),
+    "seller": (USER_PROJECTION, lambda transaction, user: transaction.seller_id == user.id),
+})
+
+def transaction_versions(statement):
+    """Validator projection covering each transaction and its nested asset, buyer and seller"""
+    buyer, seller = aliased(models.User), aliased(models.User)
+    return (
+        versions(statement, models.Transaction.id, models.Transaction.updated_at,
+                 models.Asset.updated_at, buyer.updated_at, seller.updated_at)
+        .outerjoin(models.Asset, models.Transaction.asset_id == models.Asset.id)
+        .outerjoin(buyer, models.Transaction.buyer_id == buyer.id)
+        .outerjoin(seller, models.Transaction.seller_id == seller.id)
+    )
+
 @router.get("/", response_model=List[schemas.Transaction])
-def get_transactions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_transactions(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db=Depends(get_read_db)
+):
     try:
-        transactions = db.query(models.Transaction).offset(skip).limit(limit).all()
+        page = paginate(select_transactions(), TRANSACTION_PAGE_KEY, cursor=cursor, skip=skip, limit=limit)
+        not_modified = await check_not_modified(request, response, db, transaction_versions(page))
+        if not_modified:
+            return not_modified
+
+        if FAST_JSON:
+            transactions = await fetch(db, page, TRANSACTION_PROJECTION)
+            set_next_cursor(response, transactions, TRANSACTION_PAGE_KEY, limit)
+            return fast_response(transactions, response)
+
+        result = await db.scalars(page)
+        transactions = result.all()
+        set_next_cursor(response, transactions, TRANSACTION_PAGE_KEY, limit)
         return transactions
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_transactions: {str(e)}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@router.get("/export", response_class=StreamingResponse, responses={200: {"content": {
+    media_type: {"schema": {"type": "string"}} for media_type in MEDIA_TYPES.values()
+}}})
+async def export_transactions(
+    request: Request,
+    format: str = "ndjson",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    wallet: Optional[str] = None,
+):
+    """
+    Stream every matching transaction as NDJSON, CSV, or (with pyarrow
+    installed) Parquet or an Arrow IPC stream. Rows are read through a
+    server-side cursor and sent chunk by chunk instead of being paged.
+    """
+    if format not in available_formats():
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    statement = select_export(start=start, end=end, status=status_filter, wallet=wallet)
+    replica = await read_replica(request)
+    return StreamingResponse(
+        export_stream(statement, format, replica, done=partial(replicas.release, replica)),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'},
+    )
+
 @router.get("/{transaction_id}", response_model=schemas.Transaction)
-def get_transaction(transaction_id: int, db: Session = Depends(get_db)):
+async def get_transaction(transaction_id: int, request: Request, response: Response, db=Depends(get_read_db)):
     try:
-        transaction = db.query(models.Transaction).filter(models.Transaction.id == transaction_id).first()
+        statement = select_transactions().filter(models.Transaction.id == transaction_id)
+        not_modified = await check_not_modified(
+            request, response, db, transaction_versions(statement), last_modified=True
+        )
+        if not_modified:
+            return not_modified
+
+        transaction = await db.scalar(statement)
         if transaction is None:
             raise HTTPException(status_code=404, detail="Transaction not found")
         return transaction
@@ -34,64 +131,83 @@ def get_transaction(transaction_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/user/{user_id}", response_model=List[schemas.Transaction])
-def get_user_transactions(user_id: int, db: Session = Depends(get_db)):
+async def get_user_transactions(user_id: int, request: Request, response: Response, db=Depends(get_read_db)):
     try:
-        transactions = db.query(models.Transaction).filter(
+        statement = select_transactions().filter(
             (models.Transaction.buyer_id == user_id) | (models.Transaction.seller_id == user_id)
-        ).all()
-        return transactions
+        )
+        not_modified = await check_not_modified(request, response, db, transaction_versions(statement))
+        if not_modified:
+            return not_modified
+
+        if FAST_JSON:
+            return fast_response(await fetch(db, statement, TRANSACTION_PROJECTION), response)
+
+        transactions = await db.scalars(statement)
+        return transactions.all()
     except Exception as e:
         print(f"Error in get_user_transactions: {str(e)}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/", response_model=schemas.Transaction, status_code=status.HTTP_201_CREATED)
-def create_transaction(transaction: schemas.TransactionCreate, db: Session = Depends(get_db)):
+async def create_transaction(transaction: schemas.TransactionCreate, db=Depends(get_db)):
     try:
         # Log the incoming transaction data
         print(f"Creating transaction with data: {transaction.dict()}")
-        
+
         # Check if asset exists
-        asset = db.query(models.Asset).filter(models.Asset.id == transaction.asset_id).first()
+        asset = await db.scalar(select(models.Asset).filter(models.Asset.id == transaction.asset_id))
         if asset is None:
             raise HTTPException(status_code=404, detail="Asset not found")
-        
+
         # Require buyer address from the request
         if not hasattr(transaction, 'buyer_address') or not transaction.buyer_address:
             raise HTTPException(status_code=400, detail="buyer_address is required")
-        
-        # Get or create buyer using provided buyer_address
-        buyer = get_or_create_user(transaction.buyer_address, db)
-        transaction.buyer_id = buyer.id
 
         # Use asset.owner_address as seller address; if missing, throw error.
-        if asset.owner_address:
-            seller = get_or_create_user(asset.owner_address, db)
-            transaction.seller_id = seller.id
-        else:
+        if not asset.owner_address:
             raise HTTPException(status_code=400, detail="Asset owner address is missing; cannot determine seller")
-        
+
+        # Resolve (creating if needed) buyer and seller in one upsert, inside this transaction
+        user_ids = await resolve_user_ids([transaction.buyer_address, asset.owner_address], db)
+        transaction.buyer_id = user_ids[transaction.buyer_address]
+        transaction.seller_id = user_ids[asset.owner_address]
+
         # Exclude any provided 'status', 'buyer_address', and 'seller_address'
         # and set the status to "pending" to await on-chain confirmation.
         transaction_dict = transaction.dict(exclude={"status", "buyer_address", "seller_address"})
         transaction_dict["status"] = "pending"
-            
+
         db_transaction = models.Transaction(**transaction_dict)
         db.add(db_transaction)
-        
+
         # Mark asset as sold (not available) as purchase initiation (final confirmation will be handled via blockchain event)
         asset.is_available = False
-        
-        db.commit()
-        db.refresh(db_transaction)
-        return db_transaction
+        await db.run_sync(record_trades_created, [(asset.category, db_transaction.price)])
+
+        # Users, trade, asset and market statistics commit together
+        await db.commit()
+        await cache.invalidate_assets([transaction.asset_id])
+        # The buyer's and seller's next reads (history, portfolio) see this trade
+        await remember_writes([transaction.buyer_address, asset.owner_address])
+        # Reload server-generated columns together with the nested relationships
+        created = await db.scalar(
+            select_transactions()
+            .filter(models.Transaction.id == db_transaction.id)
+            .execution_options(populate_existing=True)
+        )
+        await live_updates.publish([
+            live_updates.transaction_update(created, transaction.buyer_address, asset.owner_address),
+            live_updates.asset_update(created.asset),
+        ])
+        return created
     except HTTPException as he:
-        db.rollback()
+        await db.rollback()
         raise he
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"Error in create_transaction: {str(e)}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-
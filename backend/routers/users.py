@@ -1,27 +1,65 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, status
+from sqlalchemy import select
+from typing import List, Optional
 import models
 import schemas
+from conditional import check_not_modified, versions
 from database import get_db
+from db_replicas import get_read_db, remember_writes
+from upsert import upsert_users
+from fast_json import FAST_JSON, Projection, fast_response, fetch
+from pagination import paginate, set_next_cursor
 import traceback
 
 router = APIRouter()
 
+USER_PAGE_KEY = (models.User.id,)
+USER_PROJECTION = Projection(schemas.User, models.User)
+
 @router.get("/", response_model=List[schemas.User])
-def get_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_users(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db=Depends(get_read_db)
+):
     try:
-        users = db.query(models.User).offset(skip).limit(limit).all()
+        page = paginate(select(models.User), USER_PAGE_KEY, cursor=cursor, skip=skip, limit=limit)
+        not_modified = await check_not_modified(
+            request, response, db, versions(page, models.User.id, models.User.updated_at)
+        )
+        if not_modified:
+            return not_modified
+
+        if FAST_JSON:
+            users = await fetch(db, page, USER_PROJECTION)
+            set_next_cursor(response, users, USER_PAGE_KEY, limit)
+            return fast_response(users, response)
+
+        result = await db.scalars(page)
+        users = result.all()
+        set_next_cursor(response, users, USER_PAGE_KEY, limit)
         return users
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_users: {str(e)}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/{user_id}", response_model=schemas.User)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(user_id: int, request: Request, response: Response, db=Depends(get_read_db)):
     try:
-        user = db.query(models.User).filter(models.User.id == user_id).first()
+        statement = select(models.User).filter(models.User.id == user_id)
+        not_modified = await check_not_modified(
+            request, response, db, versions(statement, models.User.id, models.User.updated_at), last_modified=True
+        )
+        if not_modified:
+            return not_modified
+
+        user = await db.scalar(statement)
         if user is None:
             raise HTTPException(status_code=404, detail="User not found")
         return user
@@ -33,9 +71,16 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/wallet/{wallet_address}", response_model=schemas.User)
-def get_user_by_wallet(wallet_address: str, db: Session = Depends(get_db)):
+async def get_user_by_wallet(wallet_address: str, request: Request, response: Response, db=Depends(get_read_db)):
     try:
-        user = db.query(models.User).filter(models.User.wallet_address == wallet_address).first()
+        statement = select(models.User).filter(models.User.wallet_address == wallet_address)
+        not_modified = await check_not_modified(
+            request, response, db, versions(statement, models.User.id, models.User.updated_at), last_modified=True
+        )
+        if not_modified:
+            return not_modified
+
+        user = await db.scalar(statement)
         if user is None:
             raise HTTPException(status_code=404, detail="User not found")
         return user
@@ -47,85 +92,71 @@ def get_user_by_wallet(wallet_address: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: schemas.UserCreate, db=Depends(get_db)):
     try:
         # Check if user with this wallet address already exists
-        existing_user = db.query(models.User).filter(models.User.wallet_address == user.wallet_address).first()
+        existing_user = await db.scalar(select(models.User).filter(models.User.wallet_address == user.wallet_address))
         if existing_user:
             return existing_user
-        
+
         # Create new user
         db_user = models.User(**user.dict())
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
+        await remember_writes([db_user.wallet_address])
         return db_user
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"Error in create_user: {str(e)}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.put("/{user_id}", response_model=schemas.User)
-def update_user(user_id: int, user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def update_user(user_id: int, user: schemas.UserCreate, db=Depends(get_db)):
     try:
-        db_user = db.query(models.User).filter(models.User.id == user_id).first()
+        db_user = await db.scalar(select(models.User).filter(models.User.id == user_id))
         if db_user is None:
             raise HTTPException(status_code=404, detail="User not found")
-        
+
+        previous_wallet = db_user.wallet_address
         for key, value in user.dict().items():
             setattr(db_user, key, value)
-        
-        db.commit()
-        db.refresh(db_user)
+
+        await db.commit()
+        await db.refresh(db_user)
+        await remember_writes([previous_wallet, db_user.wallet_address])
         return db_user
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"Error in update_user: {str(e)}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_id: int, db: Session = Depends(get_db)):
+async def delete_user(user_id: int, db=Depends(get_db)):
     try:
-        db_user = db.query(models.User).filter(models.User.id == user_id).first()
+        db_user = await db.scalar(select(models.User).filter(models.User.id == user_id))
         if db_user is None:
             raise HTTPException(status_code=404, detail="User not found")
-        
-        db.delete(db_user)
-        db.commit()
+
+        await db.delete(db_user)
+        await db.commit()
+        await remember_writes([db_user.wallet_address])
         return None
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"Error in delete_user: {str(e)}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-# Utility function to ensure a user exists
-def get_or_create_user(wallet_address: str, db: Session):
-    """Get a user by wallet address or create if not exists"""
-    try:
-        # Try to find existing user
-        user = db.query(models.User).filter(models.User.wallet_address == wallet_address).first()
-        
-        # If user doesn't exist, create a new one
-        if not user:
-            user = models.User(
-                wallet_address=wallet_address,
-                username=f"User_{wallet_address[:8]}"  # Create a default username
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-        
-        return user
-    except Exception as e:
-        db.rollback()
-        print(f"Error in get_or_create_user: {str(e)}")
-        print(traceback.format_exc())
-        raise Exception(f"Failed to get or create user: {str(e)}")
-
+async def resolve_user_ids(wallet_addresses, db):
+    """
+    Ids of the users owning `wallet_addresses`, creating missing users in the
+    caller's transaction (no commit), keyed by wallet
+    """
+    return await db.run_sync(upsert_users, wallet_addresses)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional, List
-from datetime import datetime
+from typing import Any, Optional, List
+from datetime import date, datetime
 
 # Asset schemas
 class AssetBase(BaseModel):
@@ -16,14 +16,47 @@ class AssetBase(BaseModel):
 class AssetCreate(AssetBase):
   pass
 
+class TokenMetadata(BaseModel):
+  token_uri: Optional[str] = None
+  status: str
+  name: Optional[str] = None
+  description: Optional[str] = None
+  image: Optional[str] = None
+  attributes: Optional[Any] = None
+  fetched_at: Optional[datetime] = None
+
+  class Config:
+      orm_mode = True
+
 class Asset(AssetBase):
   id: int
   created_at: datetime
   updated_at: datetime
+  # Off-chain metadata of the token, once the metadata indexer has queued it
+  token_metadata: Optional[TokenMetadata] = None
 
   class Config:
       orm_mode = True
 
+class OwnedAsset(Asset):
+  # Filled in only when ownership is verified against the chain
+  onchain_owner: Optional[str] = None
+  owner_verified: Optional[bool] = None
+
+# Bulk import schemas
+class BulkImportError(BaseModel):
+  row: int
+  token_id: Optional[str] = None
+  error: str
+
+class BulkImportReport(BaseModel):
+  received: int
+  inserted: int
+  updated: int
+  failed: int
+  errors: List[BulkImportError]
+  errors_truncated: bool = False
+
 # User schemas
 class UserBase(BaseModel):
   wallet_address: str
@@ -65,6 +98,37 @@ class Transaction(TransactionBase):
   class Config:
       orm_mode = True
 
+# Market statistics schemas
+class CategoryStats(BaseModel):
+  category: Optional[str] = None
+  floor_price: Optional[float] = None  # Cheapest asset on sale
+  trades_24h: int = 0
+  volume_24h: float = 0
+  completed_trades_24h: int = 0
+  completed_volume_24h: float = 0
+  trades: int = 0
+  volume: float = 0
+  completed_trades: int = 0
+  completed_volume: float = 0
+
+class SellerStats(BaseModel):
+  seller_id: int
+  wallet_address: Optional[str] = None
+  completed_trades: int
+  completed_volume: float
+
+class MarketStats(BaseModel):
+  generated_at: datetime
+  categories: List[CategoryStats]
+  top_sellers: List[SellerStats]
+
+class DailyStats(BaseModel):
+  day: date
+  trades: int
+  volume: float
+  completed_trades: int
+  completed_volume: float
+
 # Search schemas
 class SearchQuery(BaseModel):
   query: str
@@ -0,0 +1,301 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import random
+import uuid
+from datetime import timedelta
+from urllib.parse import unquote_to_bytes, urlsplit
+
+import aiohttp
+from dotenv import load_dotenv
+from eth_abi import decode as abi_decode
+from sqlalchemy import func, select, update
+from web3 import Web3
+
+from cache import cache
+from database import SessionLocal
+from event_handlers import chunked
+from listener_leases import utcnow
+from metrics import registry
+import models
+from remote_fetch import FetchError, download
+
+load_dotenv()
+
+logger = logging.getLogger("TokenMetadata")
+
+# Off-chain token metadata. The event listener queues a token in
+# token_metadata when it is minted (or first seen in a Transfer); the
+# indexer below, which runs inside the event listener, reads the tokenURIs of
+# due tokens from the contract in one JSON-RPC batch per pass and fetches
+# the documents concurrently. The asset endpoints serve the stored result.
+#   METADATA_WORKERS             documents fetched at once (0 turns the indexer off)
+#   METADATA_BATCH_SIZE          tokens per pass, and eth_calls per JSON-RPC batch
+#   METADATA_FETCH_TIMEOUT       seconds allowed per document
+#   METADATA_MAX_BYTES           larger documents are refused
+#   METADATA_MAX_ATTEMPTS        failed attempts before a token is marked failed
+#                                (db_manager.py requeue-metadata retries them)
+#   METADATA_RETRY_BASE_SECONDS  delay after the first failure, doubled after
+#                                each further one (with jitter) ...
+#   METADATA_RETRY_MAX_SECONDS   ... up to this
+#   METADATA_POLL_INTERVAL       seconds between passes while nothing is due
+#   IPFS_GATEWAY                 prefix that ipfs:// URIs are fetched through
+#   METADATA_ALLOW_PRIVATE_HOSTS tokenURIs are set by minters: unless this is
+#                                set, hosts on loopback, private or link-local
+#                                addresses are refused (see remote_fetch.py)
+METADATA_WORKERS = int(os.getenv("METADATA_WORKERS", "8"))
+METADATA_BATCH_SIZE = int(os.getenv("METADATA_BATCH_SIZE", "100"))
+METADATA_FETCH_TIMEOUT = float(os.getenv("METADATA_FETCH_TIMEOUT", "10"))
+METADATA_MAX_BYTES = int(os.getenv("METADATA_MAX_BYTES", str(256 * 1024)))
+METADATA_MAX_ATTEMPTS = int(os.getenv("METADATA_MAX_ATTEMPTS", "8"))
+METADATA_RETRY_BASE_SECONDS = float(os.getenv("METADATA_RETRY_BASE_SECONDS", "30"))
+METADATA_RETRY_MAX_SECONDS = float(os.getenv("METADATA_RETRY_MAX_SECONDS", "21600"))
+METADATA_POLL_INTERVAL = float(os.getenv("METADATA_POLL_INTERVAL", "5"))
+IPFS_GATEWAY = os.getenv("IPFS_GATEWAY", "https://ipfs.io/ipfs/")
+METADATA_ALLOW_PRIVATE_HOSTS = os.getenv("METADATA_ALLOW_PRIVATE_HOSTS", "false").lower() == "true"
+
+# A claimed token goes back to the queue after this long, in case the
+# indexer working on it died. Covers a whole pass of fetches.
+CLAIM_SECONDS = 600
+
+# tokenURIs that name an image are recorded as {"image": uri} without a download
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".avif")
+
+TOKEN_URI = Web3.keccak(text="tokenURI(uint256)")[:4].hex().removeprefix("0x")
+
+METADATA_OUTCOMES = registry.counter(
+    "token_metadata_attempts_total", "Token metadata fetch attempts by outcome", ("outcome",)
+)
+
+class MetadataError(Exception):
+    """The tokenURI could not be read, or its document fetched or parsed"""
+
+def token_uri_call(contract_address, token):
+    return ("eth_call", [{"to": contract_address, "data": "0x" + TOKEN_URI + format(token, "064x")}, "latest"])
+
+def decode_token_uri(response):
+    """The string an eth_call of tokenURI returned; raises MetadataError when the call failed"""
+    if not isinstance(response, dict) or "error" in response:
+        error = response.get("error") if isinstance(response, dict) else response
+        raise MetadataError(f"tokenURI call failed: {error}")
+    try:
+        uri = abi_decode(["string"], bytes.fromhex(response["result"].removeprefix("0x")))[0]
+    except Exception:
+        raise MetadataError("tokenURI returned malformed data")
+    if not uri:
+        raise MetadataError("Token has no tokenURI")
+    return uri
+
+def parse_document(document):
+    """Columns of a metadata document (ERC-721 metadata JSON schema, plus the common attributes list)"""
+    if not isinstance(document, dict):
+        raise MetadataError("Metadata is not a JSON object")
+
+    def text(key, limit=None):
+        value = document.get(key)
+        return str(value)[:limit] if isinstance(value, (str, int, float)) and value != "" else None
+
+    attributes = document.get("attributes")
+    return {
+        "name": text("name", 255),
+        "description": text("description"),
+        "image": text("image") or text("image_url"),
+        "attributes": attributes if isinstance(attributes, list) else None,
+        "document": document,
+    }
+
+def retry_delay(attempts):
+    """Seconds until the next attempt after `attempts` consecutive failures"""
+    delay = min(METADATA_RETRY_BASE_SECONDS * 2 ** (attempts - 1), METADATA_RETRY_MAX_SECONDS)
+    # Jitter, so tokens that failed together (one origin down) are not retried together
+    return delay * random.uniform(0.5, 1.0)
+
+def claim_due_tokens(limit):
+    """
+    Claim up to `limit` pending tokens whose next attempt is due, as
+    (claim, [(token_id, token_uri)]). Concurrent indexers (listener
+    replicas) claim disjoint tokens.
+    """
+    metadata = models.TokenMetadata
+    now = utcnow()
+    claim = uuid.uuid4().hex
+    with SessionLocal() as db:
+        due = db.scalars(select(metadata.token_id).filter(
+            metadata.status == "pending", metadata.next_attempt_at <= now
+        ).order_by(metadata.next_attempt_at).limit(limit)).all()
+        if not due:
+            return claim, []
+        # Conditional on the tokens still being due, so each is claimed once
+        db.execute(update(metadata).where(
+            metadata.token_id.in_(due), metadata.status == "pending", metadata.next_attempt_at <= now
+        ).values(claim=claim, next_attempt_at=now + timedelta(seconds=CLAIM_SECONDS)))
+        db.commit()
+        return claim, db.execute(select(metadata.token_id, metadata.token_uri).filter(
+            metadata.token_id.in_(due), metadata.claim == claim
+        )).tuples().all()
+
+def store_outcomes(claim, outcomes):
+    """
+    Record (token_id, token_uri, columns, error) outcomes of a pass. Tokens
+    re-queued by a mint since they were claimed are left alone. Assets whose
+    metadata was fetched or gave up get a new updated_at, which moves their
+    ETags, and are dropped from the read cache.
+    """
+    metadata = models.TokenMetadata
+    now = utcnow()
+    settled = []
+    with SessionLocal() as db:
+        rows = {}
+        for chunk in chunked([token_id for token_id, *_ in outcomes]):
+            rows.update((row.token_id, row) for row in db.scalars(
+                select(metadata).filter(metadata.token_id.in_(chunk), metadata.claim == claim)
+            ))
+        for token_id, token_uri, columns, error in outcomes:
+            row = rows.get(token_id)
+            if row is None:
+                continue
+            row.claim = None
+            if token_uri is not None:
+                row.token_uri = token_uri
+            if error is None:
+                for name, value in columns.items():
+                    setattr(row, name, value)
+                row.status, row.attempts, row.last_error = "fetched", 0, None
+                row.fetched_at, row.next_attempt_at = now, None
+                settled.append(token_id)
+                METADATA_OUTCOMES.inc(outcome="fetched")
+                continue
+            row.attempts += 1
+            row.last_error = str(error)[:255]
+            if row.attempts >= METADATA_MAX_ATTEMPTS:
+                row.status, row.next_attempt_at = "failed", None
+                settled.append(token_id)
+                METADATA_OUTCOMES.inc(outcome="failed")
+                logger.warning(f"Giving up on the metadata of token {token_id}: {error}")
+            else:
+                row.next_attempt_at = now + timedelta(seconds=retry_delay(row.attempts))
+                METADATA_OUTCOMES.inc(outcome="retry")
+        asset_ids = []
+        for chunk in chunked(settled):
+            asset_ids.extend(db.scalars(select(models.Asset.id).filter(models.Asset.token_id.in_(chunk))))
+        for chunk in chunked(asset_ids):
+            db.execute(update(models.Asset).where(models.Asset.id.in_(chunk)).values(updated_at=func.now()))
+        db.commit()
+    if asset_ids:
+        cache.invalidate_assets_sync(asset_ids)
+    return len(settled)
+
+def requeue(db, include_fetched=False):
+    """Queue failed tokens (and with `include_fetched`, every token) for a fresh attempt; returns how many"""
+    metadata = models.TokenMetadata
+    statuses = ("failed", "fetched") if include_fetched else ("failed",)
+    result = db.execute(update(metadata).where(metadata.status.in_(statuses)).values(
+        status="pending", attempts=0, next_attempt_at=utcnow(), claim=None
+    ))
+    db.commit()
+    return result.rowcount
+
+class MetadataIndexer:
+    """
+    Fetches the metadata documents of queued tokens. `provider` is a sync
+    web3 provider for the tokenURI calls to `contract_address`; it is used
+    from a worker thread, so it must not be shared with other callers.
+    """
+
+    def __init__(self, provider, contract_address, workers=METADATA_WORKERS):
+        self.provider = provider
+        self.contract_address = contract_address
+        self.workers = workers
+        self._session = None
+
+    def _http(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=METADATA_FETCH_TIMEOUT))
+        return self._session
+
+    def token_uris(self, token_ids):
+        """tokenURI of each token, or the MetadataError reading it, in one JSON-RPC batch"""
+        results, calls = {}, []
+        for token_id in token_ids:
+            try:
+                calls.append((token_id, token_uri_call(self.contract_address, int(token_id))))
+            except ValueError:
+                results[token_id] = MetadataError(f"Token id {token_id} is not a number")
+        if not calls:
+            return results
+        try:
+            responses = self.provider.make_batch_request([call for _, call in calls])
+        except Exception as e:
+            responses = e
+        if not isinstance(responses, list):
+            # Connection error, or the node answered the whole batch with one error
+            error = MetadataError(f"tokenURI batch failed: {responses}")
+            results.update((token_id, error) for token_id, _ in calls)
+            return results
+        for (token_id, _), response in zip(calls, responses):
+            try:
+                results[token_id] = decode_token_uri(response)
+            except MetadataError as e:
+                results[token_id] = e
+        return results
+
+    async def load_document(self, uri):
+        """The parsed metadata document a tokenURI points to"""
+        if uri.startswith("data:"):
+            header, _, payload = uri[5:].partition(",")
+            try:
+                body = base64.b64decode(payload) if header.endswith(";base64") else unquote_to_bytes(payload)
+            except ValueError:
+                raise MetadataError("Malformed data: URI")
+        else:
+            url = IPFS_GATEWAY + uri[7:].removeprefix("ipfs/") if uri.startswith("ipfs://") else uri
+            if urlsplit(url).path.lower().endswith(IMAGE_EXTENSIONS):
+                return {"image": uri}
+            try:
+                body = await download(self._http(), url, METADATA_MAX_BYTES, METADATA_ALLOW_PRIVATE_HOSTS)
+            except FetchError as e:
+                raise MetadataError(str(e))
+        try:
+            return json.loads(body)
+        except ValueError:
+            raise MetadataError("Metadata is not valid JSON")
+
+    async def _fetch(self, slots, token_id, token_uri):
+        async with slots:
+            try:
+                columns = parse_document(await self.load_document(token_uri))
+            except MetadataError as e:
+                return token_id, token_uri, None, e
+        return token_id, token_uri, columns, None
+
+    async def run_once(self):
+        """One pass over up to METADATA_BATCH_SIZE due tokens; returns the number attempted"""
+        claim, tokens = await asyncio.to_thread(claim_due_tokens, METADATA_BATCH_SIZE)
+        if not tokens:
+            return 0
+        uris = dict(tokens)
+        unresolved = [token_id for token_id, token_uri in tokens if token_uri is None]
+        if unresolved:
+            uris.update(await asyncio.to_thread(self.token_uris, unresolved))
+        outcomes = [(token_id, None, None, uri) for token_id, uri in uris.items() if isinstance(uri, MetadataError)]
+        slots = asyncio.Semaphore(self.workers)
+        outcomes += await asyncio.gather(*(
+            self._fetch(slots, token_id, uri) for token_id, uri in uris.items() if not isinstance(uri, MetadataError)
+        ))
+        settled = await asyncio.to_thread(store_outcomes, claim, outcomes)
+        logger.info(f"Metadata pass: {len(tokens)} tokens, {settled} settled")
+        return len(tokens)
+
+    async def run(self):
+        """Run passes for as long as tokens are due, then poll every METADATA_POLL_INTERVAL"""
+        logger.info(f"Indexing token metadata with {self.workers} workers")
+        while True:
+            try:
+                attempted = await self.run_once()
+            except Exception as e:
+                logger.error(f"Error indexing token metadata: {e}")
+                attempted = 0
+            if not attempted:
+                await asyncio.sleep(METADATA_POLL_INTERVAL)
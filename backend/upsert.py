@@ -0,0 +1,74 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+import models
+
+def upsert_statement(dialect_name, table, index_column, update_columns, touch=True):
+    """
+    INSERT that updates `update_columns` when `index_column` already exists,
+    spelled for the connection's dialect. With `touch`, updated rows also get
+    updated_at = now() (column onupdate defaults do not fire on upserts).
+    """
+    touched = {"updated_at": func.now()} if touch else {}
+    if dialect_name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table)
+        return statement.on_duplicate_key_update({
+            column: statement.inserted[column] for column in update_columns
+        } | touched)
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=[index_column],
+        set_={column: statement.excluded[column] for column in update_columns} | touched,
+    )
+
+def increment_statement(dialect_name, table, index_columns, counters):
+    """
+    INSERT of a counter row that adds its `counters` to the existing row when
+    `index_columns` already exist, so concurrent writers never lose an update.
+    """
+    if dialect_name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table)
+        return statement.on_duplicate_key_update({
+            column: table.c[column] + statement.inserted[column] for column in counters
+        } | {"updated_at": func.now()})
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=index_columns,
+        set_={column: table.c[column] + statement.excluded[column] for column in counters} | {"updated_at": func.now()},
+    )
+
+def upsert_users(db: Session, wallet_addresses):
+    """
+    Ids of the users for `wallet_addresses`, creating the missing ones, keyed
+    by wallet. Runs inside the caller's transaction without committing.
+
+    Existing rows are left untouched (the "update" rewrites wallet_address
+    with itself), so concurrent first purchases by the same wallet both
+    resolve to one row instead of racing on the unique index. SQLite and
+    PostgreSQL return every id from the upsert itself; MySQL has no
+    INSERT ... RETURNING and reads them back with one SELECT.
+    """
+    # Sorted so concurrent upserts lock index entries in the same order
+    wallets = sorted(set(wallet_addresses))
+    if not wallets:
+        return {}
+    dialect_name = db.get_bind().dialect.name
+    users = models.User.__table__
+    statement = upsert_statement(dialect_name, users, "wallet_address", ["wallet_address"], touch=False).values([
+        {"wallet_address": wallet, "username": f"User_{wallet[:8]}"} for wallet in wallets
+    ])
+    if dialect_name in ("sqlite", "postgresql"):
+        rows = db.execute(statement.returning(users.c.wallet_address, users.c.id))
+        return dict(rows.all())
+    db.execute(statement)
+    return dict(db.execute(select(users.c.wallet_address, users.c.id).where(users.c.wallet_address.in_(wallets))).all())
@@ -1,5 +1,6 @@
 import { Link as RouterLink } from "react-router-dom"
 import { Card, CardActionArea, CardActions, CardContent, CardMedia, Button, Typography, Box, Chip } from "@mui/material"
+import { assetsApi } from "../services/api"
 
 function AssetCard({ asset }) {
   return (
@@ -8,7 +9,7 @@ function AssetCard({ asset }) {
         <CardMedia
           component="img"
           height="200"
-          image={asset.image_url || ""}
+          image={assetsApi.imageUrl(asset, 256)}
           alt={asset.name}
         />
         <CardContent>
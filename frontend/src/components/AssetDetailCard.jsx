@@ -1,5 +1,6 @@
 "use client"
 import { Card, CardContent, CardMedia, Typography, Button, Box, Chip, Divider, Grid, Paper } from "@mui/material"
+import { assetsApi } from "../services/api"
 
 function AssetDetailCard({ asset, onPurchase }) {
   if (!asset) {
@@ -17,7 +18,7 @@ function AssetDetailCard({ asset, onPurchase }) {
           <CardMedia
             component="img"
             height="400"
-            image={asset.image_url || ""}
+            image={assetsApi.imageUrl(asset, 1024)}
             alt={asset.name}
             sx={{ objectFit: "contain" }}
           />
@@ -4,7 +4,7 @@ import { useState, useEffect } from "react"
 import { Container, Typography, Grid, Box, CircularProgress, Pagination, Alert, Snackbar } from "@mui/material"
 import AssetCard from "../components/AssetCard"
 import SearchBar from "../components/SearchBar"
-import { assetsApi, searchApi } from "../services/api"
+import { assetsApi, liveApi, searchApi } from "../services/api"
 
 function Marketplace() {
   const [assets, setAssets] = useState([])
@@ -15,6 +15,7 @@ function Marketplace() {
   const [totalPages, setTotalPages] = useState(1)
   const [searchParams, setSearchParams] = useState({ query: "", category: "" })
   const [snackbar, setSnackbar] = useState({ open: false, message: "", severity: "info" })
+  const [refreshKey, setRefreshKey] = useState(0)
 
   const itemsPerPage = 12
 
@@ -67,7 +68,7 @@ function Marketplace() {
     }
 
     fetchAssets()
-  }, [searchParams])
+  }, [searchParams, refreshKey])
 
   const handleSearch = (params) => {
     setSearchParams(params)
@@ -87,6 +88,27 @@ function Marketplace() {
   const startIndex = (page - 1) * itemsPerPage
   const endIndex = startIndex + itemsPerPage
   const displayedAssets = assets.slice(startIndex, endIndex)
+  const displayedIds = displayedAssets.map((asset) => asset.id).join(",")
+
+  // Keep the visible cards current (sold, new owner, new price) without re-fetching the list
+  useEffect(() => {
+    if (!displayedIds) return undefined
+    return liveApi.subscribe({ assets: displayedIds.split(",") }, (update) => {
+      if (update.type === "resync") {
+        setRefreshKey((key) => key + 1)
+      } else if (update.type === "asset") {
+        setAssets((current) =>
+          update.deleted
+            ? current.filter((asset) => asset.id !== update.id)
+            : current.map((asset) =>
+                asset.id === update.id
+                  ? { ...asset, is_available: update.is_available, owner_address: update.owner_address, price: update.price }
+                  : asset,
+              ),
+        )
+      }
+    })
+  }, [displayedIds])
 
   return (
     <Container maxWidth="lg">
@@ -1,9 +1,9 @@
 "use client"
 
-import { useState, useEffect } from "react"
+import { useState, useEffect, useRef } from "react"
 import { Container, Typography, Box, CircularProgress, Alert, Snackbar } from "@mui/material"
 import TransactionTable from "../components/TransactionTable"
-import { transactionsApi } from "../services/api"
+import { liveApi, transactionsApi } from "../services/api"
 import web3Service from "../services/web3"
 
 function TransactionHistory() {
@@ -57,6 +57,26 @@ function TransactionHistory() {
     fetchTransactions()
   }, [])
 
+  const knownIds = useRef(new Set())
+  useEffect(() => {
+    knownIds.current = new Set(transactions.map((transaction) => transaction.id))
+  }, [transactions])
+
+  // Status changes arrive as pushed updates; only unknown transactions need a refetch
+  useEffect(() => {
+    return liveApi.subscribe({}, (update) => {
+      if (update.type === "resync" || (update.type === "transaction" && !knownIds.current.has(update.id))) {
+        fetchTransactions()
+      } else if (update.type === "transaction") {
+        setTransactions((current) =>
+          current.map((transaction) =>
+            transaction.id === update.id ? { ...transaction, status: update.status } : transaction,
+          ),
+        )
+      }
+    })
+  }, [])
+
 
   const handleCloseSnackbar = () => {
     setSnackbar({ ...snackbar, open: false })
@@ -28,6 +28,11 @@ api.interceptors.response.use(
 // Add request interceptor for debugging
 api.interceptors.request.use(
   (config) => {
+    // Lets the API serve this wallet's reads from the primary right after its own writes
+    const wallet = window.ethereum?.selectedAddress
+    if (wallet) {
+      config.headers["X-Wallet-Address"] = wallet
+    }
     console.log(`Making ${config.method.toUpperCase()} request to ${config.url}`, config.data || config.params)
     return config
   },
@@ -41,9 +46,17 @@ api.interceptors.request.use(
 export const assetsApi = {
   getAll: () => api.get("/assets"),
   getById: (id) => api.get(`/assets/${id}`),
+  // Pass { verify: true } to also check each token's owner on chain
+  getByUser: (walletAddress, params) => api.get(`/assets/owner/${walletAddress}`, { params }),
   create: (data) => api.post("/assets", data),
   update: (id, data) => api.put(`/assets/${id}`, data),
   delete: (id) => api.delete(`/assets/${id}`),
+  // Resized copy of the asset's image (empty when it has none). updated_at
+  // versions the URL, so browsers keep the response until the asset changes.
+  imageUrl: (asset, width) =>
+    asset.image_url
+      ? `/api/assets/${asset.id}/image?w=${width}&v=${encodeURIComponent(asset.updated_at || "")}`
+      : "",
 }
 
 // Transactions API
@@ -70,6 +83,33 @@ export const searchApi = {
   getCategories: () => api.get("/search/categories"),
 }
 
+// Market statistics API
+export const statsApi = {
+  get: (params) => api.get("/stats", { params }),
+  getDaily: (params) => api.get("/stats/daily", { params }),
+}
+
+// Live updates over Server-Sent Events. onUpdate receives asset, transaction
+// and resync messages; after a resync the caller should refetch. Returns a
+// function that closes the stream.
+export const liveApi = {
+  subscribe: ({ wallets = [], assets = [] } = {}, onUpdate) => {
+    const params = new URLSearchParams()
+    wallets.forEach((wallet) => params.append("wallet", wallet))
+    assets.forEach((assetId) => params.append("asset", assetId))
+    const source = new EventSource(`/api/live/events?${params}`)
+    const forward = (event) => onUpdate(JSON.parse(event.data))
+    ;["asset", "transaction", "resync"].forEach((type) => source.addEventListener(type, forward))
+    // EventSource reconnects by itself; updates sent while it was away are lost
+    let opened = false
+    source.onopen = () => {
+      if (opened) onUpdate({ type: "resync" })
+      opened = true
+    }
+    return () => source.close()
+  },
+}
+
 // Direct API access for debugging
 export const debugApi = {
   get: (url, params) => api.get(url, { params }),